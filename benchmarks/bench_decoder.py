@@ -0,0 +1,246 @@
+"""
+Decoder speed and accuracy benchmark
+
+Decodes a reproducible synthetic corpus (see corpus.py) and reports the
+decode rate, p50/p95/p99 latency and memory per image size, broken down by
+every corpus parameter. Results are saved as JSON so runs from different
+commits can be compared with --compare.
+
+Usage:
+    python benchmarks/bench_decoder.py [--count N] [--seed S] [--output results.json]
+    python benchmarks/bench_decoder.py --compare baseline.json --output new.json
+    python benchmarks/bench_decoder.py --save-corpus corpus_dir
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import IMAGE_SIZES, generate_corpus, save_corpus  # noqa: E402
+from qriftly.backends import backend_names  # noqa: E402
+from qriftly.engine import QRDecoder  # noqa: E402
+
+# Images per size used for the (slower) tracemalloc memory pass
+MEMORY_SAMPLES_PER_SIZE = 3
+
+FACTORS = ('version', 'error_level', 'module_size', 'rotation', 'blur',
+           'noise', 'jpeg_quality', 'codes')
+
+
+def make_decoder(args) -> Callable[[np.ndarray], list]:
+    """Build the decode callable under test from the command line options"""
+    decoder = QRDecoder(backend=args.backend)
+    return decoder.decode
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Tally:
+    """Accumulates accuracy and latency for one group of samples"""
+
+    __slots__ = ('images', 'images_ok', 'expected', 'decoded', 'false_positives', 'latencies')
+
+    def __init__(self):
+        self.images = 0
+        self.images_ok = 0
+        self.expected = 0
+        self.decoded = 0
+        self.false_positives = 0
+        self.latencies = []
+
+    def add(self, expected: List[str], found: List[str], latency_ms: float):
+        expected_set = set(expected)
+        found_set = set(found)
+        hits = len(expected_set & found_set)
+        self.images += 1
+        self.images_ok += hits == len(expected_set)
+        self.expected += len(expected_set)
+        self.decoded += hits
+        self.false_positives += len(found_set - expected_set)
+        self.latencies.append(latency_ms)
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            'images': self.images,
+            'expected_codes': self.expected,
+            'decoded_codes': self.decoded,
+            'false_positives': self.false_positives,
+            'decode_rate': round(self.decoded / self.expected, 4) if self.expected else 0.0,
+            'image_success_rate': round(self.images_ok / self.images, 4) if self.images else 0.0,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                'p50': round(percentile(latencies, 0.50), 3),
+                'p95': round(percentile(latencies, 0.95), 3),
+                'p99': round(percentile(latencies, 0.99), 3),
+            },
+        }
+
+
+def _value_key(value: str):
+    """Sort factor values numerically where possible ('None' first)"""
+    if value == 'None':
+        return (0, 0.0, value)
+    try:
+        return (1, float(value), value)
+    except ValueError:
+        return (2, 0.0, value)
+
+
+def measure_memory(decode, images: List[np.ndarray]) -> float:
+    """Peak Python/NumPy allocation (MB) while decoding, averaged over images"""
+    peaks = []
+    for image in images:
+        tracemalloc.start()
+        decode(image)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak / 1e6)
+    return round(sum(peaks) / len(peaks), 3) if peaks else 0.0
+
+
+def run_benchmark(samples, decode, label: str = "default") -> dict:
+    """Decode every sample and collect overall, per-size and per-factor results"""
+    overall = Tally()
+    by_size: Dict[str, Tally] = defaultdict(Tally)
+    by_factor: Dict[str, Dict[str, Tally]] = {factor: defaultdict(Tally) for factor in FACTORS}
+    memory_images: Dict[str, List[np.ndarray]] = defaultdict(list)
+    by_backend: Dict[str, int] = defaultdict(int)
+
+    for sample in samples:
+        start = time.perf_counter()
+        symbols = decode(sample.image)
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        found = [symbol.data for symbol in symbols]
+        for symbol in symbols:
+            by_backend[symbol.backend] += 1
+
+        overall.add(sample.payloads, found, latency_ms)
+        by_size[sample.params['size']].add(sample.payloads, found, latency_ms)
+        for factor in FACTORS:
+            by_factor[factor][str(sample.params[factor])].add(sample.payloads, found, latency_ms)
+
+        if len(memory_images[sample.params['size']]) < MEMORY_SAMPLES_PER_SIZE:
+            memory_images[sample.params['size']].append(sample.image)
+
+    sizes = {}
+    for size in sorted(by_size, key=lambda name: IMAGE_SIZES[name][0]):
+        sizes[size] = by_size[size].summary()
+        sizes[size]['peak_alloc_mb'] = measure_memory(decode, memory_images[size])
+
+    return {
+        'label': label,
+        'overall': overall.summary(),
+        'by_size': sizes,
+        'by_backend': dict(by_backend),
+        'by_factor': {
+            factor: {value: groups[value].summary() for value in sorted(groups, key=_value_key)}
+            for factor, groups in by_factor.items()
+        },
+    }
+
+
+def print_report(results: dict):
+    overall = results['overall']
+    print(f"\n== {results['label']} ==")
+    print(f"images: {overall['images']}  codes: {overall['expected_codes']}  "
+          f"decode rate: {overall['decode_rate']:.1%}  "
+          f"false positives: {overall['false_positives']}")
+    if results['by_backend']:
+        print("codes per backend: " + ", ".join(
+            f"{name}={count}" for name, count in sorted(results['by_backend'].items())))
+    print(f"{'size':<12}{'rate':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'alloc MB':>10}")
+    for size, summary in results['by_size'].items():
+        latency = summary['latency_ms']
+        print(f"{size:<12}{summary['decode_rate']:>8.1%}{latency['p50']:>10.2f}"
+              f"{latency['p95']:>10.2f}{latency['p99']:>10.2f}{summary['peak_alloc_mb']:>10.2f}")
+
+    for factor, groups in results['by_factor'].items():
+        rates = "  ".join(f"{value}={summary['decode_rate']:.0%}" for value, summary in groups.items())
+        print(f"  {factor:<13}{rates}")
+
+
+def print_comparison(baseline: dict, current: dict):
+    """Print decode-rate and latency deltas against a previous run"""
+    print(f"\n== {current['label']} vs baseline {baseline['label']} ==")
+    print(f"{'size':<12}{'rate Δ':>10}{'p50 Δ ms':>11}{'p95 Δ ms':>11}{'p99 Δ ms':>11}")
+    for size in ['overall'] + list(current['by_size']):
+        old = baseline['overall'] if size == 'overall' else baseline['by_size'].get(size)
+        new = current['overall'] if size == 'overall' else current['by_size'][size]
+        if not old:
+            continue
+        deltas = [new['latency_ms'][key] - old['latency_ms'][key] for key in ('p50', 'p95', 'p99')]
+        print(f"{size:<12}{(new['decode_rate'] - old['decode_rate']) * 100:>+9.1f}%"
+              + "".join(f"{delta:>+11.2f}" for delta in deltas))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="QRiftly decoder benchmark")
+    parser.add_argument('--count', type=int, default=200, help="Corpus size (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=1234, help="Corpus seed (default: %(default)s)")
+    parser.add_argument('--sizes', nargs='+', choices=list(IMAGE_SIZES),
+                        help="Only generate these image sizes")
+    parser.add_argument('--backend', choices=backend_names(), default='cascade',
+                        help="Decoder backend to benchmark (default: %(default)s)")
+    parser.add_argument('--label', default=None, help="Name for this run in the report")
+    parser.add_argument('--output', help="Save results as JSON")
+    parser.add_argument('--compare', help="Previous results JSON to compare against")
+    parser.add_argument('--save-corpus', metavar='DIR',
+                        help="Write the corpus images and manifest instead of benchmarking")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.save_corpus:
+        count, manifest = save_corpus(generate_corpus(args.count, args.seed, args.sizes),
+                                      args.save_corpus)
+        print(f"Wrote {count} images, manifest: {manifest}")
+        return 0
+
+    print(f"Generating corpus (count={args.count}, seed={args.seed})...")
+    samples = list(generate_corpus(args.count, args.seed, args.sizes))
+
+    results = run_benchmark(samples, make_decoder(args), args.label or args.backend)
+    results['meta'] = {
+        'count': args.count,
+        'seed': args.seed,
+        'backend': args.backend,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+    }
+    print_report(results)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(json.load(f), results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Payload classification benchmark
+
+Classifies batches of decoded payloads (one million by default) with the
+original chained ``detect_qr_type`` checks, with the scheme-dispatch
+classifier that replaced them, and with ``parse_payload``, which also
+parses the fields of each type.
+
+Three batches are timed: every payload distinct (every call parses), a
+realistic rescan mix where a small set of payloads repeats (served by the
+memo), and the same mix going through both the label and the fields, as
+the GUI and the result sinks do.
+
+Usage:
+    python benchmarks/bench_payload.py [--count N] [--distinct N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qriftly.payload import URL_PREFIXES, detect_qr_type, parse_payload  # noqa: E402
+
+TEMPLATES = [
+    "https://example.com/product/{n}?ref=qr",
+    "www.example.org/{n}",
+    "WIFI:T:WPA;S:Guest-{n};P:secret{n};;",
+    "mailto:user{n}@example.com?subject=Order%20{n}",
+    "user{n}@example.com",
+    "tel:+4930{n:07d}",
+    "+1 (555) {n:07d}",
+    "SMSTO:+4917{n:07d}:Code {n}",
+    "geo:52.{n},13.{n}",
+    "MECARD:N:Doe,John{n};TEL:+1555{n:07d};EMAIL:j{n}@example.com;;",
+    "BEGIN:VCARD\r\nVERSION:3.0\r\nN:Doe;Jane{n};;;\r\nFN:Jane{n} Doe\r\nORG:Acme\r\n"
+    "TEL;TYPE=CELL:+1555{n:07d}\r\nEMAIL:jane{n}@example.com\r\nEND:VCARD",
+    "BEGIN:VEVENT\r\nSUMMARY:Meeting {n}\r\nDTSTART:20251001T100000Z\r\nDTEND:20251001T110000Z\r\nEND:VEVENT",
+    "BCD\n002\n1\nSCT\nBFSWDE33BER\nShop {n}\nDE33100205000001194700\nEUR{n}.50\n\n\nInvoice {n}",
+    "ITEM-{n:08d}",
+    "Plain text note number {n} with no structure",
+]
+
+
+def legacy_detect_qr_type(qr_data: str) -> str:
+    """detect_qr_type before the scheme dispatch"""
+    qr_data_lower = qr_data.lower()
+    if qr_data.startswith('WIFI:'):
+        return "WiFi Configuration"
+    if qr_data_lower.startswith(URL_PREFIXES):
+        return "URL"
+    if qr_data_lower.startswith('mailto:') or '@' in qr_data and '.' in qr_data:
+        return "Email"
+    if qr_data_lower.startswith('tel:') or (qr_data.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit() and len(qr_data.replace(' ', '').replace('-', '').replace('+', '').replace('(', '').replace(')', '')) >= 10):
+        return "Phone Number"
+    if qr_data_lower.startswith('sms:') or qr_data_lower.startswith('smsto:'):
+        return "SMS"
+    if qr_data.upper().startswith('BEGIN:VCARD'):
+        return "Contact (vCard)"
+    if qr_data.upper().startswith('BEGIN:VEVENT'):
+        return "Calendar Event"
+    if qr_data_lower.startswith('geo:'):
+        return "Location/GPS"
+    return "Text"
+
+
+def make_batch(count: int, distinct: int, seed: int = 0) -> list:
+    """``count`` payloads drawn from ``distinct`` different ones (all distinct if 0)"""
+    rng = random.Random(seed)
+    pool = distinct or count
+    return [TEMPLATES[n % len(TEMPLATES)].format(n=n)
+            for n in (rng.randrange(pool) if distinct else index for index in range(count))]
+
+
+def run(func, batch) -> float:
+    start = time.perf_counter()
+    for text in batch:
+        func(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--distinct', type=int, default=2_000,
+                        help="Distinct payloads in the rescan batch")
+    args = parser.parse_args()
+
+    parse_uncached = parse_payload.__wrapped__
+    batches = [
+        ("all distinct", make_batch(args.count, 0)),
+        (f"{args.distinct} distinct", make_batch(args.count, args.distinct)),
+    ]
+
+    print(f"{'batch':<16}{'path':<34}{'seconds':>9}{'payloads/s':>14}")
+    for name, batch in batches:
+        cases = [
+            ("legacy detect_qr_type", legacy_detect_qr_type),
+            ("detect_qr_type (scheme dispatch)", detect_qr_type),
+            ("parse_payload, no memo", parse_uncached),
+            ("parse_payload", parse_payload),
+            ("parse_payload label + fields", lambda text: (parse_payload(text).label,
+                                                           parse_payload(text).fields())),
+        ]
+        for path, func in cases:
+            parse_payload.cache_clear()
+            elapsed = run(func, batch)
+            print(f"{name:<16}{path:<34}{elapsed:>9.2f}{len(batch) / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Preprocessing ladder benchmark
+
+Decodes a reproducible set of hard images (glare, faded prints, hard
+shadows, blur, light-on-dark codes, skewed barcodes; see
+corpus.generate_hard_corpus) with and without the preprocessing ladder,
+and an ordinary corpus to check that images the plain pass decodes pay
+nothing extra. Prints the decode rate and latency per condition, then the
+ladder's per-step attempts, hits, skips and cost, which is what the step
+order should be tuned from.
+
+Skewed barcodes need zbar, which only scans along rows and columns; they
+are left out when pyzbar is unavailable (OpenCV's barcode detector reads
+rotated barcodes without help).
+
+Usage:
+    python benchmarks/bench_preprocess.py [--count N] [--steps adaptive,clahe,...] [--budget MS]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import HARD_CONDITIONS, IMAGE_SIZES, generate_corpus, generate_hard_corpus  # noqa: E402
+from qriftly.backends import get_backend  # noqa: E402
+from qriftly.engine import QRDecoder  # noqa: E402
+from qriftly.preprocess import DEFAULT_BUDGET_MS, DEFAULT_STEPS, parse_steps  # noqa: E402
+
+
+def run(samples, decoder: QRDecoder, group) -> Dict[str, dict]:
+    """Decode every sample; returns {group: {'images', 'decoded', 'ms'}}"""
+    results: Dict[str, dict] = defaultdict(lambda: {'images': 0, 'decoded': 0, 'ms': 0.0})
+    for sample in samples:
+        start = time.perf_counter()
+        found = {symbol.data for symbol in decoder.decode(sample.image, use_cache=False)}
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        tally = results[group(sample)]
+        tally['images'] += 1
+        tally['decoded'] += set(sample.payloads) <= found
+        tally['ms'] += elapsed_ms
+    return results
+
+
+def print_comparison(title: str, plain: Dict[str, dict], ladder: Dict[str, dict]):
+    print(f"\n{title:<12}{'plain':>10}{'ladder':>10}{'plain ms':>11}{'ladder ms':>11}")
+    for group, before in sorted(plain.items()):
+        after = ladder[group]
+        images = before['images']
+        print(f"{group:<12}{before['decoded']:>6}/{images:<3}{after['decoded']:>6}/{images:<3}"
+              f"{before['ms'] / images:>11.1f}{after['ms'] / images:>11.1f}")
+
+
+def print_steps(stats: dict):
+    print(f"\nladder: {stats['images']} image(s) reached it, {stats['rescued']} rescued, "
+          f"{stats['out_of_budget']} ran out of budget")
+    print(f"{'step':<10}{'attempts':>10}{'hits':>6}{'hit rate':>10}{'skipped':>9}{'mean ms':>9}")
+    for name, step in stats['steps'].items():
+        print(f"{name:<10}{step['attempts']:>10}{step['hits']:>6}{step['hit_rate']:>10.0%}"
+              f"{step['skipped']:>9}{step['mean_ms']:>9.1f}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="QRiftly preprocessing ladder benchmark")
+    parser.add_argument('--count', type=int, default=60, help="Hard images (default: %(default)s)")
+    parser.add_argument('--easy', type=int, default=40,
+                        help="Ordinary corpus images for the overhead check (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=1234, help="Corpus seed (default: %(default)s)")
+    parser.add_argument('--size', choices=list(IMAGE_SIZES), default='1280x720',
+                        help="Image size (default: %(default)s)")
+    parser.add_argument('--steps', type=parse_steps, default=list(DEFAULT_STEPS),
+                        help=f"Comma-separated ladder steps (default: {','.join(DEFAULT_STEPS)})")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS,
+                        help="Time budget per image in ms (default: %(default)s)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    conditions: List[str] = list(HARD_CONDITIONS)
+    if not get_backend('pyzbar').available():
+        conditions.remove('skewed')
+        print("pyzbar is unavailable: skewed barcodes left out")
+    print(f"Generating corpora (hard={args.count}, easy={args.easy}, seed={args.seed}, size={args.size})...")
+    hard = list(generate_hard_corpus(args.count, args.seed, args.size, conditions))
+    easy = list(generate_corpus(args.easy, args.seed, sizes=[args.size]))
+
+    plain = QRDecoder(preprocess=None)
+    ladder = QRDecoder(preprocess=args.steps, preprocess_budget_ms=args.budget)
+    by_condition = lambda sample: sample.params['condition']  # noqa: E731
+    print_comparison("condition", run(hard, plain, by_condition), run(hard, ladder, by_condition))
+    hard_stats = ladder.ladder.stats()
+
+    # Split the ordinary corpus by whether the plain pass decodes the image
+    decodes = {sample.name: set(sample.payloads) <= {symbol.data for symbol in plain.decode(sample.image)}
+               for sample in easy}
+    by_outcome = lambda sample: 'decoded' if decodes[sample.name] else 'missed'  # noqa: E731
+    print_comparison("ordinary", run(easy, plain, by_outcome), run(easy, ladder, by_outcome))
+
+    print_steps(hard_stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
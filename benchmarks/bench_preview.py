@@ -0,0 +1,142 @@
+"""
+Camera preview CPU benchmark
+
+Replays a 30 FPS camera feed in real time and measures the CPU time spent
+turning frames into preview images, comparing the original per-frame path
+(resize -> cvtColor -> Image.fromarray -> ImageTk.PhotoImage for every
+frame) with PreviewRenderer (frames coalesced, rendered at the preview rate
+into reused buffers and pasted into one PhotoImage).
+
+Decoding is not included. Without a display the Tk step is skipped and
+only the conversion work is measured.
+
+Usage:
+    python benchmarks/bench_preview.py [--seconds S] [--fps F] [--preview-fps P]
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qriftly.preview import PREVIEW_FPS, PREVIEW_SIZE, PreviewRenderer  # noqa: E402
+
+SIZES = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+
+
+def open_tk():
+    """A hidden Tk root and label, or None without a display"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    label = tk.Label(root)
+    return root, label
+
+
+def run_legacy(frames, fps: float, seconds: float, tk_display):
+    """Every frame converted and handed to Tk, as camera_loop used to"""
+    if tk_display:
+        from PIL import ImageTk
+        root, label = tk_display
+    shown = 0
+    for tick, frame in feed(frames, fps, seconds):
+        display_frame = cv2.resize(frame, PREVIEW_SIZE)
+        frame_rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
+        image = Image.fromarray(frame_rgb)
+        if tk_display:
+            photo = ImageTk.PhotoImage(image)
+            label.config(image=photo)
+            label.image = photo
+            root.update_idletasks()
+        shown += 1
+    return shown
+
+
+def run_renderer(frames, fps: float, seconds: float, preview_fps: float, tk_display):
+    """Frames offered to a PreviewRenderer from a capture thread; redraws run here"""
+    requests = queue.Queue()
+    renderer = PreviewRenderer(lambda delay: requests.put(time.perf_counter() + delay),
+                               max_fps=preview_fps)
+    if tk_display:
+        from PIL import ImageTk
+        root, label = tk_display
+        photo = ImageTk.PhotoImage(renderer.image)
+        label.config(image=photo)
+
+    capture = threading.Thread(target=lambda: [renderer.offer(frame)
+                                               for tick, frame in feed(frames, fps, seconds)])
+    capture.start()
+    # Stands in for the Tk event loop running root.after callbacks
+    while capture.is_alive() or not requests.empty():
+        try:
+            due = requests.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        time.sleep(max(0.0, due - time.perf_counter()))
+        image = renderer.render()
+        if tk_display and image is not None:
+            photo.paste(image)
+            root.update_idletasks()
+    capture.join()
+    return renderer.rendered
+
+
+def feed(frames, fps: float, seconds: float):
+    """Yield frames at ``fps`` in real time; sleeping costs no CPU"""
+    start = time.perf_counter()
+    for tick in range(int(seconds * fps)):
+        delay = start + tick / fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield tick, frames[tick % len(frames)]
+
+
+def cpu_percent(func, *args):
+    """(CPU % of one core, frames shown) while ``func`` replays the feed"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    shown = func(*args)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return 100.0 * cpu / wall, shown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--fps', type=float, default=30.0, help="Camera frame rate")
+    parser.add_argument('--preview-fps', type=float, default=PREVIEW_FPS)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)  # Comparable CPU figures across machines
+    tk_display = open_tk()
+    print(f"Tk display: {'yes' if tk_display else 'no (conversion only)'}")
+
+    rng = np.random.default_rng(0)
+    print(f"{'input':<8}{'path':<26}{'CPU %':>8}{'frames shown':>14}")
+    for label, (width, height) in SIZES.items():
+        frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        cases = [
+            ("before (every frame)", run_legacy, (frames, args.fps, args.seconds, tk_display)),
+            (f"after ({args.preview_fps:g} FPS preview)", run_renderer,
+             (frames, args.fps, args.seconds, args.preview_fps, tk_display)),
+        ]
+        for name, func, func_args in cases:
+            percent, shown = cpu_percent(func, *func_args)
+            print(f"{label:<8}{name:<26}{percent:>8.1f}{shown:>14}")
+
+
+if __name__ == "__main__":
+    main()
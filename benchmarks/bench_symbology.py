@@ -0,0 +1,122 @@
+"""
+Symbology profile benchmark
+
+Decodes a reproducible mix of QR codes, EAN-13 and Code 128 barcodes and
+blank clutter (see corpus.generate_symbology_corpus) once per symbology
+profile, and reports throughput, latency, the codes found per symbol type
+and any results of a type the profile should not return.
+
+zbar reads every type in the corpus; without it (pyzbar not installed or
+libzbar missing) only OpenCV's QR and EAN/UPC detectors are measured, and
+Code 128 is never found.
+
+Usage:
+    python benchmarks/bench_symbology.py [--count N] [--seed S] [--profiles qr logistics]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_decoder import percentile  # noqa: E402
+from corpus import IMAGE_SIZES, generate_symbology_corpus  # noqa: E402
+from qriftly.backends import SYMBOLOGY_PROFILES, backend_names, cascade_order, get_backend  # noqa: E402
+from qriftly.engine import QRDecoder  # noqa: E402
+
+# Untimed decodes per profile before measuring, so detector setup is excluded
+WARMUP_IMAGES = 4
+
+
+def run_profile(samples, profile: str, backend: str) -> dict:
+    """Decode every sample with one profile and tally speed and results per kind"""
+    decoder = QRDecoder(backend=backend, symbology=profile)
+    allowed = SYMBOLOGY_PROFILES[profile]
+    for sample in samples[:WARMUP_IMAGES]:
+        decoder.decode(sample.image, use_cache=False)
+
+    latencies: List[float] = []
+    expected: Dict[str, int] = defaultdict(int)
+    decoded: Dict[str, int] = defaultdict(int)
+    unexpected = 0
+    false_positives = 0
+    start = time.perf_counter()
+    for sample in samples:
+        begin = time.perf_counter()
+        symbols = decoder.decode(sample.image, use_cache=False)
+        latencies.append((time.perf_counter() - begin) * 1000.0)
+
+        kind = sample.params['kind']
+        found = {symbol.data for symbol in symbols}
+        expected[kind] += len(sample.payloads)
+        decoded[kind] += len(found & set(sample.payloads))
+        false_positives += len(found - set(sample.payloads))
+        if allowed is not None:
+            unexpected += sum(symbol.symbol_type not in allowed for symbol in symbols)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'profile': profile,
+        'backends': [b.name for b in cascade_order(symbologies=decoder.symbologies)]
+        if backend == 'cascade' else [backend],
+        'images_per_s': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'expected': dict(expected),
+        'decoded': dict(decoded),
+        'unexpected_types': unexpected,
+        'false_positives': false_positives,
+    }
+
+
+def print_report(results: List[dict], kinds: List[str]):
+    print(f"\n{'profile':<11}{'img/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+          + "".join(f"{kind:>10}" for kind in kinds) + f"{'wrong type':>12}{'false +':>9}  backends")
+    for result in results:
+        found = "".join(f"{result['decoded'].get(kind, 0):>6}/{result['expected'].get(kind, 0):<3}"
+                        for kind in kinds)
+        print(f"{result['profile']:<11}{result['images_per_s']:>8.1f}{result['p50_ms']:>9.2f}"
+              f"{result['p95_ms']:>9.2f}{found}{result['unexpected_types']:>12}"
+              f"{result['false_positives']:>9}  {', '.join(result['backends'])}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="QRiftly symbology profile benchmark")
+    parser.add_argument('--count', type=int, default=120, help="Corpus size (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=1234, help="Corpus seed (default: %(default)s)")
+    parser.add_argument('--size', choices=list(IMAGE_SIZES), default='1280x720',
+                        help="Image size (default: %(default)s)")
+    parser.add_argument('--profiles', nargs='+', choices=list(SYMBOLOGY_PROFILES),
+                        default=list(SYMBOLOGY_PROFILES), help="Profiles to compare (default: all)")
+    parser.add_argument('--backend', choices=backend_names(), default='cascade',
+                        help="Decoder backend (default: %(default)s)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    print(f"Generating corpus (count={args.count}, seed={args.seed}, size={args.size})...")
+    samples = list(generate_symbology_corpus(args.count, args.seed, args.size))
+    kinds = list(dict.fromkeys(sample.params['kind'] for sample in samples))
+    if not get_backend('pyzbar').available():
+        print("pyzbar is unavailable: measuring the OpenCV backends only")
+
+    results = []
+    for profile in args.profiles:
+        try:
+            results.append(run_profile(samples, profile, args.backend))
+        except (ValueError, RuntimeError) as e:
+            print(f"{profile}: skipped ({e})")
+    print_report(results, kinds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
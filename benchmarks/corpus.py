@@ -0,0 +1,354 @@
+"""
+Synthetic QR corpus for decoder benchmarks
+
+Generates a reproducible set of test images with the ``qrcode`` package
+from requirements.txt. Every sample varies the QR version, error-correction
+level, module size, rotation, blur, noise, JPEG quality and number of codes
+per image, and records the payloads it contains so decode accuracy can be
+scored.
+"""
+
+import json
+import os
+import random
+import string
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import qrcode
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+
+VERSIONS = (1, 3, 5, 10, 15, 20)
+ERROR_LEVELS = {'L': ERROR_CORRECT_L, 'M': ERROR_CORRECT_M, 'Q': ERROR_CORRECT_Q, 'H': ERROR_CORRECT_H}
+MODULE_SIZES = (2, 3, 4, 6, 8)
+ROTATIONS = (0, 0, 5, 15, 30, 45, 90)
+BLUR_SIGMAS = (0.0, 0.0, 0.8, 1.5, 2.5)
+NOISE_LEVELS = (0.0, 0.0, 6.0, 12.0, 24.0)
+JPEG_QUALITIES = (None, None, 90, 60, 30)
+CODES_PER_IMAGE = (1, 1, 1, 2, 3, 4)
+IMAGE_SIZES = {
+    '640x480': (640, 480),
+    '1280x720': (1280, 720),
+    '1920x1080': (1920, 1080),
+    '3840x2160': (3840, 2160),
+}
+
+
+# EAN-13 digit patterns (1 = bar): L and R sets; G is R reversed
+_EAN_L = ('0001101', '0011001', '0010011', '0111101', '0100011',
+          '0110001', '0101111', '0111011', '0110111', '0001011')
+_EAN_R = tuple(pattern.translate(str.maketrans('01', '10')) for pattern in _EAN_L)
+_EAN_G = tuple(pattern[::-1] for pattern in _EAN_R)
+# L/G parity of the left half, selected by the first digit
+_EAN_PARITY = ('LLLLLL', 'LLGLGG', 'LLGGLG', 'LLGGGL', 'LGLLGG',
+               'LGGLLG', 'LGGGLL', 'LGLGLG', 'LGLGGL', 'LGGLGL')
+
+# Code 128 bar/space widths of symbol values 0-106 (106 is the stop code)
+_CODE128_WIDTHS = (
+    '212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 221312 231212 '
+    '112232 122132 122231 113222 123122 123221 223211 221132 221231 213212 223112 312131 '
+    '311222 321122 321221 312212 322112 322211 212123 212321 232121 111323 131123 131321 '
+    '112313 132113 132311 211313 231113 231311 112133 112331 132131 113123 113321 133121 '
+    '313121 211331 231131 213113 213311 213131 311123 311321 331121 312113 312311 332111 '
+    '314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 112412 122114 '
+    '122411 142112 142211 241211 221114 413111 241112 134111 111242 121142 121241 114212 '
+    '124112 124211 411212 421112 421211 212141 214121 412121 111143 111341 131141 114113 '
+    '114311 411113 411311 113141 114131 311141 411131 211412 211214 211232 2331112').split()
+_CODE128_START_B = 104
+
+# Kinds of 1D samples in the mixed symbology corpus, with their zbar type names
+BARCODE_KINDS = {'ean13': 'EAN13', 'code128': 'CODE128'}
+
+
+class Sample:
+    """One corpus image with the payloads it is expected to contain"""
+
+    __slots__ = ('name', 'image', 'payloads', 'params')
+
+    def __init__(self, name: str, image: np.ndarray, payloads: List[str], params: dict):
+        self.name = name
+        self.image = image
+        self.payloads = payloads
+        self.params = params
+
+
+def _random_payload(rng: random.Random) -> str:
+    length = rng.randint(8, 48)
+    alphabet = string.ascii_letters + string.digits
+    body = ''.join(rng.choice(alphabet) for _ in range(length))
+    return rng.choice(('https://example.com/', 'QRIFTLY-', 'WIFI:S:', '')) + body
+
+
+def render_code(payload: str, version: int, error_level: str, module_size: int,
+                rotation: float) -> np.ndarray:
+    """Render a single QR code as a gray array, rotated on a white background"""
+    qr = qrcode.QRCode(version=version, error_correction=ERROR_LEVELS[error_level],
+                       box_size=module_size, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)  # ``version`` is a minimum; grow if the payload needs it
+    code = np.asarray(qr.make_image(fill_color="black", back_color="white").convert('L'))
+
+    if rotation:
+        height, width = code.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), rotation, 1.0)
+        cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+        new_width = int(height * sin + width * cos)
+        new_height = int(height * cos + width * sin)
+        matrix[0, 2] += new_width / 2 - width / 2
+        matrix[1, 2] += new_height / 2 - height / 2
+        code = cv2.warpAffine(code, matrix, (new_width, new_height),
+                              flags=cv2.INTER_LINEAR, borderValue=255)
+    return code
+
+
+def ean13_digits(digits: str) -> str:
+    """Append the check digit to 12 EAN-13 digits"""
+    values = [int(digit) for digit in digits]
+    weighted = sum(value * (3 if index % 2 else 1) for index, value in enumerate(values))
+    return digits + str((10 - weighted % 10) % 10)
+
+
+def _render_bars(bits: str, module_size: int, height: int) -> np.ndarray:
+    """Draw a 1D module string (1 = bar) with a 10-module quiet zone"""
+    quiet = '0' * 10
+    row = np.array([0 if bit == '1' else 255 for bit in quiet + bits + quiet], dtype=np.uint8)
+    return np.tile(np.repeat(row, module_size), (height, 1))
+
+
+def render_ean13(digits: str, module_size: int = 3, height: int = 120) -> np.ndarray:
+    """Render a 13-digit EAN-13 code (check digit included) as a gray array"""
+    values = [int(digit) for digit in digits]
+    left = ''.join((_EAN_L if parity == 'L' else _EAN_G)[value]
+                   for parity, value in zip(_EAN_PARITY[values[0]], values[1:7]))
+    right = ''.join(_EAN_R[value] for value in values[7:])
+    return _render_bars('101' + left + '01010' + right + '101', module_size, height)
+
+
+def render_code128(text: str, module_size: int = 2, height: int = 120) -> np.ndarray:
+    """Render printable ASCII text as a Code 128 (code set B) gray array"""
+    values = [_CODE128_START_B] + [ord(char) - 32 for char in text]
+    check = (values[0] + sum(index * value for index, value in enumerate(values[1:], 1))) % 103
+    bits = []
+    for value in values + [check, 106]:
+        for index, width in enumerate(_CODE128_WIDTHS[value]):
+            bits.append(('1' if index % 2 == 0 else '0') * int(width))
+    return _render_bars(''.join(bits), module_size, height)
+
+
+def _place_codes(canvas: np.ndarray, codes: List[np.ndarray]) -> int:
+    """Paste codes into separate grid cells; returns how many fitted"""
+    height, width = canvas.shape
+    columns = min(len(codes), 2)
+    rows = (len(codes) + columns - 1) // columns
+    cell_w, cell_h = width // columns, height // rows
+
+    placed = 0
+    for index, code in enumerate(codes):
+        code_h, code_w = code.shape
+        if code_h > cell_h or code_w > cell_w:
+            continue
+        row, column = divmod(index, columns)
+        y = row * cell_h + (cell_h - code_h) // 2
+        x = column * cell_w + (cell_w - code_w) // 2
+        canvas[y:y + code_h, x:x + code_w] = code
+        placed += 1
+    return placed
+
+
+def _degrade(image: np.ndarray, rng: np.random.Generator, blur: float,
+             noise: float, jpeg_quality: Optional[int]) -> np.ndarray:
+    if blur:
+        image = cv2.GaussianBlur(image, (0, 0), blur)
+    if noise:
+        noisy = image.astype(np.float32) + rng.normal(0.0, noise, image.shape)
+        image = np.clip(noisy, 0, 255).astype(np.uint8)
+    if jpeg_quality:
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        if ok:
+            image = cv2.imdecode(encoded, cv2.IMREAD_UNCHANGED)
+    return image
+
+
+def generate_corpus(count: int = 200, seed: int = 1234,
+                    sizes: Optional[List[str]] = None) -> Iterator[Sample]:
+    """
+    Yield ``count`` reproducible samples.
+
+    The same ``seed`` always yields the same images, so results from
+    different runs (and different commits) are directly comparable.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    size_names = sizes or list(IMAGE_SIZES)
+
+    produced = 0
+    attempts = 0
+    while produced < count and attempts < count * 10:
+        attempts += 1
+        size_name = rng.choice(size_names)
+        width, height = IMAGE_SIZES[size_name]
+        params = {
+            'size': size_name,
+            'version': rng.choice(VERSIONS),
+            'error_level': rng.choice(list(ERROR_LEVELS)),
+            'module_size': rng.choice(MODULE_SIZES),
+            'rotation': rng.choice(ROTATIONS),
+            'blur': rng.choice(BLUR_SIGMAS),
+            'noise': rng.choice(NOISE_LEVELS),
+            'jpeg_quality': rng.choice(JPEG_QUALITIES),
+            'codes': rng.choice(CODES_PER_IMAGE),
+        }
+
+        payloads = []
+        codes = []
+        for _ in range(params['codes']):
+            payload = _random_payload(rng)
+            while payload in payloads:
+                payload = _random_payload(rng)
+            payloads.append(payload)
+            codes.append(render_code(payload, params['version'], params['error_level'],
+                                     params['module_size'], params['rotation']))
+
+        background = rng.randint(200, 255)
+        canvas = np.full((height, width), background, dtype=np.uint8)
+        if _place_codes(canvas, codes) != len(codes):
+            continue  # Codes too large for this canvas; draw new parameters
+
+        gray = _degrade(canvas, np_rng, params['blur'], params['noise'], params['jpeg_quality'])
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)  # Decode from BGR like camera frames
+
+        yield Sample(f"sample_{produced:05d}", image, payloads, params)
+        produced += 1
+
+
+def generate_symbology_corpus(count: int = 120, seed: int = 1234,
+                              size: str = '1280x720') -> Iterator[Sample]:
+    """
+    Yield a reproducible mix of QR, EAN-13 and Code 128 images plus blank
+    clutter, for comparing symbology profiles.
+
+    ``params['symbol_type']`` holds the zbar type name of the expected
+    code ('' for clutter).
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    width, height = IMAGE_SIZES[size]
+    qr_samples = generate_corpus(count, seed, sizes=[size])
+    kinds = ('qr', 'ean13', 'code128', 'clutter')
+
+    for index in range(count):
+        kind = kinds[index % len(kinds)]
+        if kind == 'qr':
+            sample = next(qr_samples)
+            sample.params.update(kind=kind, symbol_type='QRCODE')
+            yield sample
+            continue
+
+        canvas = np.full((height, width), rng.randint(200, 255), dtype=np.uint8)
+        payloads = []
+        if kind == 'ean13':
+            # A leading 0 would make it a UPC-A code, which decoders report as such
+            payload = ean13_digits(rng.choice('123456789')
+                                   + ''.join(rng.choice(string.digits) for _ in range(11)))
+            code = render_ean13(payload, module_size=rng.choice((2, 3, 4)))
+            payloads.append(payload)
+        elif kind == 'code128':
+            payload = ''.join(rng.choice(string.ascii_uppercase + string.digits)
+                              for _ in range(rng.randint(6, 16)))
+            code = render_code128(payload, module_size=rng.choice((2, 3)))
+            payloads.append(payload)
+        else:
+            # Text-like strokes and boxes, so there is something to reject
+            code = np.full((height // 2, width // 2), 255, dtype=np.uint8)
+            for _ in range(40):
+                x, y = rng.randrange(code.shape[1]), rng.randrange(code.shape[0])
+                cv2.rectangle(code, (x, y), (x + rng.randint(4, 60), y + rng.randint(4, 30)),
+                              rng.randint(0, 120), rng.choice((1, 2, -1)))
+        _place_codes(canvas, [code])
+
+        gray = _degrade(canvas, np_rng, rng.choice((0.6, 0.8, 1.0)), rng.choice((0.0, 6.0)), None)
+        params = {'size': size, 'kind': kind,
+                  'symbol_type': BARCODE_KINDS.get(kind, '')}
+        yield Sample(f"{kind}_{index:05d}", cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), payloads, params)
+
+
+# Hard-image conditions for the preprocessing ladder benchmark
+HARD_CONDITIONS = ('glare', 'faded', 'shadow', 'blur', 'dark', 'skewed')
+
+
+def _harden(canvas: np.ndarray, condition: str, box: Tuple[int, int, int, int],
+            rng: random.Random) -> np.ndarray:
+    """Apply one hard-image condition to a float32 canvas holding a code at ``box``"""
+    height, width = canvas.shape
+    x, y, w, h = box
+    xx, yy = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+    if condition == 'glare':
+        # A blown-out highlight over part of the code, on a washed-out photo
+        cx, cy = x + w * rng.uniform(0.3, 0.7), y + h * rng.uniform(0.3, 0.7)
+        spot = 0.95 * np.exp(-((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * (w * 0.3) ** 2))
+        canvas = canvas * (1 - spot) + 255 * spot
+        return canvas * 0.5 + 60 + xx / width * 60
+    if condition == 'faded':
+        return 140 + canvas * 0.05 + (xx / width - 0.5) * 120
+    if condition == 'shadow':
+        return canvas * np.where(xx < x + w * rng.uniform(0.3, 0.7), 0.2, 1.0)
+    if condition == 'blur':
+        return cv2.GaussianBlur(canvas, (0, 0), 1.8)
+    if condition == 'dark':
+        return (255 - canvas) * 0.8 + 20
+    if condition == 'skewed':
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), rng.choice((-1, 1)) * rng.uniform(15, 40), 1.0)
+        return cv2.warpAffine(canvas, matrix, (width, height), borderValue=235)
+    raise ValueError(f"Unknown condition '{condition}'")
+
+
+def generate_hard_corpus(count: int = 60, seed: int = 1234, size: str = '1280x720',
+                         conditions: Optional[List[str]] = None) -> Iterator[Sample]:
+    """
+    Yield reproducible single-code images that the plain decode pass
+    mostly misses: glare, faded low-contrast prints, hard shadows, blur,
+    light-on-dark codes and skewed EAN-13 barcodes.
+
+    ``params['condition']`` names the condition; skewed samples carry
+    ``symbol_type`` EAN13, all others QRCODE.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    width, height = IMAGE_SIZES[size]
+    names = conditions or list(HARD_CONDITIONS)
+
+    for index in range(count):
+        condition = names[index % len(names)]
+        if condition == 'skewed':
+            payload = ean13_digits(rng.choice('123456789')
+                                   + ''.join(rng.choice(string.digits) for _ in range(11)))
+            code = render_ean13(payload, module_size=3, height=150)
+        else:
+            payload = _random_payload(rng)
+            code = render_code(payload, rng.choice((3, 5)), 'M', rng.choice((4, 5)), 0)
+
+        canvas = np.full((height, width), 235, dtype=np.uint8)
+        _place_codes(canvas, [code])
+        code_h, code_w = code.shape
+        box = ((width - code_w) // 2, (height - code_h) // 2, code_w, code_h)
+        hard = _harden(canvas.astype(np.float32), condition, box, rng)
+        hard = np.clip(hard + np_rng.normal(0.0, 3.0, hard.shape), 0, 255).astype(np.uint8)
+        params = {'size': size, 'condition': condition,
+                  'symbol_type': 'EAN13' if condition == 'skewed' else 'QRCODE'}
+        yield Sample(f"{condition}_{index:05d}", cv2.cvtColor(hard, cv2.COLOR_GRAY2BGR), [payload], params)
+
+
+def save_corpus(samples, directory: str) -> Tuple[int, str]:
+    """Write samples as PNG files plus a manifest.json; returns (count, manifest path)"""
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+    for sample in samples:
+        file_name = f"{sample.name}.png"
+        cv2.imwrite(os.path.join(directory, file_name), sample.image)
+        manifest.append({'file': file_name, 'payloads': sample.payloads, 'params': sample.params})
+
+    manifest_path = os.path.join(directory, 'manifest.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return len(manifest), manifest_path
@@ -13,7 +13,7 @@ if errorlevel 1 (
 
 :: Install dependencies
 echo 📦 Installing dependencies...
-pip install opencv-python pyzbar Pillow pyautogui numpy pyinstaller
+pip install opencv-python pyzbar Pillow pyautogui mss pypdfium2 numpy pyinstaller
 
 :: Clean previous builds
 if exist "dist" rmdir /s /q "dist"
@@ -22,7 +22,7 @@ if exist "*.spec" del "*.spec"
 
 :: Build executable
 echo 🔨 Building executable...
-pyinstaller --onefile --windowed --name "QRiftly" qr_scanner.py
+pyinstaller --onefile --windowed --name "QRiftly" --hidden-import mss --hidden-import pypdfium2 qr_scanner.py
 
 :: Check if build was successful
 if exist "dist\QRiftly.exe" (
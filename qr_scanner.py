@@ -1,21 +1,168 @@
-import cv2
-import numpy as np
-from pyzbar import pyzbar
-from PIL import Image, ImageTk
-import pyautogui
+import sys
+
+# Headless sub-commands (e.g. ``qr_scanner.py scan``) are dispatched before the
+# GUI imports so batch jobs never pay for loading tkinter, ImageTk or screen capture.
+if __name__ == "__main__" and len(sys.argv) > 1:
+    import multiprocessing
+    multiprocessing.freeze_support()  # Batch workers in the frozen executable
+    from qriftly.cli import COMMANDS, main as cli_main
+    if sys.argv[1] in COMMANDS:
+        sys.exit(cli_main(sys.argv[1:]))
+
+from PIL import ImageTk
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
-import threading
+from tkinter import ttk, filedialog, messagebox, simpledialog
+import tkinter.font as tkfont
 import time
 import webbrowser
 from typing import List, Tuple, Optional
 import os
-import sys
 import subprocess
 import re
 import xml.etree.ElementTree as ET
 from urllib.parse import unquote
 
+from qriftly.backends import SYMBOLOGY_PROFILES, backend_names
+from qriftly.cache import DecodeCache, default_cache_path
+from qriftly.camera import DEFAULT_DECODE_BUDGET_MS
+from qriftly.dedup import TemporalDeduplicator
+from qriftly.engine import QRDecoder
+from qriftly.history import ScanHistory
+from qriftly.jobs import JobCancelled, JobQueue
+from qriftly.multicam import MultiCameraPipeline, parse_sources
+from qriftly.preview import PREVIEW_FPS, PreviewRenderer
+from qriftly.payload import WifiPayload, detect_qr_type, is_url, parse_payload
+from qriftly.results import ResultRecord, ResultStore
+from qriftly.screen import grab_screen, list_monitors
+from qriftly.watch import DEFAULT_INTERVAL, ClipboardSource, ScreenSource, WatchThread
+from qriftly.sinks import open_sink, sink_format
+from qriftly.structured import StructuredAppendBuffer
+from qriftly.video import VIDEO_EXTENSIONS, VideoScanner, format_video_time
+
+# Most history matches shown for one search
+HISTORY_SEARCH_LIMIT = 1000
+
+# Time for the desktop to repaint after the window hides, before grabbing (ms)
+HIDE_SETTLE_MS = 150
+
+# Menu labels of the symbology profiles
+SYMBOLOGY_LABELS = {
+    'all': "All Types",
+    'qr': "QR Only (fastest)",
+    '2d': "2D Codes (QR, SQ Code, PDF417)",
+    'logistics': "Logistics (EAN/UPC, Code 128, ITF, DataBar)",
+}
+
+
+class ResultListView(ttk.Frame):
+    """
+    Scrollable one-row-per-result list backed by a ResultStore.
+
+    The Text widget only ever holds the rows that fit on screen; scrolling,
+    resizing and new results re-render that window from the store, so the
+    cost of an update does not depend on how many results exist.
+    """
+
+    def __init__(self, parent, store: ResultStore, format_row, on_select=None, **text_options):
+        super().__init__(parent)
+        self.store = store
+        self.format_row = format_row
+        self.on_select = on_select
+        self.first = 0  # Store index of the top visible row (0 = newest)
+        self.selected_seq = None
+        self._rendered: List[ResultRecord] = []
+        self._refresh_pending = False
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(self, wrap=tk.NONE, cursor='arrow', **text_options)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.tag_configure('selected', background='#3498db', foreground='white')
+        self.text.configure(state='disabled')
+        self._line_height = max(1, tkfont.Font(font=self.text.cget('font')).metrics('linespace'))
+
+        self.text.bind('<Configure>', lambda e: self.schedule_refresh())
+        self.text.bind('<MouseWheel>', self.on_mousewheel)
+        self.text.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.text.bind('<Button-5>', lambda e: self.scroll(3))
+        self.text.bind('<Button-1>', self.on_click)
+
+    def visible_rows(self) -> int:
+        padding = 2 * (self.text.winfo_pixels(self.text.cget('borderwidth'))
+                       + self.text.winfo_pixels(self.text.cget('pady')))
+        return max(1, (self.text.winfo_height() - padding) // self._line_height)
+
+    def schedule_refresh(self):
+        """Coalesce bursts of updates into one render when Tk is idle"""
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def notify_added(self):
+        """A result was appended; keep a scrolled-down view on the same rows"""
+        if self.first:
+            self.first += 1
+        self.schedule_refresh()
+
+    def refresh(self):
+        """Format and show only the rows currently in view"""
+        self._refresh_pending = False
+        total = len(self.store)
+        rows = self.visible_rows()
+        self.first = max(0, min(self.first, total - rows))
+        self._rendered = self.store.rows(self.first, self.first + rows)
+
+        self.text.configure(state='normal')
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', "\n".join(self.format_row(record) for record in self._rendered))
+        for line, record in enumerate(self._rendered, 1):
+            if record.seq == self.selected_seq:
+                self.text.tag_add('selected', f"{line}.0", f"{line}.end")
+        self.text.configure(state='disabled')
+
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, delta: int):
+        self.first = max(0, self.first + delta)
+        self.refresh()
+        return 'break'
+
+    def on_scrollbar(self, action, *args):
+        """Translate scrollbar commands into a new first row"""
+        if action == 'moveto':
+            self.first = int(float(args[0]) * len(self.store))
+            self.refresh()
+        elif action == 'scroll':
+            step = self.visible_rows() if args[1] == 'pages' else 1
+            self.scroll(int(args[0]) * step)
+
+    def on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_click(self, event):
+        """Select the clicked row"""
+        line = int(self.text.index(f"@{event.x},{event.y}").split('.')[0])
+        if 1 <= line <= len(self._rendered):
+            record = self._rendered[line - 1]
+            self.selected_seq = record.seq
+            self.refresh()
+            if self.on_select:
+                self.on_select(record)
+        return 'break'
+
+    def clear_selection(self):
+        self.selected_seq = None
+        self.first = 0
+        self.schedule_refresh()
+
+    def show(self, store: ResultStore):
+        """Display a different store, e.g. history search results"""
+        self.store = store
+        self.clear_selection()
+
 
 class QRiftlyScanner:
     """
@@ -32,11 +179,38 @@ class QRiftlyScanner:
     def __init__(self):
         self.root = tk.Tk()
         self.current_theme = "dark"  # Default theme
+        try:
+            self.decode_cache = DecodeCache(path=default_cache_path())  # Skip re-decoding unchanged images
+        except Exception as e:
+            print(f"Decode cache unavailable: {e}")
+            self.decode_cache = DecodeCache()
+        self.decoder = QRDecoder(cache=self.decode_cache)
+        self.ladder = self.decoder.ladder  # Kept while enhancement is switched off
+        self.result_sink = None  # Optional JSON Lines stream of every result
+        self.results = ResultStore()  # Source of truth for the results list
+        try:
+            self.history = ScanHistory()  # Persistent, searchable record of every result
+        except Exception as e:
+            print(f"History unavailable: {e}")
+            self.history = None
+        self._search_after = None
+        self.search_job = None  # History search in flight
+        # Every scan entry point runs on this pool; callbacks come back via root.after
+        self.jobs = JobQueue(dispatch=self.dispatch_to_ui, on_change=self.update_job_status)
+        self.watchers = {}  # Active WatchThreads by kind ('clipboard', 'screen')
+        self.watch_interval = DEFAULT_INTERVAL
         self.setup_ui()
-        self.camera = None
+        self.camera = None  # MultiCameraPipeline while the camera is running
+        self.camera_sources = [0]  # Device indices, video files and stream URLs
+        self.preview_source = None  # Source shown in the camera window
         self.camera_running = False
-        self.camera_thread = None
         self.camera_window = None
+        self.camera_continuous = False  # Keep scanning after the first hit
+        self.camera_dedup = None  # Suppresses repeats in continuous mode
+        self.decode_budget_ms = DEFAULT_DECODE_BUDGET_MS  # Live decode latency budget
+        self.preview = None  # PreviewRenderer while the camera is running
+        self.preview_fps = PREVIEW_FPS  # Preview refresh rate, independent of decoding
+        self.sequences = StructuredAppendBuffer()  # Structured-append parts awaiting the rest
         
     def setup_ui(self):
         """Initialize the main user interface with responsive modern styling"""
@@ -199,22 +373,43 @@ class QRiftlyScanner:
         self.progress_bar = ttk.Progressbar(status_frame, variable=self.progress_var, 
                                           length=100, mode='indeterminate')
         self.progress_bar.pack(side=tk.RIGHT)
+
+        # Cancel every background scan in flight
+        self.cancel_jobs_btn = ttk.Button(status_frame, text="⏹️ Cancel",
+                                          command=self.cancel_jobs, state='disabled',
+                                          style='Secondary.TButton')
+        self.cancel_jobs_btn.pack(side=tk.RIGHT, padx=(0, 10))
         
         # Results section
         results_frame = ttk.LabelFrame(main_frame, text="🎉 Scan Results & Quick Actions", padding="15")
         results_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
-        
-        # Results text area
-        self.results_text = scrolledtext.ScrolledText(
-            results_frame, 
-            height=12, 
+
+        # History search box (empty shows this session's results)
+        search_frame = ttk.Frame(results_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 8))
+        ttk.Label(search_frame, text="🔎 Search history:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Button(search_frame, text="✖", width=3,
+                   command=lambda: self.search_var.set("")).pack(side=tk.LEFT)
+        self.search_var.trace_add('write', lambda *args: self.schedule_history_search())
+        if not self.history:
+            self.search_entry.config(state='disabled')
+        
+        # Results list (renders only the visible rows of self.results)
+        self.results_view = ResultListView(
+            results_frame,
+            self.results,
+            self.format_result_row,
+            on_select=self.select_result,
+            height=12,
             width=70,
             font=('Consolas', 10),
-            wrap=tk.WORD,
             bg='#f8f9fa',
             fg='#2d3436'
         )
-        self.results_text.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.results_view.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
         # Action buttons
         buttons_frame = ttk.Frame(results_frame)
@@ -281,12 +476,61 @@ class QRiftlyScanner:
         self.status_label.config(text=colorful_message)
         
         if show_progress:
+            self.progress_bar.config(mode='indeterminate')
             self.progress_bar.start(15)  # Faster progress animation
         else:
             self.progress_bar.stop()
-        
-        # Auto-update the UI
-        self.root.update_idletasks()
+
+    def dispatch_to_ui(self, fn, *args):
+        """Run ``fn(*args)`` on the Tk main loop (called from worker threads)"""
+        try:
+            self.root.after(0, fn, *args)
+        except (RuntimeError, tk.TclError):
+            pass  # Window already destroyed
+
+    def update_job_status(self, queue):
+        """Reflect the background jobs in flight in the progress bar"""
+        jobs = queue.active
+        self.cancel_jobs_btn.config(state='normal' if jobs else 'disabled')
+        if not jobs:
+            self.progress_bar.stop()
+            self.progress_var.set(0)
+            return
+
+        if any(job.progress > 0 for job in jobs):
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', maximum=1.0)
+            self.progress_var.set(sum(job.progress for job in jobs) / len(jobs))
+        elif str(self.progress_bar.cget('mode')) != 'indeterminate':
+            self.progress_bar.config(mode='indeterminate')
+            self.progress_bar.start(15)
+
+    def show_job_progress(self, job):
+        """Show a running job's latest progress message"""
+        label = f" ({len(self.jobs.active)} jobs running)" if len(self.jobs.active) > 1 else ""
+        self.status_label.config(text=f"⏳ {job.message}{label}")
+
+    def cancel_jobs(self):
+        """Cancel every background scan that is queued or running"""
+        self.jobs.cancel_all()
+        self.update_status("Cancelling background scans...", emoji="⏹️")
+
+    def on_job_cancelled(self):
+        self.root.deiconify()  # A cancelled screen capture may have hidden the window
+        self.update_status("Scan cancelled", emoji="⏹️")
+
+    def show_scan_results(self, found, empty_message: str = "No QR codes found in image"):
+        """Add the (source, codes) pairs returned by a scan job"""
+        total = 0
+        for source, qr_codes in found:
+            for qr_data in qr_codes:
+                self.add_result(qr_data, source)
+            total += len(qr_codes)
+
+        if total:
+            self.update_status(f"Found {total} QR code(s)! ✅", emoji="🎉")
+        else:
+            self.update_status(empty_message, emoji="😕")
         
     def show_help(self):
         """Show help dialog with usage instructions"""
@@ -294,7 +538,7 @@ class QRiftlyScanner:
 
 🔍 SCANNING METHODS:
 • Screenshot: Capture your screen to scan QR codes
-• File Upload: Load image files (PNG, JPG, etc.)
+• File Upload: Load images (PNG, JPG, multi-page TIFF, GIF) and PDFs
 • Live Camera: Real-time scanning via webcam
 
 📱 FEATURES:
@@ -362,8 +606,8 @@ Made with ❤️ by Anubhav Mishra"""
                             ('pressed', '#2c3e50')])
         
         # Update text widgets
-        if hasattr(self, 'results_text'):
-            self.results_text.configure(bg='#34495e', fg='#ecf0f1', 
+        if hasattr(self, 'results_view'):
+            self.results_view.text.configure(bg='#34495e', fg='#ecf0f1', 
                                        insertbackground='#ecf0f1',
                                        selectbackground='#3498db')
     
@@ -405,8 +649,8 @@ Made with ❤️ by Anubhav Mishra"""
                             ('pressed', '#ced4da')])
         
         # Update text widgets
-        if hasattr(self, 'results_text'):
-            self.results_text.configure(bg='white', fg='#2c3e50', 
+        if hasattr(self, 'results_view'):
+            self.results_view.text.configure(bg='white', fg='#2c3e50', 
                                        insertbackground='#2c3e50',
                                        selectbackground='#007acc')
 
@@ -498,52 +742,84 @@ Made with ❤️ by Anubhav Mishra"""
         close_btn.pack(side=tk.LEFT, padx=5)
         
     def add_result(self, qr_data: str, source: str = ""):
-        """Add a QR scan result to the results area with improved formatting"""
-        timestamp = time.strftime("%H:%M:%S")
-        qr_type = self.detect_qr_type(qr_data)
-        
-        # Create formatted result with emojis and better structure
-        result_text = f"🕐 {timestamp} | {source}\n"
-        result_text += f"📋 Content: {qr_data}\n"
-        result_text += f"🏷️  Type: {qr_type}\n"
-        
-        # Add type-specific information
-        if qr_type == "WiFi Configuration":
-            wifi_config = self.parse_wifi_qr(qr_data)
-            if wifi_config:
-                result_text += f"📶 Network: {wifi_config['ssid']}\n"
-                result_text += f"🔐 Security: {wifi_config['security']}\n"
-                result_text += f"👁️  Hidden: {'Yes' if wifi_config['hidden'] else 'No'}\n"
-        elif qr_type == "URL":
-            result_text += f"🌐 Ready to open in browser\n"
-        elif qr_type == "Email":
-            result_text += f"📧 Ready to open in email client\n"
-        elif qr_type == "Phone Number":
-            result_text += f"📞 Phone number detected\n"
-            
-        result_text += "=" * 60 + "\n\n"
-        
-        # Insert at beginning for newest first
-        self.results_text.insert(tk.INSERT, result_text)
-        self.results_text.see(tk.INSERT)
-        
-        # Enable buttons
+        """Record a QR scan result and show it at the top of the results list"""
+        payload = parse_payload(qr_data)  # Parsed once; memoized for the calls below
+        qr_type = payload.label
+        record = self.results.append(qr_data, qr_type, source)
+        if self.history:
+            self.history.add(qr_data, qr_type, source)
+        if self.results_view.store is self.results:
+            self.results_view.selected_seq = record.seq
+            self.results_view.notify_added()
+
         self.copy_btn.config(state='normal')
-        if self.is_url(qr_data):
-            self.open_url_btn.config(state='normal')
-        
-        # Check if it's a WiFi QR code
-        wifi_config = self.parse_wifi_qr(qr_data)
+        self.set_active_result(qr_data)
+
+    def select_result(self, record: ResultRecord):
+        """Make a result picked from the list the target of the action buttons"""
+        self.set_active_result(record.payload)
+
+    def set_active_result(self, qr_data: str):
+        """Enable the actions that apply to ``qr_data``"""
+        self.open_url_btn.config(state='normal' if self.is_url(qr_data) else 'disabled')
+
+        payload = parse_payload(qr_data)
+        wifi_config = payload if isinstance(payload, WifiPayload) and payload.ssid else None
+        self.connect_wifi_btn.config(state='normal' if wifi_config else 'disabled')
         if wifi_config:
-            self.connect_wifi_btn.config(state='normal')
             self.last_wifi_config = wifi_config
-            
+
         # Store for actions
         self.last_qr_data = qr_data
 
+    def format_result_row(self, record: ResultRecord) -> str:
+        """One-line summary of a result for the results list"""
+        timestamp = time.strftime("%H:%M:%S", time.localtime(record.timestamp))
+        content = record.payload[:200].replace("\r", "").replace("\n", " ⏎ ")
+        return f"🕐 {timestamp} | {record.source} | 🏷️ {record.qr_type} | {content}"
+
+    def format_result_block(self, record: ResultRecord) -> str:
+        """Full multi-line description of a result, as copied to the clipboard"""
+        timestamp = time.strftime("%H:%M:%S", time.localtime(record.timestamp))
+        result_text = f"🕐 {timestamp} | {record.source}\n"
+        result_text += f"📋 Content: {record.payload}\n"
+        result_text += f"🏷️  Type: {record.qr_type}\n"
+
+        # Add type-specific information
+        payload = parse_payload(record.payload)
+        if payload.kind == 'wifi':
+            if payload.ssid:
+                result_text += f"📶 Network: {payload.ssid}\n"
+                result_text += f"🔐 Security: {payload.security}\n"
+                result_text += f"👁️  Hidden: {'Yes' if payload.hidden else 'No'}\n"
+        elif payload.kind in ('vcard', 'mecard'):
+            if payload.name:
+                result_text += f"👤 Name: {payload.name}\n"
+            for phone in payload.phones:
+                result_text += f"📞 Phone: {phone}\n"
+            for email in payload.emails:
+                result_text += f"📧 Email: {email}\n"
+        elif payload.kind == 'event':
+            result_text += f"📅 Event: {payload.summary} ({payload.start or '?'})\n"
+        elif payload.kind == 'geo' and payload.latitude is not None:
+            result_text += f"📍 Position: {payload.latitude}, {payload.longitude}\n"
+        elif payload.kind == 'epc':
+            amount = f"{payload.amount:.2f} {payload.currency}" if payload.amount is not None else "open amount"
+            result_text += f"💶 Pay {amount} to {payload.name} ({payload.iban})\n"
+        elif record.qr_type == "URL":
+            result_text += f"🌐 Ready to open in browser\n"
+        elif record.qr_type == "Email":
+            result_text += f"📧 Ready to open in email client\n"
+        elif record.qr_type == "Phone Number":
+            result_text += f"📞 Phone number detected\n"
+
+        return result_text + "=" * 60 + "\n"
+
     def clear_results(self):
         """Clear all scan results and reset buttons"""
-        self.results_text.delete('1.0', tk.END)
+        self.results.clear()
+        self.search_var.set("")
+        self.results_view.show(self.results)
         self.copy_btn.config(state='disabled')
         self.open_url_btn.config(state='disabled')
         self.connect_wifi_btn.config(state='disabled')
@@ -560,7 +836,11 @@ Made with ❤️ by Anubhav Mishra"""
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="📸 Screenshot Scan", command=self.scan_screenshot, accelerator="Ctrl+S")
+        self.monitor_menu = tk.Menu(file_menu, tearoff=0, postcommand=self.refresh_monitor_menu)
+        file_menu.add_cascade(label="🖥️ Scan Monitor", menu=self.monitor_menu)
+        file_menu.add_command(label="✂️ Scan Screen Region", command=self.scan_region, accelerator="Ctrl+R")
         file_menu.add_command(label="📂 Open Image File", command=self.scan_file, accelerator="Ctrl+O")
+        file_menu.add_command(label="🎞️ Scan Video File...", command=self.scan_video)
         file_menu.add_separator()
         file_menu.add_command(label="🗑️ Clear Results", command=self.clear_results, accelerator="Ctrl+L")
         file_menu.add_separator()
@@ -570,7 +850,44 @@ Made with ❤️ by Anubhav Mishra"""
         tools_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Tools", menu=tools_menu)
         tools_menu.add_command(label="📷 Toggle Camera", command=self.toggle_camera, accelerator="Ctrl+C")
+        tools_menu.add_command(label="🎥 Camera Sources...", command=self.set_camera_sources)
         tools_menu.add_command(label="📋 Copy All Results", command=self.copy_results, accelerator="Ctrl+A")
+        tools_menu.add_command(label="📝 Stream Results to File...", command=self.toggle_result_stream)
+        tools_menu.add_command(label="⏱️ Camera Decode Budget...", command=self.set_decode_budget)
+        tools_menu.add_command(label="🖼️ Camera Preview FPS...", command=self.set_preview_fps)
+        tools_menu.add_command(label="🗃️ Results Limit...", command=self.set_results_limit)
+        tools_menu.add_command(label="⚡ Decode Cache Stats...", command=self.show_cache_stats)
+        self.enhance_var = tk.BooleanVar(value=self.decoder.ladder is not None)
+        tools_menu.add_checkbutton(label="🪄 Enhance Hard Images", variable=self.enhance_var,
+                                   command=self.toggle_enhance)
+        tools_menu.add_command(label="🪜 Enhancement Stats...", command=self.show_ladder_stats)
+        tools_menu.add_separator()
+
+        # Watch mode: scan automatically whenever the clipboard or screen changes
+        self.watch_clipboard_var = tk.BooleanVar(value=False)
+        self.watch_screen_var = tk.BooleanVar(value=False)
+        tools_menu.add_checkbutton(label="👁️ Watch Clipboard", variable=self.watch_clipboard_var,
+                                   command=self.toggle_clipboard_watch)
+        tools_menu.add_checkbutton(label="👁️ Watch Screen Region...", variable=self.watch_screen_var,
+                                   command=self.toggle_screen_watch)
+        tools_menu.add_command(label="⏲️ Watch Interval...", command=self.set_watch_interval)
+        self.continuous_var = tk.BooleanVar(value=False)
+        tools_menu.add_checkbutton(label="🔁 Continuous Camera Mode", variable=self.continuous_var)
+        tools_menu.add_separator()
+
+        # Decoder backend selection
+        self.backend_var = tk.StringVar(value=self.decoder.backend)
+        backend_menu = tk.Menu(tools_menu, tearoff=0)
+        tools_menu.add_cascade(label="🧩 Decoder Backend", menu=backend_menu)
+        for name in backend_names():
+            backend_menu.add_radiobutton(label=name, value=name, variable=self.backend_var,
+                                         command=self.change_backend)
+        self.symbology_var = tk.StringVar(value=self.decoder.symbology)
+        symbology_menu = tk.Menu(tools_menu, tearoff=0)
+        tools_menu.add_cascade(label="🏷️ Symbologies", menu=symbology_menu)
+        for profile in SYMBOLOGY_PROFILES:
+            symbology_menu.add_radiobutton(label=SYMBOLOGY_LABELS.get(profile, profile), value=profile,
+                                           variable=self.symbology_var, command=self.change_symbology)
         tools_menu.add_separator()
         tools_menu.add_command(label="🌙 Toggle Theme", command=self.toggle_theme, accelerator="Ctrl+T")
         tools_menu.add_separator()
@@ -586,6 +903,7 @@ Made with ❤️ by Anubhav Mishra"""
         
         # Bind keyboard shortcuts
         self.root.bind('<Control-s>', lambda e: self.scan_screenshot())
+        self.root.bind('<Control-r>', lambda e: self.scan_region())
         self.root.bind('<Control-o>', lambda e: self.scan_file())
         self.root.bind('<Control-c>', lambda e: self.toggle_camera())
         self.root.bind('<Control-l>', lambda e: self.clear_results())
@@ -682,7 +1000,8 @@ Professional QR Code Scanner
 
     def copy_results(self):
         """Copy all results to clipboard"""
-        content = self.results_text.get('1.0', tk.END).strip()
+        content = "\n".join(self.format_result_block(record)
+                             for record in self.results_view.store.newest_first()).strip()
         if content:
             self.root.clipboard_clear()
             self.root.clipboard_append(content)
@@ -690,186 +1009,538 @@ Professional QR Code Scanner
         else:
             self.update_status("No results to copy")
 
-    def scan_screenshot(self):
-        """Capture screenshot and scan for QR codes with vibrant UI feedback"""
+    def change_backend(self):
+        """Switch the decoder backend used by every scan method"""
+        backend = self.backend_var.get()
         try:
-            self.update_status("Preparing magical screenshot capture...", show_progress=True, emoji="🪄")
-            
-            # Hide window temporarily for clean screenshot
-            self.root.withdraw()
-            time.sleep(0.5)  # Give time for window to hide
-            
-            # Take screenshot
-            self.update_status("Capturing your screen in 3... 2... 1...", emoji="📸")
-            screenshot = pyautogui.screenshot()
-            
-            # Show window again
-            self.root.deiconify()
-            
-            self.update_status("Scanning for awesome QR codes...", show_progress=True, emoji="🔍")
-            
-            # Scan for QR codes
-            qr_codes = self.decode_qr_codes(screenshot)
-            
-            self.update_status("", show_progress=False)  # Stop progress
-            
-            if qr_codes:
-                for qr_data in qr_codes:
-                    self.add_result(qr_data, "📸 Screenshot")
-                self.update_status(f"Found {len(qr_codes)} QR code(s)! ✅", emoji="🎉")
-            else:
-                self.update_status("No QR codes found in screenshot", emoji="😕")
-                
+            self.decoder.set_backend(backend)
+        except ValueError:
+            self.backend_var.set(self.decoder.backend)
+            self.update_status(f"{backend} cannot read the '{self.decoder.symbology}' symbologies",
+                               emoji="⚠️")
+            return
+        self.update_status(f"Decoder backend: {self.decoder.backend}", emoji="🧩")
+
+    def change_symbology(self):
+        """Switch the symbol types every scan method looks for"""
+        profile = self.symbology_var.get()
+        # Falls back to the cascade if the chosen backend cannot find these types
+        self.decoder.set_symbology(profile)
+        self.backend_var.set(self.decoder.backend)
+        self.update_status(f"Symbologies: {SYMBOLOGY_LABELS.get(profile, profile)} "
+                           f"(backend: {self.decoder.backend})", emoji="🏷️")
+
+    def schedule_history_search(self):
+        """Search shortly after typing pauses instead of on every keystroke"""
+        if self._search_after:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(250, self.run_history_search)
+
+    def run_history_search(self):
+        """Query the history on the job queue so Tk never waits for SQLite"""
+        self._search_after = None
+        if self.search_job:
+            self.search_job.cancel()  # Its results are stale now
+            self.search_job = None
+        query = self.search_var.get().strip()
+        if not query or not self.history:
+            self.results_view.show(self.results)
+            return
+
+        self.search_job = self.jobs.submit(
+            "history search", self.history_search_job, query,
+            on_done=self.show_history_results,
+            on_error=lambda e: self.update_status(f"History search error: {e}", emoji="❌"))
+
+    def history_search_job(self, job, query: str):
+        """Worker side of a history search"""
+        start = time.perf_counter()
+        entries = self.history.search(query, limit=HISTORY_SEARCH_LIMIT)
+        return query, entries, time.perf_counter() - start
+
+    def show_history_results(self, outcome):
+        """Display history matches (cancelled, superseded searches never get here)"""
+        query, entries, elapsed = outcome
+        self.search_job = None
+        matches = ResultStore(max(1, len(entries)))
+        for entry in reversed(entries):
+            matches.append(entry.payload, entry.qr_type, entry.source or "", entry.timestamp)
+        self.results_view.show(matches)
+        if entries:
+            self.copy_btn.config(state='normal')
+        self.update_status(f"{len(entries)} history match(es) for '{query}' "
+                           f"({elapsed * 1000.0:.0f} ms)", emoji="🔎")
+
+    def set_results_limit(self):
+        """Ask how many results to keep before the oldest are discarded"""
+        limit = simpledialog.askinteger(
+            "Results Limit",
+            "Number of results to keep:",
+            initialvalue=self.results.capacity, minvalue=100, maxvalue=1000000,
+            parent=self.root)
+        if limit is None:
+            return
+        self.results.resize(limit)
+        self.results_view.clear_selection()
+        self.update_status(f"Keeping the latest {limit} results", emoji="🗃️")
+
+    def show_cache_stats(self):
+        """Show decode cache hit/miss counters and offer to clear the cache"""
+        stats = self.decode_cache.stats()
+        if messagebox.askyesno(
+                "Decode Cache",
+                f"Entries: {stats['entries']} / {stats['max_entries']}\n"
+                f"Hits: {stats['hits']}\n"
+                f"Misses: {stats['misses']}\n"
+                f"Hit rate: {stats['hit_rate']:.0%}\n\n"
+                f"Clear the cache?",
+                parent=self.root):
+            self.decode_cache.clear()
+            self.update_status("Decode cache cleared", emoji="⚡")
+
+    def toggle_enhance(self):
+        """Turn the preprocessing ladder for images where nothing decoded on or off"""
+        self.decoder.ladder = self.ladder if self.enhance_var.get() else None
+        state = "on" if self.decoder.ladder else "off"
+        self.update_status(f"Hard-image enhancement {state}", emoji="🪄")
+
+    def show_ladder_stats(self):
+        """Show which preprocessing steps rescued images and offer to reset the counters"""
+        stats = self.ladder.stats()
+        lines = [f"{name}: {step['hits']} of {step['attempts']} ({step['hit_rate']:.0%}), "
+                 f"{step['mean_ms']:.0f} ms avg, skipped {step['skipped']}"
+                 for name, step in stats['steps'].items()]
+        if messagebox.askyesno(
+                "Hard-Image Enhancement",
+                f"Images retried: {stats['images']}\n"
+                f"Rescued: {stats['rescued']}\n"
+                f"Out of time budget: {stats['out_of_budget']}\n\n"
+                + "\n".join(lines) + "\n\n"
+                f"Reset the statistics?",
+                parent=self.root):
+            self.ladder.clear()
+            self.update_status("Enhancement statistics reset", emoji="🪜")
+
+    def set_decode_budget(self):
+        """Ask for the live camera's per-decode latency budget"""
+        budget = simpledialog.askinteger(
+            "Camera Decode Budget",
+            "Decode every frame while a decode takes less than (ms):",
+            initialvalue=int(self.decode_budget_ms), minvalue=5, maxvalue=2000,
+            parent=self.root)
+        if budget is None:
+            return
+        self.decode_budget_ms = float(budget)
+        if self.camera:
+            self.camera.set_budget(self.decode_budget_ms)
+        self.update_status(f"Camera decode budget set to {budget} ms", emoji="⏱️")
+
+    def set_preview_fps(self):
+        """Ask how often the camera preview is redrawn"""
+        fps = simpledialog.askinteger(
+            "Camera Preview FPS",
+            "Redraw the camera preview at most this many times per second\n"
+            "(decoding is not affected):",
+            initialvalue=int(self.preview_fps), minvalue=1, maxvalue=60,
+            parent=self.root)
+        if fps is None:
+            return
+        self.preview_fps = float(fps)
+        if self.preview:
+            self.preview.max_fps = self.preview_fps
+        self.update_status(f"Camera preview limited to {fps} FPS", emoji="🖼️")
+
+    def toggle_result_stream(self):
+        """Start or stop streaming every result to a JSONL, CSV, vCard or iCalendar file"""
+        if self.result_sink:
+            path = self.result_sink.path
+            self.result_sink.close()
+            self.result_sink = None
+            self.update_status(f"Stopped streaming results to {os.path.basename(path)}", emoji="📝")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            title="Stream Results to File",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"), ("vCard contacts", "*.vcf"),
+                       ("iCalendar events", "*.ics"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+
+        try:
+            self.result_sink = open_sink(sink_format(file_path), file_path, append=True)
+            self.update_status(f"Streaming results to {os.path.basename(file_path)}", emoji="📝")
         except Exception as e:
-            self.update_status(f"Screenshot error: {str(e)}", emoji="❌")
-            messagebox.showerror("Error", f"Failed to capture screenshot: {str(e)}")
+            messagebox.showerror("Error", f"Failed to open result file: {str(e)}")
 
-    def scan_file(self):
-        """Open file dialog and scan selected image for QR codes"""
+    def scan_screenshot(self):
+        """Capture the whole desktop and scan for QR codes"""
+        self.capture_screen(None, "📸 Screenshot")
+
+    def scan_monitor(self, monitor):
+        """Capture a single monitor and scan for QR codes"""
+        self.capture_screen(monitor.region, f"🖥️ Monitor {monitor.index}")
+
+    def refresh_monitor_menu(self):
+        """List the connected monitors each time the submenu opens"""
+        self.monitor_menu.delete(0, tk.END)
         try:
-            file_path = filedialog.askopenfilename(
-                title="Select Image File",
-                filetypes=[
-                    ("Image files", "*.png *.jpg *.jpeg *.bmp *.gif *.tiff"),
-                    ("All files", "*.*")
-                ]
-            )
-            
-            if file_path:
-                self.update_status("Loading and analyzing image...", show_progress=True, emoji="📂")
-                
-                # Load and scan image
-                image = Image.open(file_path)
-                qr_codes = self.decode_qr_codes(image)
-                
-                self.update_status("", show_progress=False)
-                
-                if qr_codes:
-                    for qr_data in qr_codes:
-                        self.add_result(qr_data, f"📁 File: {os.path.basename(file_path)}")
-                    self.update_status(f"Found {len(qr_codes)} QR code(s)! ✅", emoji="🎉")
-                else:
-                    self.update_status("No QR codes found in image", emoji="😕")
-                    
+            monitors = list_monitors()
         except Exception as e:
-            self.update_status(f"File scan error: {str(e)}", emoji="❌")
-            messagebox.showerror("Error", f"Failed to scan file: {str(e)}")
+            print(f"Monitor listing error: {e}")
+            monitors = []
+        if len(monitors) < 2:
+            self.monitor_menu.add_command(label="🖥️ Whole Desktop", command=self.scan_screenshot)
+            return
+        for monitor in monitors[1:]:
+            self.monitor_menu.add_command(
+                label=f"🖥️ Monitor {monitor.index} ({monitor.width}x{monitor.height})",
+                command=lambda m=monitor: self.scan_monitor(m))
+
+    def capture_screen(self, region, source: str):
+        """Hide the window, then grab ``region`` once the desktop has repainted"""
+        self.update_status("Preparing magical screenshot capture...", show_progress=True, emoji="🪄")
+
+        # Hide window temporarily for clean screenshot; the grab is scheduled
+        # instead of sleeping so the Tk event loop keeps running
+        self.root.withdraw()
+        self.root.after(HIDE_SETTLE_MS, self.grab_and_scan, region, source)
+
+    def grab_and_scan(self, region, source: str):
+        """Capture the screen (or a region of it) and decode it in the background"""
+        self.update_status("Capturing your screen in 3... 2... 1...", show_progress=True, emoji="📸")
+        self.jobs.submit("screen capture", self.capture_job, region, source,
+                         on_progress=self.on_capture_progress,
+                         on_done=self.on_capture_done,
+                         on_error=self.on_capture_error,
+                         on_cancelled=self.on_job_cancelled)
+
+    def capture_job(self, job, region, source: str):
+        """Worker side of a screen scan: grab, then decode"""
+        screenshot = grab_screen(region)
+        job.report(0.5, "Scanning for awesome QR codes...")
+        return [(source, self.decode_qr_codes(screenshot, source))]
+
+    def on_capture_progress(self, job):
+        # The grab is done, so the window can come back while decoding runs
+        self.root.deiconify()
+        self.show_job_progress(job)
 
-    def decode_qr_codes(self, image) -> List[str]:
-        """Decode QR codes from an image"""
+    def on_capture_done(self, found):
+        self.root.deiconify()
+        self.show_scan_results(found, "No QR codes found in screenshot")
+
+    def on_capture_error(self, e):
+        self.root.deiconify()
+        self.update_status(f"Screenshot error: {str(e)}", emoji="❌")
+        messagebox.showerror("Error", f"Failed to capture screenshot: {str(e)}")
+
+    def scan_region(self):
+        """Let the user drag a rectangle on screen and scan only that area"""
+        def on_selected(region):
+            # Wait for the overlay to disappear before grabbing
+            self.root.after(HIDE_SETTLE_MS, self.grab_and_scan, region, "✂️ Screen Region")
+
+        self.select_screen_region(on_selected)
+
+    def select_screen_region(self, on_selected, on_cancelled=None):
+        """Hide the window and let the user drag a region on the desktop"""
+        self.root.withdraw()
+        self.root.after(HIDE_SETTLE_MS, self.show_region_selector, on_selected, on_cancelled)
+
+    def show_region_selector(self, on_selected, on_cancelled=None):
+        """Dim the desktop with a translucent overlay and track a drag"""
         try:
-            # Convert PIL Image to OpenCV format if needed
-            if hasattr(image, 'save'):  # PIL Image
-                image_np = np.array(image)
-                image_cv = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+            monitors = list_monitors()
+        except Exception:
+            monitors = []
+        if monitors:
+            desktop = monitors[0]
+            left, top, width, height = desktop.left, desktop.top, desktop.width, desktop.height
+        else:
+            left, top = 0, 0
+            width, height = self.root.winfo_screenwidth(), self.root.winfo_screenheight()
+
+        overlay = tk.Toplevel(self.root)
+        overlay.overrideredirect(True)
+        overlay.geometry(f"{width}x{height}+{left}+{top}")
+        overlay.attributes('-topmost', True)
+        try:
+            overlay.attributes('-alpha', 0.3)
+        except tk.TclError:
+            pass  # Window manager without transparency
+        canvas = tk.Canvas(overlay, bg='black', cursor='crosshair', highlightthickness=0)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        canvas.create_text(width // 2, 40, fill='white', font=('Segoe UI', 16, 'bold'),
+                           text="✂️ Drag around the QR code - Esc to cancel")
+
+        drag = {}
+
+        def on_press(event):
+            drag['start'] = (event.x_root, event.y_root)
+            drag['rect'] = canvas.create_rectangle(event.x, event.y, event.x, event.y,
+                                                   outline='#2ecc71', width=2)
+
+        def on_motion(event):
+            if 'rect' in drag:
+                x0, y0 = drag['start']
+                canvas.coords(drag['rect'], x0 - left, y0 - top, event.x, event.y)
+
+        def on_release(event):
+            if 'start' not in drag:
+                return
+            x0, y0 = drag['start']
+            x1, y1 = event.x_root, event.y_root
+            overlay.destroy()
+            region = (min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0))
+            if region[2] < 8 or region[3] < 8:
+                self.root.deiconify()
+                self.update_status("Region selection too small - cancelled", emoji="✂️")
+                if on_cancelled:
+                    on_cancelled()
+                return
+            on_selected(region)
+
+        def on_cancel(event=None):
+            overlay.destroy()
+            self.root.deiconify()
+            self.update_status("Region selection cancelled", emoji="✂️")
+            if on_cancelled:
+                on_cancelled()
+
+        canvas.bind('<ButtonPress-1>', on_press)
+        canvas.bind('<B1-Motion>', on_motion)
+        canvas.bind('<ButtonRelease-1>', on_release)
+        overlay.bind('<Escape>', on_cancel)
+        overlay.focus_force()
+
+    def toggle_clipboard_watch(self):
+        """Start or stop scanning every image copied to the clipboard"""
+        if self.watch_clipboard_var.get():
+            self.start_watch('clipboard', ClipboardSource())
+        else:
+            self.stop_watch('clipboard')
+
+    def toggle_screen_watch(self):
+        """Start watching a dragged screen region, or stop the current watch"""
+        if not self.watch_screen_var.get():
+            self.stop_watch('screen')
+            return
+
+        def on_selected(region):
+            self.root.deiconify()
+            self.start_watch('screen', ScreenSource(region))
+
+        self.select_screen_region(on_selected, on_cancelled=lambda: self.watch_screen_var.set(False))
+
+    def start_watch(self, kind: str, source):
+        """Run a WatchThread that reports new codes through add_result"""
+        self.stop_watch(kind)
+        watcher = WatchThread(source, self.decoder, self.on_watch_results, self.watch_interval)
+        self.watchers[kind] = watcher
+        watcher.start()
+        self.update_status(f"Watching for QR codes: {source.name} "
+                           f"(every {self.watch_interval:g} s)", emoji="👁️")
+
+    def stop_watch(self, kind: str):
+        watcher = self.watchers.pop(kind, None)
+        if watcher:
+            watcher.stop()
+            self.update_status(f"Stopped {kind} watch ({watcher.decodes} scan(s) "
+                               f"in {watcher.polls} check(s))", emoji="👁️")
+
+    def on_watch_results(self, symbols, source: str):
+        """New codes from a watch (runs on the watch thread)"""
+        symbols = self.join_parts(symbols)
+        self.stream_results(symbols, source, 0.0)
+        for symbol in symbols:
+            self.root.after(0, self.add_result, symbol.data, source)
+
+    def set_watch_interval(self):
+        """Ask how often watch mode checks for changes"""
+        interval = simpledialog.askinteger(
+            "Watch Interval",
+            "Check the clipboard/screen every (ms):",
+            initialvalue=int(self.watch_interval * 1000), minvalue=100, maxvalue=10000,
+            parent=self.root)
+        if interval is None:
+            return
+        self.watch_interval = interval / 1000.0
+        for watcher in self.watchers.values():
+            watcher.interval = self.watch_interval
+        self.update_status(f"Watch interval set to {interval} ms", emoji="⏲️")
+
+    def scan_file(self):
+        """Open file dialog and scan the selected images in the background"""
+        file_paths = filedialog.askopenfilenames(
+            title="Select Image File(s)",
+            filetypes=[
+                ("Images and PDFs", "*.png *.jpg *.jpeg *.bmp *.gif *.tiff *.tif *.webp *.pdf"),
+                ("All files", "*.*")
+            ]
+        )
+        if not file_paths:
+            return
+
+        self.update_status(f"Loading and analyzing {len(file_paths)} image(s)...",
+                           show_progress=True, emoji="📂")
+        self.jobs.submit("file scan", self.file_scan_job, list(file_paths),
+                         on_progress=self.show_job_progress,
+                         on_done=self.on_file_scan_done,
+                         on_error=self.on_file_scan_error,
+                         on_cancelled=self.on_job_cancelled)
+
+    def file_scan_job(self, job, file_paths: List[str]):
+        """Worker side of a file scan; returns (found, errors)"""
+        found, errors = [], []
+        for index, file_path in enumerate(file_paths):
+            name = os.path.basename(file_path)
+            job.report(index / len(file_paths), f"Scanning {name} ({index + 1}/{len(file_paths)})...")
+            source = f"📁 File: {name}"
+
+            def on_page(page, page_symbols):
+                # Multi-page TIFFs, GIFs and PDFs report (and can be cancelled) per page
+                if page.count > 1:
+                    job.report((index + page.number / page.count) / len(file_paths),
+                               f"Scanning {name}, page {page.number}/{page.count}...")
+
+            try:
+                # Unchanged files are answered from the decode cache without being opened
+                timings = {}
+                start = time.perf_counter()
+                symbols = self.decoder.decode_file(file_path, timings=timings, on_page=on_page)
+                latency = time.perf_counter() - start
+            except JobCancelled:
+                raise
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                continue
+            # Parts of a sequence may be spread over several of the selected files
+            symbols = self.join_parts(symbols)
+            self.stream_results(symbols, source, latency, timings)
+
+            pages = {}
+            for symbol in symbols:
+                pages.setdefault(symbol.page, []).append(symbol.data)
+            if not pages:
+                found.append((source, []))
+            for page, codes in pages.items():
+                found.append((source if page is None else f"{source} (page {page})", codes))
+        return found, errors
+
+    def on_file_scan_done(self, outcome):
+        found, errors = outcome
+        if errors and not found:
+            self.on_file_scan_error("\n".join(errors))
+            return
+        self.show_scan_results(found)
+        if errors:
+            messagebox.showwarning("Some files failed", "\n".join(errors))
+
+    def on_file_scan_error(self, e):
+        self.update_status(f"File scan error: {str(e)}", emoji="❌")
+        messagebox.showerror("Error", f"Failed to scan file: {str(e)}")
+
+    def scan_video(self):
+        """Scan a recorded video file in the background, faster than real time"""
+        file_path = filedialog.askopenfilename(
+            title="Select Video File",
+            filetypes=[
+                ("Video files", " ".join(f"*{extension}" for extension in VIDEO_EXTENSIONS)),
+                ("All files", "*.*")
+            ]
+        )
+        if not file_path:
+            return
+
+        self.update_status(f"Scanning video {os.path.basename(file_path)}...",
+                           show_progress=True, emoji="🎞️")
+        self.jobs.submit("video scan", self.video_scan_job, file_path,
+                         on_progress=self.show_job_progress,
+                         on_done=self.on_video_scan_done,
+                         on_error=self.on_file_scan_error,
+                         on_cancelled=self.on_job_cancelled)
+
+    def video_scan_job(self, job, file_path: str):
+        """Worker side of a video scan; returns (found, stats)"""
+        name = os.path.basename(file_path)
+        # Frames never repeat exactly, so the decode cache is bypassed
+        scanner = VideoScanner(file_path, self.decoder)
+
+        def on_progress(frame, frame_count):
+            position = format_video_time(frame / scanner.fps)
+            if frame_count:
+                job.report(frame / frame_count, f"Scanning {name}: {position} / "
+                                                f"{format_video_time(frame_count / scanner.fps)}")
             else:
-                image_cv = np.array(image)
-                
-            # Convert to grayscale for better detection
-            gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-            
-            # Decode QR codes
-            qr_codes = pyzbar.decode(gray)
-            
-            # Extract data from detected QR codes
-            results = []
-            for qr in qr_codes:
-                try:
-                    data = qr.data.decode('utf-8')
-                    if data and data not in results:  # Avoid duplicates
-                        results.append(data)
-                except UnicodeDecodeError:
-                    # Try other encodings
-                    try:
-                        data = qr.data.decode('latin-1')
-                        if data and data not in results:
-                            results.append(data)
-                    except:
-                        continue
-                        
-            return results
-            
+                job.report(0.0, f"Scanning {name}: {position}")
+
+        found = []
+        sequences = StructuredAppendBuffer()  # Times out on video time, not wall time
+        for hit in scanner.hits(on_progress):
+            for symbol in sequences.process([hit.symbol], now=hit.time):
+                source = f"🎞️ Video: {name} @ {format_video_time(hit.time)} (frame {hit.frame})"
+                self.stream_results([symbol], source, 0.0)
+                found.append((source, [symbol.data]))
+        return found, scanner.stats()
+
+    def on_video_scan_done(self, outcome):
+        found, stats = outcome
+        self.show_scan_results(found, empty_message="No QR codes found in video")
+        if found:
+            self.update_status(f"Found {len(found)} QR code(s) in {stats['duration_s']:.0f} s of video "
+                               f"({stats['speed']:.1f}x real time) ✅", emoji="🎉")
+
+    def decode_qr_codes(self, image, source: str = "") -> List[str]:
+        """Decode QR codes from an image, streaming them to the JSONL sink if enabled"""
+        try:
+            timings = {}
+            start = time.perf_counter()
+            symbols = self.decoder.decode(image, timings=timings)
+            latency = time.perf_counter() - start
         except Exception as e:
             print(f"QR decode error: {e}")
             return []
 
+        symbols = self.join_parts(symbols)
+        self.stream_results(symbols, source, latency, timings)
+        return [symbol.data for symbol in symbols]
+
+    def join_parts(self, symbols):
+        """Hold back structured-append parts until their sequence is complete (any thread)"""
+        joined = self.sequences.process(symbols)
+        if any(symbol.sequence for symbol in symbols):
+            progress = self.sequence_progress()
+            if progress:
+                self.root.after(0, self.update_status, progress, False, "🧩")
+        return joined
+
+    def sequence_progress(self) -> str:
+        """Status text for the most recently extended partial sequence, if any"""
+        pending = self.sequences.pending()
+        if not pending:
+            return ""
+        parity, total, seen = pending[-1]
+        missing = ", ".join(str(index + 1) for index in range(total) if index not in seen)
+        return f"Multi-part QR code: {len(seen)} of {total} parts scanned, waiting for part(s) {missing}"
+
+    def stream_results(self, symbols, source: str, latency: float, timings: Optional[dict] = None):
+        """Write decoded symbols to the JSONL sink if streaming is enabled"""
+        sink = self.result_sink
+        if sink and symbols:
+            try:
+                sink.write_many(symbols, source, latency, stages=timings)
+            except Exception as e:
+                print(f"JSONL sink error: {e}")
+
     def detect_qr_type(self, qr_data: str) -> str:
         """Detect the type of QR code content"""
-        qr_data_lower = qr_data.lower()
-        
-        # WiFi QR code
-        if qr_data.startswith('WIFI:'):
-            return "WiFi Configuration"
-        
-        # URL
-        if any(qr_data_lower.startswith(prefix) for prefix in ['http://', 'https://', 'www.', 'ftp://']):
-            return "URL"
-        
-        # Email
-        if qr_data_lower.startswith('mailto:') or '@' in qr_data and '.' in qr_data:
-            return "Email"
-        
-        # Phone number
-        if qr_data_lower.startswith('tel:') or (qr_data.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit() and len(qr_data.replace(' ', '').replace('-', '').replace('+', '').replace('(', '').replace(')', '')) >= 10):
-            return "Phone Number"
-        
-        # SMS
-        if qr_data_lower.startswith('sms:') or qr_data_lower.startswith('smsto:'):
-            return "SMS"
-        
-        # Contact (vCard)
-        if qr_data.upper().startswith('BEGIN:VCARD'):
-            return "Contact (vCard)"
-        
-        # Event (vCalendar)
-        if qr_data.upper().startswith('BEGIN:VEVENT'):
-            return "Calendar Event"
-        
-        # Location/GPS
-        if qr_data_lower.startswith('geo:'):
-            return "Location/GPS"
-        
-        return "Text"
+        return detect_qr_type(qr_data)
 
     def is_url(self, text: str) -> bool:
         """Check if text is a URL"""
-        return any(text.lower().startswith(prefix) for prefix in ['http://', 'https://', 'www.', 'ftp://'])
-
-    def parse_wifi_qr(self, qr_data: str) -> Optional[dict]:
-        """Parse WiFi QR code data"""
-        if not qr_data.startswith('WIFI:'):
-            return None
-            
-        try:
-            # Remove WIFI: prefix and split by semicolons
-            wifi_params = qr_data[5:].split(';')
-            
-            config = {
-                'ssid': '',
-                'password': '',
-                'security': 'NONE',
-                'hidden': False
-            }
-            
-            for param in wifi_params:
-                if ':' in param:
-                    key, value = param.split(':', 1)
-                    key = key.upper()
-                    
-                    if key == 'S':  # SSID
-                        config['ssid'] = value
-                    elif key == 'P':  # Password
-                        config['password'] = value
-                    elif key == 'T':  # Security type
-                        config['security'] = value.upper()
-                    elif key == 'H':  # Hidden network
-                        config['hidden'] = value.lower() == 'true'
-            
-            return config if config['ssid'] else None
-            
-        except Exception as e:
-            print(f"WiFi parse error: {e}")
-            return None
+        return is_url(text)
 
     def connect_wifi(self):
         """Connect to WiFi network from QR code"""
@@ -881,9 +1552,9 @@ Professional QR Code Scanner
             self.update_status("Connecting to WiFi...", show_progress=True, emoji="📶")
             
             config = self.last_wifi_config
-            ssid = config['ssid']
-            password = config['password']
-            security = config['security']
+            ssid = config.ssid
+            password = config.password
+            security = config.security
             
             # Create Windows WiFi profile XML
             profile_xml = self.create_wifi_profile_xml(ssid, password, security)
@@ -995,38 +1666,66 @@ Professional QR Code Scanner
         else:
             self.start_camera()
 
+    def set_camera_sources(self):
+        """Ask which cameras, video files or stream URLs to scan at once"""
+        current = ", ".join(str(source) for source in self.camera_sources)
+        text = simpledialog.askstring(
+            "Camera Sources",
+            "Comma-separated device numbers, video files or stream URLs\n"
+            "(e.g. 0, 1, rtsp://192.168.1.20/stream):",
+            initialvalue=current, parent=self.root)
+        if text is None:
+            return
+        sources = parse_sources(text)
+        if not sources:
+            messagebox.showerror("Camera Sources", "Enter at least one source")
+            return
+        self.camera_sources = sources
+        self.update_status(f"{len(sources)} camera source(s) set"
+                           f"{' - restart the camera to apply' if self.camera_running else ''}", emoji="🎥")
+
     def start_camera(self):
         """Start camera scanning in a popup window"""
         try:
             self.update_status("Starting camera...", show_progress=True, emoji="📹")
             
-            # Try to initialize camera
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened():
-                raise Exception("Could not open camera")
-            
+            # One capture thread per source and a shared decode pool (see qriftly.multicam)
             self.camera_running = True
+            self.camera_detected = False
+            self.camera_continuous = self.continuous_var.get()
+            self.camera_dedup = TemporalDeduplicator() if self.camera_continuous else None
+            self.preview_source = self.camera_sources[0]
+            # At most one preview redraw is queued on the UI thread at a time
+            self.preview = PreviewRenderer(
+                lambda delay: self.root.after(int(delay * 1000), self.update_camera_display),
+                max_fps=self.preview_fps)
+            self.camera = MultiCameraPipeline(self.camera_sources, self.decoder,
+                                              on_frame=self.on_camera_frame,
+                                              on_results=self.on_camera_results,
+                                              on_end=lambda source: self.root.after(
+                                                  0, self.on_camera_source_end, source),
+                                              budget_ms=self.decode_budget_ms)
+            self.camera.start()
+            
             self.camera_btn.config(text="🛑 Stop Camera\n📹 Live Scanning")
             
             # Create camera popup window
             self.create_camera_window()
             
-            # Start camera thread
-            self.camera_thread = threading.Thread(target=self.camera_loop, daemon=True)
-            self.camera_thread.start()
-            
             self.update_status("Camera started - point at QR codes! 📹 (Auto-stops after scan)", emoji="✅")
             
         except Exception as e:
             self.update_status("Camera start failed ❌", emoji="😞")
             messagebox.showerror("Camera Error", f"Failed to start camera: {str(e)}")
             self.camera_running = False
+            self.camera = None
+            self.preview = None
 
     def create_camera_window(self):
         """Create a dedicated camera popup window"""
         self.camera_window = tk.Toplevel(self.root)
         self.camera_window.title("📹 QRiftly Live Camera Scanner")
-        self.camera_window.geometry("600x500")
+        self.camera_window.geometry("640x640")
         self.camera_window.resizable(True, True)
         
         # Center the camera window
@@ -1048,8 +1747,9 @@ Professional QR Code Scanner
         header_frame.pack_propagate(False)
         
         # Title label
+        mode = "Continuous" if self.camera_continuous else "Auto-Stop"
         title_label = tk.Label(header_frame, 
-                              text="📹 Live QR Scanner (Auto-Stop)", 
+                              text=f"📹 Live QR Scanner ({mode})", 
                               font=('Segoe UI', 16, 'bold'),
                               fg=header_fg, bg=header_bg)
         title_label.pack(pady=15)
@@ -1066,6 +1766,24 @@ Professional QR Code Scanner
                                     width=50, height=20,
                                     justify='center')
         self.camera_label.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+        # One PhotoImage for the whole session; each preview frame is pasted into it
+        self.camera_photo = ImageTk.PhotoImage(self.preview.image)
+
+        # Per-source status panel; selecting a row previews that source
+        columns = ('state', 'fps', 'decode', 'latency', 'rate', 'found')
+        self.camera_panel = ttk.Treeview(camera_display_frame, columns=columns,
+                                         height=min(len(self.camera_sources), 4))
+        self.camera_panel.heading('#0', text="Source")
+        self.camera_panel.column('#0', width=160)
+        for column, heading in zip(columns, ("State", "FPS", "Decode ms", "Latency ms", "Scans/s", "Found")):
+            self.camera_panel.heading(column, text=heading)
+            self.camera_panel.column(column, width=70, anchor='center')
+        for index, source in enumerate(self.camera.sources.values()):
+            self.camera_panel.insert('', 'end', iid=str(index), text=source.name)
+        self.camera_panel.selection_set('0')
+        self.camera_panel.bind('<<TreeviewSelect>>', self.on_camera_panel_select)
+        self.camera_panel.pack(fill=tk.X, padx=10)
+        self.refresh_camera_panel()
         
         # Status frame
         status_frame = tk.Frame(self.camera_window, bg=status_bg, height=80)
@@ -1073,8 +1791,12 @@ Professional QR Code Scanner
         status_frame.pack_propagate(False)
         
         # Camera status label
+        if self.camera_continuous:
+            ready_text = "🔍 Ready to scan - each new code is added until you stop the camera"
+        else:
+            ready_text = "🔍 Ready to scan - Camera will auto-stop after successful scan"
         self.camera_status_label = tk.Label(status_frame,
-                                           text="🔍 Ready to scan - Camera will auto-stop after successful scan",
+                                           text=ready_text,
                                            font=('Segoe UI', 11),
                                            fg='#2ecc71', bg=status_bg)
         self.camera_status_label.pack(pady=5)
@@ -1125,10 +1847,11 @@ Professional QR Code Scanner
         # Clean up camera
         if self.camera:
             try:
-                self.camera.release()
+                self.camera.stop()
             except:
                 pass
             self.camera = None
+        self.preview = None
         
         # Close camera window if it exists
         try:
@@ -1147,76 +1870,140 @@ Professional QR Code Scanner
             # Widget has been destroyed, ignore
             pass
 
-    def camera_loop(self):
-        """Main camera scanning loop"""
-        last_scan_time = 0
-        scan_cooldown = 2  # Seconds between scans
+    def on_camera_source_end(self, source):
+        """A source stopped delivering frames; stop once none is left"""
+        if not self.camera or self.camera.running:
+            return
+        errors = [stats['error'] for stats in self.camera.stats() if stats['error']]
+        never_ran = all(stats['frames'] == 0 for stats in self.camera.stats())
+        self.stop_camera()
+        if errors and never_ran:
+            messagebox.showerror("Camera Error", "Failed to start camera:\n" + "\n".join(errors))
+
+    def on_camera_panel_select(self, event=None):
+        """Preview the source selected in the status panel"""
+        selection = self.camera_panel.selection()
+        if selection and self.camera:
+            self.preview_source = list(self.camera.sources)[int(selection[0])]
+
+    def refresh_camera_panel(self):
+        """Update the per-source FPS/latency counters twice a second"""
+        if not self.camera_running or not self.camera:
+            return
+        try:
+            for index, stats in enumerate(self.camera.stats()):
+                state = stats['state']
+                if stats['error']:
+                    state = "❌ error"
+                self.camera_panel.item(str(index), values=(
+                    state,
+                    f"{stats['capture_fps']:.1f}",
+                    f"{stats['decode_ms']:.0f}",
+                    f"{stats['latency_ms']:.0f}",
+                    f"{stats['decode_rate']:.1f}",
+                    stats['found']))
+        except tk.TclError:
+            return
+        self.root.after(500, self.refresh_camera_panel)
+
+    def camera_source_label(self, frame) -> str:
+        """Result source text for a frame: the camera's name when several run"""
+        if len(self.camera.sources) == 1:
+            return "📹 Live Camera"
+        return f"📹 {self.camera.sources[frame.source].name}"
+
+    def on_camera_frame(self, frame):
+        """Pass a captured frame to the preview (runs on the capture thread)"""
+        preview = self.preview
+        if not self.camera_running or preview is None or frame.source != self.preview_source:
+            return
+        try:
+            # Only keeps the frame; conversion happens at the preview rate on the UI thread
+            preview.offer(frame.image)
+        except (tk.TclError, AttributeError, RuntimeError):
+            pass
+        except Exception as e:
+            print(f"Camera preview error: {e}")
+
+    def on_camera_results(self, symbols, frame):
+        """Handle one decode of the live feed (runs on the decode thread)"""
+        if not self.camera_running or self.camera_detected:
+            return
         
-        while self.camera_running and self.camera:
-            try:
-                ret, frame = self.camera.read()
-                if not ret:
-                    break
-                
-                # Update camera preview (resize for display)
-                display_frame = cv2.resize(frame, (400, 300))
-                frame_rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
-                
-                # Convert to PhotoImage for tkinter (correct method)
-                photo = ImageTk.PhotoImage(img)
-                
-                # Update camera label in main thread
-                try:
-                    if self.camera_running and hasattr(self, 'root') and self.root.winfo_exists():
-                        self.root.after(0, self.update_camera_display, photo)
-                except (tk.TclError, AttributeError):
-                    break
-                
-                # Scan for QR codes (with cooldown to prevent spam)
-                current_time = time.time()
-                if current_time - last_scan_time > scan_cooldown:
-                    qr_codes = self.decode_qr_codes(frame)
-                    if qr_codes:
-                        for qr_data in qr_codes:
-                            try:
-                                if self.camera_running and hasattr(self, 'root') and self.root.winfo_exists():
-                                    self.root.after(0, self.add_result, qr_data, "📹 Live Camera")
-                                    # Update camera status
-                                    if hasattr(self, 'camera_status_label') and self.camera_window and self.camera_window.winfo_exists():
-                                        self.root.after(0, lambda: self.camera_status_label.config(text=f"✅ QR Code Detected: {qr_data[:30]}...", fg='#2ecc71'))
-                                    
-                                    # Auto-stop camera after successful scan
-                                    self.root.after(1000, self.stop_camera)  # Stop after 1 second to show success message
-                                    return  # Exit camera loop
-                            except (tk.TclError, AttributeError):
-                                break
-                        last_scan_time = current_time
-                    else:
-                        # Update status to show scanning
-                        try:
-                            if hasattr(self, 'camera_status_label') and self.camera_window and self.camera_window.winfo_exists():
-                                self.root.after(0, lambda: self.camera_status_label.config(text="🔍 Scanning for QR codes...", fg='#f39c12'))
-                        except (tk.TclError, AttributeError):
-                            pass
+        try:
+            held = any(symbol.sequence for symbol in symbols)
+            symbols = self.join_parts(symbols)
+            progress = self.sequence_progress() if held and not symbols else ""
+            if progress:
+                # Only parts of a longer message are in view: keep scanning for the rest
+                self.root.after(0, self.set_camera_status, f"🧩 {progress}", '#3498db')
+                return
+            if self.camera_continuous:
+                self.report_continuous_results(symbols, frame)
+            elif symbols:
+                self.camera_detected = True
+                label = self.camera_source_label(frame)
+                self.stream_results(symbols, label, self.camera.sources[frame.source].decode_ms / 1000.0)
+                for symbol in symbols:
+                    self.root.after(0, self.add_result, symbol.data, label)
                 
-                time.sleep(0.1)  # Small delay to prevent excessive CPU usage
+                # Update camera status
+                qr_data = symbols[0].data
+                self.root.after(0, self.set_camera_status, f"✅ QR Code Detected: {qr_data[:30]}...", '#2ecc71')
                 
-            except Exception as e:
-                print(f"Camera loop error: {e}")
-                break
+                # Auto-stop camera after successful scan
+                self.root.after(1000, self.stop_camera)  # Stop after 1 second to show success message
+            else:
+                # Update status to show scanning and the effective decode rate
+                rate = sum(stats['decode_rate'] for stats in self.camera.stats())
+                self.root.after(0, self.set_camera_status,
+                                f"🔍 Scanning for QR codes... ({rate:.1f} scans/s)", '#f39c12')
+        except (tk.TclError, AttributeError, RuntimeError, KeyError):
+            pass
+
+    def report_continuous_results(self, symbols, frame):
+        """Add codes not seen recently and keep the camera running"""
+        new_symbols = self.camera_dedup.filter(symbols)
+        if new_symbols:
+            label = self.camera_source_label(frame)
+            self.stream_results(new_symbols, label, self.camera.sources[frame.source].decode_ms / 1000.0)
+            for symbol in new_symbols:
+                self.root.after(0, self.add_result, symbol.data, label)
+            self.root.after(0, self.set_camera_status,
+                            f"✅ New code: {new_symbols[-1].data[:30]}... "
+                            f"({self.camera_dedup.reported} found)", '#2ecc71')
+        elif not symbols:
+            rate = sum(stats['decode_rate'] for stats in self.camera.stats())
+            self.root.after(0, self.set_camera_status,
+                            f"🔍 Scanning for QR codes... ({rate:.1f} scans/s, "
+                            f"{self.camera_dedup.reported} found)", '#f39c12')
+
+    def set_camera_status(self, text: str, color: str):
+        """Update the camera window status line if it is still open"""
+        try:
+            if self.camera_window and self.camera_window.winfo_exists():
+                self.camera_status_label.config(text=text, fg=color)
+        except (tk.TclError, AttributeError):
+            pass
 
-    def update_camera_display(self, photo):
-        """Update camera display in main thread"""
+    def update_camera_display(self):
+        """Redraw the camera preview with the newest frame (main thread)"""
         try:
-            if (self.camera_running and 
+            if not self.camera_running or not self.preview:
+                return
+            image = self.preview.render()
+            if (image is not None and
                 hasattr(self, 'camera_label') and 
                 self.camera_label.winfo_exists()):
-                self.camera_label.config(image=photo, text="")
-                self.camera_label.image = photo  # Keep a reference
+                self.camera_photo.paste(image)
+                if getattr(self.camera_label, 'image', None) is not self.camera_photo:
+                    self.camera_label.config(image=self.camera_photo, text="")
+                    self.camera_label.image = self.camera_photo  # Keep a reference
         except tk.TclError:
             # Widget has been destroyed, ignore
             pass
+        except Exception as e:
+            print(f"Camera preview error: {e}")
 
     def on_closing(self):
         """Handle application closing properly"""
@@ -1225,19 +2012,31 @@ Professional QR Code Scanner
             if hasattr(self, 'camera_running'):
                 self.camera_running = False
             
-            # Clean up camera safely
+            # Stop the capture/decode threads and release the camera
             if hasattr(self, 'camera') and self.camera:
                 try:
-                    self.camera.release()
-                except:
-                    pass
-            
-            # Wait a moment for camera thread to finish
-            if hasattr(self, 'camera_thread') and self.camera_thread and self.camera_thread.is_alive():
-                try:
-                    self.camera_thread.join(timeout=1.0)
+                    self.camera.stop(timeout=1.0)
                 except:
                     pass
+
+            # Flush any streamed results
+            if self.result_sink:
+                self.result_sink.close()
+                self.result_sink = None
+
+            # Cancel queued and running background scans
+            self.jobs.shutdown()
+
+            # Stop watch threads
+            for watcher in self.watchers.values():
+                watcher.stop()
+
+            # Commit queued history rows
+            if self.history:
+                self.history.close()
+
+            # Keep decode results for the next session
+            self.decode_cache.save()
         except:
             pass
         finally:
@@ -0,0 +1,8 @@
+"""
+QRiftly - Professional QR Code Scanner
+
+Headless scanning components used by both the desktop app (qr_scanner.py)
+and the command line interface. Importing this package never loads tkinter.
+"""
+
+__version__ = "2.0.0"
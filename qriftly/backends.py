@@ -0,0 +1,307 @@
+"""
+QRiftly decoder backends
+
+Each backend turns an 8-bit grayscale array into DecodedSymbol objects.
+Backends are ordered by relative cost so a cascade can try the cheapest
+one first and only escalate for images where nothing decoded.
+"""
+
+import ctypes
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, FrozenSet, List, Optional, Tuple, Type
+
+import cv2
+import numpy as np
+
+from .constants import CASCADE, DEFAULT_SYMBOLOGY, SYMBOLOGY_PROFILES  # noqa: F401
+from .structured import message_parity, read_header
+from .symbols import DecodedSymbol, decode_payload
+
+# Symbol orientation by the direction of its top edge (zbar's names)
+_ORIENTATIONS = ('UP', 'RIGHT', 'DOWN', 'LEFT')
+
+# OpenCV BarcodeDetector type names -> zbar names
+_OPENCV_BARCODE_TYPES = {'EAN_13': 'EAN13', 'EAN_8': 'EAN8', 'UPC_A': 'UPCA', 'UPC_E': 'UPCE'}
+
+
+def zbar_pixels(gray: np.ndarray) -> Tuple[ctypes.Array, int, int]:
+    """
+    Wrap a gray array as the (pixels, width, height) tuple pyzbar accepts.
+
+    Handing pyzbar an ndarray or PIL image makes it call ``tobytes()`` on
+    every frame; a ctypes view over the array's memory avoids that copy.
+    """
+    gray = np.ascontiguousarray(gray)
+    height, width = gray.shape
+    pixels = (ctypes.c_ubyte * gray.size).from_address(gray.ctypes.data)
+    pixels._owner = gray  # Keep the array alive as long as the view
+    return pixels, width, height
+
+
+def _rect_from_points(points) -> Tuple[int, int, int, int]:
+    xs = [int(round(x)) for x, _ in points]
+    ys = [int(round(y)) for _, y in points]
+    return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+
+def _orientation(corners) -> str:
+    """UP/RIGHT/DOWN/LEFT from corners given in symbol order (top left first)"""
+    (x0, y0), (x1, y1) = corners[0], corners[1]
+    dx, dy = x1 - x0, y1 - y0
+    if abs(dx) >= abs(dy):
+        return _ORIENTATIONS[0] if dx >= 0 else _ORIENTATIONS[2]
+    return _ORIENTATIONS[1] if dy > 0 else _ORIENTATIONS[3]
+
+
+def _drop_joined_parts(symbols: List[DecodedSymbol]) -> List[DecodedSymbol]:
+    """Leave out parts of a sequence the backend already joined from the same image"""
+    joined = [symbol.raw for symbol in symbols if symbol.sequence is None and symbol.raw]
+    if not joined or all(symbol.sequence is None for symbol in symbols):
+        return symbols
+    return [symbol for symbol in symbols if symbol.sequence is None or not any(
+        symbol.raw in message and message_parity(message) == symbol.sequence.parity
+        for message in joined)]
+
+
+class DecoderBackend(ABC):
+    """Base class for decoder backends"""
+
+    name = "base"
+    cost = 0  # Relative cost, used to order the cascade
+    symbologies: Optional[FrozenSet[str]] = None  # Symbol types it can find; None: zbar's
+
+    def available(self) -> bool:
+        """Whether the backend's native dependencies could be loaded"""
+        return True
+
+    def handles(self, symbologies: Optional[FrozenSet[str]]) -> bool:
+        """Whether the backend can find any of ``symbologies`` (None: the QR cascade)"""
+        if self.symbologies is None:
+            return True
+        if symbologies is None:
+            return 'QRCODE' in self.symbologies
+        return bool(self.symbologies & symbologies)
+
+    @abstractmethod
+    def decode(self, gray: np.ndarray,
+               symbologies: Optional[FrozenSet[str]] = None) -> List[DecodedSymbol]:
+        """Decode ``gray``, looking only for ``symbologies`` where the backend can choose"""
+
+
+class PyzbarBackend(DecoderBackend):
+    """zbar via pyzbar: fast, decodes 1D and 2D symbologies"""
+
+    name = "pyzbar"
+    cost = 1
+
+    def __init__(self):
+        self._pyzbar = None
+        self._error = None
+        self._symbols: Dict[FrozenSet[str], list] = {}  # Profile -> ZBarSymbol list
+
+    def _load(self):
+        if self._pyzbar is None and self._error is None:
+            try:
+                from pyzbar import pyzbar
+                self._pyzbar = pyzbar
+            except Exception as e:  # ImportError, or the zbar DLL failed to load
+                self._error = e
+        return self._pyzbar
+
+    def available(self) -> bool:
+        return self._load() is not None
+
+    def _zbar_symbols(self, symbologies: Optional[FrozenSet[str]]) -> Optional[list]:
+        """ZBarSymbol members to enable; None enables zbar's defaults"""
+        if symbologies is None:
+            return None
+        symbols = self._symbols.get(symbologies)
+        if symbols is None:
+            # Names this zbar build does not know (e.g. SQCODE before 0.23) are skipped
+            known = self._pyzbar.ZBarSymbol.__members__
+            symbols = [known[name] for name in sorted(symbologies) if name in known]
+            self._symbols[symbologies] = symbols
+        return symbols
+
+    def decode(self, gray: np.ndarray,
+               symbologies: Optional[FrozenSet[str]] = None) -> List[DecodedSymbol]:
+        pyzbar = self._load()
+        if pyzbar is None:
+            raise RuntimeError(f"pyzbar backend unavailable: {self._error}")
+
+        results = []
+        for qr in pyzbar.decode(zbar_pixels(gray), symbols=self._zbar_symbols(symbologies)):
+            data = decode_payload(qr.data)
+            if not data:
+                continue
+            polygon = [(p.x, p.y) for p in qr.polygon]
+            results.append(DecodedSymbol(
+                data,
+                symbol_type=qr.type,
+                rect=tuple(qr.rect),
+                polygon=polygon,
+                backend=self.name,
+                quality=getattr(qr, 'quality', None),  # pyzbar >= 0.1.9
+                orientation=getattr(qr, 'orientation', None),
+                raw=qr.data,
+                sequence=read_header(gray, polygon, qr.data) if qr.type == 'QRCODE' else None,
+            ))
+        return _drop_joined_parts(results)
+
+
+class OpenCVBackend(DecoderBackend):
+    """OpenCV's built-in QRCodeDetector (QR only, handles several codes per image)"""
+
+    name = "opencv"
+    cost = 2
+    symbologies = frozenset({'QRCODE'})
+    detector_class = 'QRCodeDetector'
+
+    def __init__(self):
+        # cv2 detectors are not thread-safe; keep one per thread
+        self._local = threading.local()
+
+    def available(self) -> bool:
+        return hasattr(cv2, self.detector_class)
+
+    def _create_detector(self):
+        return getattr(cv2, self.detector_class)()
+
+    def _detector(self):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._create_detector()
+            self._local.detector = detector
+        return detector
+
+    def _detect_and_decode(self, gray: np.ndarray):
+        """(ok, payload bytes, corners); the bytes API keeps non-UTF-8 payloads intact"""
+        detector = self._detector()
+        if hasattr(detector, 'detectAndDecodeBytesMulti'):  # Newer OpenCV
+            return detector.detectAndDecodeBytesMulti(gray)[:3]
+        ok, decoded_info, points, _ = detector.detectAndDecodeMulti(gray)
+        return ok, [data.encode('utf-8') for data in decoded_info], points
+
+    def _decode_one(self, gray: np.ndarray, corners) -> bytes:
+        """Decode a single detected symbol on its own"""
+        detector = self._detector()
+        quad = np.asarray(corners, dtype=np.float32).reshape(1, 4, 2)
+        if hasattr(detector, 'decodeBytes'):
+            return detector.decodeBytes(gray, quad)[0]
+        return detector.decode(gray, quad)[0].encode('utf-8')
+
+    def decode(self, gray: np.ndarray,
+               symbologies: Optional[FrozenSet[str]] = None) -> List[DecodedSymbol]:
+        ok, payloads, points = self._detect_and_decode(gray)
+        if not ok or points is None:
+            return []
+
+        results = []
+        for raw, corners in zip(payloads, points):
+            if not raw:
+                # detectAndDecodeMulti holds back structured-append parts whose
+                # sequence is not complete in this image; they decode on their own
+                raw = self._decode_one(gray, corners)
+            data = decode_payload(raw) if raw else None
+            if not data:
+                continue  # Detected but not decodable
+            polygon = [(int(round(x)), int(round(y))) for x, y in corners]
+            results.append(DecodedSymbol(
+                data,
+                symbol_type="QRCODE",
+                rect=_rect_from_points(corners),
+                polygon=polygon,
+                backend=self.name,
+                orientation=_orientation(corners),
+                raw=bytes(raw),
+                sequence=read_header(gray, corners, raw),
+            ))
+        return _drop_joined_parts(results)
+
+
+class OpenCVArucoBackend(OpenCVBackend):
+    """OpenCV's ArUco-based QR detector: slower, finds damaged/rotated codes more often"""
+
+    name = "opencv-aruco"
+    cost = 3
+    detector_class = 'QRCodeDetectorAruco'
+
+
+class OpenCVBarcodeBackend(OpenCVBackend):
+    """OpenCV's BarcodeDetector: 1D retail codes only (EAN-13, EAN-8, UPC-A, UPC-E)"""
+
+    name = "opencv-barcode"
+    cost = 2
+    symbologies = frozenset(_OPENCV_BARCODE_TYPES.values())
+
+    def available(self) -> bool:
+        return hasattr(cv2, 'barcode')
+
+    def _create_detector(self):
+        return cv2.barcode.BarcodeDetector()
+
+    def decode(self, gray: np.ndarray,
+               symbologies: Optional[FrozenSet[str]] = None) -> List[DecodedSymbol]:
+        ok, decoded_info, decoded_types, points = self._detector().detectAndDecodeWithType(gray)
+        if not ok or points is None:
+            return []
+
+        results = []
+        for data, kind, corners in zip(decoded_info, decoded_types, points):
+            symbol_type = _OPENCV_BARCODE_TYPES.get(kind, kind)
+            if not data or symbologies is not None and symbol_type not in symbologies:
+                continue
+            results.append(DecodedSymbol(
+                data,
+                symbol_type=symbol_type,
+                rect=_rect_from_points(corners),
+                polygon=[(int(round(x)), int(round(y))) for x, y in corners],
+                backend=self.name,
+                raw=data.encode('utf-8'),
+            ))
+        return results
+
+
+BACKENDS: Dict[str, Type[DecoderBackend]] = {
+    PyzbarBackend.name: PyzbarBackend,
+    OpenCVBackend.name: OpenCVBackend,
+    OpenCVArucoBackend.name: OpenCVArucoBackend,
+    OpenCVBarcodeBackend.name: OpenCVBarcodeBackend,
+}
+
+_instances: Dict[str, DecoderBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name: str) -> DecoderBackend:
+    """Return the shared instance of a backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown decoder backend '{name}' "
+                         f"(choose from: {', '.join(backend_names())})")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
+
+
+def backend_names() -> List[str]:
+    """All selectable backend names, including the cascade"""
+    return [CASCADE] + list(BACKENDS)
+
+
+def cascade_order(names: Optional[List[str]] = None,
+                  symbologies: Optional[FrozenSet[str]] = None) -> List[DecoderBackend]:
+    """Available backends that handle ``symbologies``, cheapest first"""
+    backends = [get_backend(name) for name in (names or BACKENDS)]
+    return sorted((b for b in backends if b.available() and b.handles(symbologies)),
+                  key=lambda b: b.cost)
+
+
+def symbology_set(profile: str) -> Optional[FrozenSet[str]]:
+    """Symbol types of a profile name (see SYMBOLOGY_PROFILES)"""
+    try:
+        return SYMBOLOGY_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown symbology profile '{profile}' "
+                         f"(choose from: {', '.join(SYMBOLOGY_PROFILES)})")
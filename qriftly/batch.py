@@ -0,0 +1,211 @@
+"""
+QRiftly batch scanning
+
+Expands directories and glob patterns into image paths and decodes them
+across a pool of worker processes. pyzbar holds the GIL while it decodes,
+so processes (not threads) are needed for throughput to scale with cores.
+"""
+
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional
+
+from .cache import DecodeCache
+from .constants import DEFAULT_CHUNK_SIZE
+from .documents import PDF_EXTENSIONS, pdf_available
+from .engine import DecodedSymbol, QRDecoder
+
+# File types picked up when scanning directories (same as the GUI file dialog)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.tif', '.webp')
+
+# PDFs are picked up too when a renderer is installed
+SCAN_EXTENSIONS = IMAGE_EXTENSIONS + (PDF_EXTENSIONS if pdf_available() else ())
+
+
+class FileResult:
+    """Outcome of decoding a single file"""
+
+    __slots__ = ('path', 'symbols', 'error', 'elapsed', 'timings')
+
+    def __init__(self, path: str, symbols: Optional[List[DecodedSymbol]] = None,
+                 error: Optional[str] = None, elapsed: float = 0.0,
+                 timings: Optional[dict] = None):
+        self.path = path
+        self.symbols = symbols or []
+        self.error = error
+        self.elapsed = elapsed
+        self.timings = timings or {}
+
+    def __repr__(self):
+        return f"FileResult({self.path!r}, {len(self.symbols)} symbol(s), error={self.error!r})"
+
+
+def _has_magic(pattern: str) -> bool:
+    """Check whether a path contains glob wildcards"""
+    return any(char in pattern for char in '*?[')
+
+
+def _is_image(path: str) -> bool:
+    return path.lower().endswith(SCAN_EXTENSIONS)
+
+
+def _walk_directory(directory: str, recursive: bool) -> Iterator[str]:
+    """Yield image files below a directory in a stable order"""
+    if not recursive:
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if _is_image(name) and os.path.isfile(path):
+                yield path
+        return
+
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if _is_image(name):
+                yield os.path.join(root, name)
+
+
+def iter_image_paths(inputs: Iterable[str], recursive: bool = True) -> Iterator[str]:
+    """
+    Expand files, directories and glob patterns into image paths.
+
+    Explicit file paths are always yielded, even with an unknown extension.
+    Paths are produced lazily so huge trees start decoding immediately.
+    """
+    for item in inputs:
+        if _has_magic(item):
+            for path in sorted(glob.iglob(item, recursive=recursive)):
+                if os.path.isdir(path):
+                    yield from _walk_directory(path, recursive)
+                elif _is_image(path):
+                    yield path
+        elif os.path.isdir(item):
+            yield from _walk_directory(item, recursive)
+        else:
+            yield item
+
+
+# Per-process decoder, created once by the pool initializer
+_worker_decoder = None
+
+
+def _init_worker(decoder_options: dict, cache_path: Optional[str] = None):
+    global _worker_decoder
+    # Workers read a snapshot of the persistent cache; the parent records
+    # new results and saves them, so workers never write the file
+    cache = DecodeCache(path=cache_path) if cache_path else None
+    _worker_decoder = QRDecoder(cache=cache, **decoder_options)
+
+
+def _scan_one(decoder: QRDecoder, path: str) -> FileResult:
+    start = time.perf_counter()
+    timings = {}
+    try:
+        symbols = decoder.decode_file(path, timings=timings)
+        return FileResult(path, symbols, elapsed=time.perf_counter() - start, timings=timings)
+    except Exception as e:
+        return FileResult(path, error=str(e), elapsed=time.perf_counter() - start)
+
+
+def _scan_chunk(paths: List[str]) -> List[FileResult]:
+    """Worker entry point: decode a chunk of files in one round trip"""
+    decoder = _worker_decoder or QRDecoder()
+    return [_scan_one(decoder, path) for path in paths]
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def scan_paths(paths: Iterable[str], workers: Optional[int] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE,
+               ordered: bool = True,
+               decoder_options: Optional[dict] = None,
+               cache: Optional[DecodeCache] = None) -> Iterator[FileResult]:
+    """
+    Decode many image files in parallel.
+
+    Files are submitted to a ProcessPoolExecutor in chunks of ``chunk_size``
+    with only a few chunks in flight per worker, so memory stays flat for
+    trees with tens of thousands of files. With ``ordered`` results come
+    back in input order, otherwise as soon as each chunk completes.
+    ``workers=1`` decodes in the calling process without a pool.
+    ``decoder_options`` are passed to QRDecoder in every worker.
+
+    With a ``cache``, unchanged files are answered from it without being
+    opened. Worker processes load the cache file (if it has a ``path``)
+    when they start; results they decode are added to ``cache`` here.
+    """
+    decoder_options = decoder_options or {}
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunk_size = max(1, chunk_size)
+
+    if workers <= 1:
+        decoder = QRDecoder(cache=cache, **decoder_options)
+        for path in paths:
+            yield _scan_one(decoder, path)
+        return
+
+    results = _scan_parallel(paths, workers, chunk_size, ordered, decoder_options,
+                             cache.path if cache else None)
+    if cache is None:
+        yield from results
+        return
+
+    recorder = QRDecoder(cache=cache, **decoder_options)
+    for result in results:
+        timings = result.timings
+        # A ladder cut short by its budget may decode the file next time
+        if not result.error and not timings.get('cache_hit') and not timings.get('out_of_budget'):
+            recorder.remember_file(result.path, result.symbols)
+        yield result
+
+
+def _scan_parallel(paths: Iterable[str], workers: int, chunk_size: int, ordered: bool,
+                   decoder_options: dict, cache_path: Optional[str]) -> Iterator[FileResult]:
+    """Process-pool half of scan_paths"""
+
+    max_in_flight = workers * 2
+    chunks = _chunks(paths, chunk_size)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(decoder_options, cache_path)) as pool:
+        pending = deque()
+
+        def submit_next() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            pending.append(pool.submit(_scan_chunk, chunk))
+            return True
+
+        while len(pending) < max_in_flight and submit_next():
+            pass
+
+        if ordered:
+            while pending:
+                future = pending.popleft()
+                submit_next()
+                yield from future.result()
+            return
+
+        in_flight = set(pending)
+        pending.clear()
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    in_flight.add(pool.submit(_scan_chunk, chunk))
+                yield from future.result()
@@ -0,0 +1,188 @@
+"""
+QRiftly decode cache
+
+Remembers decode results so the same pixels are never decoded twice.
+Images are keyed by a fast checksum of their grayscale buffer; files are
+also keyed by path, modification time and size, so an unchanged file is
+answered without even being opened. Entries live in a bounded LRU and can
+be saved to a JSON file to survive restarts.
+"""
+
+import json
+import os
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from .structured import StructuredAppend
+from .symbols import DecodedSymbol
+
+# Cached decodes kept in memory
+DEFAULT_MAX_ENTRIES = 4096
+
+CACHE_FORMAT_VERSION = 4
+
+
+def content_key(gray: np.ndarray, config: str = "") -> str:
+    """
+    Key for a grayscale buffer under a decoder configuration.
+
+    CRC-32 and Adler-32 of the pixels together give a 64-bit checksum at
+    memory speed (a few ms for a 4K frame), far cheaper than a decode.
+    """
+    gray = np.ascontiguousarray(gray)
+    buffer = memoryview(gray).cast('B')
+    checksum = (zlib.crc32(buffer) << 32) | zlib.adler32(buffer)
+    height, width = gray.shape[:2]
+    return f"c|{config}|{width}x{height}|{checksum:016x}"
+
+
+def file_key(path: str, config: str = "") -> Optional[str]:
+    """Key for an image file, or None if it cannot be stat'ed"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"f|{config}|{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+
+
+def _copy_symbol(symbol: DecodedSymbol) -> DecodedSymbol:
+    return symbol.copy()
+
+
+def _symbol_to_json(symbol: DecodedSymbol) -> list:
+    sequence = symbol.sequence
+    return [symbol.data, symbol.symbol_type, list(symbol.rect) if symbol.rect else None,
+            [list(point) for point in symbol.polygon], symbol.backend, symbol.page,
+            symbol.quality, symbol.orientation, symbol.raw.hex() if symbol.raw is not None else None,
+            [sequence.index, sequence.total, sequence.parity] if sequence else None,
+            symbol.preprocess]
+
+
+def _symbol_from_json(item: list) -> DecodedSymbol:
+    data, symbol_type, rect, polygon, backend, page, quality, orientation, raw, sequence, preprocess = item
+    return DecodedSymbol(data, symbol_type, tuple(rect) if rect else None,
+                         [tuple(point) for point in polygon], backend, page,
+                         quality, orientation, bytes.fromhex(raw) if raw is not None else None,
+                         StructuredAppend(*sequence) if sequence else None, preprocess)
+
+
+class CacheEntry:
+    """Cached outcome of one decode"""
+
+    __slots__ = ('symbols', 'backend')
+
+    def __init__(self, symbols: List[DecodedSymbol], backend: Optional[str]):
+        self.symbols = symbols
+        self.backend = backend  # Backend that produced the symbols (None if nothing decoded)
+
+
+class DecodeCache:
+    """
+    Thread-safe LRU of decode results.
+
+    ``path`` enables persistence: entries are loaded from it on creation and
+    written back by ``save()``. Symbols are copied in and out, so callers
+    may modify what they get back.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def get(self, key: Optional[str]) -> Optional[List[DecodedSymbol]]:
+        """Cached symbols for ``key`` (counted as a hit or miss)"""
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [_copy_symbol(symbol) for symbol in entry.symbols]
+
+    def put(self, key: Optional[str], symbols: List[DecodedSymbol]):
+        """Remember the symbols decoded for ``key``"""
+        if not key:
+            return
+        backend = symbols[0].backend if symbols else None
+        entry = CacheEntry([_copy_symbol(symbol) for symbol in symbols], backend)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def stats(self) -> dict:
+        """Hit/miss counters and occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self._dirty = True
+
+    def load(self, path: str):
+        """Merge entries from a file written by ``save``"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Decode cache load error: {e}", file=sys.stderr)
+            return
+        if document.get('version') != CACHE_FORMAT_VERSION:
+            return
+
+        with self._lock:
+            for key, backend, symbols in document.get('entries', [])[-self.max_entries:]:
+                self._entries[key] = CacheEntry([_symbol_from_json(item) for item in symbols], backend)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self, path: Optional[str] = None):
+        """Write the entries (oldest first) to ``path`` atomically"""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            if not self._dirty and path == self.path:
+                return
+            entries = [[key, entry.backend, [_symbol_to_json(symbol) for symbol in entry.symbols]]
+                       for key, entry in self._entries.items()]
+            self._dirty = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_FORMAT_VERSION, 'entries': entries}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def default_cache_path() -> str:
+    """Per-user location of the persistent decode cache (next to the history)"""
+    from .history import default_history_path
+    return os.path.join(os.path.dirname(default_history_path()), "decode_cache.json")
@@ -0,0 +1,301 @@
+"""
+QRiftly camera pipeline
+
+Capture, preview and decoding run on separate threads connected by a
+single-slot "latest frame wins" buffer: when decoding is slower than the
+camera, stale frames are dropped instead of queueing up, so the preview
+stays smooth and every decode works on the freshest frame available.
+
+These are the building blocks; qriftly.multicam assembles them into the
+pipeline the GUI runs, for one camera or several. Nothing here imports
+tkinter; the GUI plugs in through callbacks.
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+
+# Used when the driver does not report a usable frame rate
+DEFAULT_FPS = 30.0
+
+# Consecutive failed reads before the capture thread gives up
+MAX_READ_FAILURES = 30
+
+# Default per-decode latency budget for live scanning, in milliseconds
+DEFAULT_DECODE_BUDGET_MS = 50.0
+
+# Longest the scheduler will back off between decodes, in seconds
+MAX_DECODE_INTERVAL = 1.0
+
+# Mean absolute difference (0-255) of the motion thumbnail below which a
+# frame counts as "unchanged" since the last decode
+MOTION_THRESHOLD = 2.5
+
+# Re-decode an unchanged scene at least this often, in seconds
+REFRESH_INTERVAL = 1.0
+
+# Size of the grayscale thumbnail used for the motion score
+MOTION_THUMBNAIL = (32, 24)
+
+
+class Frame:
+    """A captured frame and where/when it came from"""
+
+    __slots__ = ('image', 'index', 'timestamp', 'source')
+
+    def __init__(self, image, index: int, timestamp: float, source=0):
+        self.image = image
+        self.index = index
+        self.timestamp = timestamp
+        self.source = source
+
+
+class LatestFrameSlot:
+    """
+    Bounded hand-off between a producer and a consumer thread.
+
+    Holds at most one frame. ``put`` replaces any frame that has not been
+    taken yet (counting it as dropped), so a slow consumer always gets the
+    newest frame and never falls behind. ``on_put(slot)`` is called after
+    each put, for consumers that watch several slots.
+    """
+
+    def __init__(self, on_put: Optional[Callable[["LatestFrameSlot"], None]] = None):
+        self._frame = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self.on_put = on_put
+        self.dropped = 0
+
+    def put(self, frame: Frame):
+        with self._condition:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._condition.notify()
+        if self.on_put:
+            self.on_put(self)
+
+    def take(self) -> Optional[Frame]:
+        """Take the newest frame without waiting"""
+        with self._condition:
+            frame, self._frame = self._frame, None
+            return frame
+
+    @property
+    def pending(self) -> bool:
+        return self._frame is not None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Take the newest frame, waiting up to ``timeout`` seconds"""
+        with self._condition:
+            if self._frame is None and not self._closed:
+                self._condition.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """Wake up any waiting consumer; later gets return immediately"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """
+    Reads frames from a cv2.VideoCapture source at the source's frame rate.
+
+    Every frame goes to ``on_frame`` (preview) and into ``slot`` (decode).
+    Sources that return frames faster than their frame rate (files, some
+    drivers) are paced by waiting until the next frame is due.
+
+    With ``capture=None`` the source is opened on the capture thread itself,
+    so slow network streams do not block the caller; ``state`` and
+    ``error`` tell how that went. The thread owns the capture and releases
+    it when its loop ends, so no other thread touches it mid-``read()``.
+    """
+
+    def __init__(self, capture, slot: LatestFrameSlot, source=0,
+                 on_frame: Optional[Callable[[Frame], None]] = None,
+                 on_end: Optional[Callable[[], None]] = None):
+        super().__init__(daemon=True, name=f"qriftly-capture-{source}")
+        self.capture = capture
+        self.slot = slot
+        self.source = source
+        self.on_frame = on_frame
+        self.on_end = on_end
+        self.stop_event = threading.Event()
+        self.state = "connecting"  # connecting, running, ended or error
+        self.error = None
+
+        self.fps = DEFAULT_FPS
+        if capture is not None:
+            self._read_fps()
+        self.frames = 0
+        self.measured_fps = 0.0
+
+    def _read_fps(self):
+        fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self.fps = fps if 1.0 <= fps <= 240.0 else DEFAULT_FPS
+
+    def _open(self) -> bool:
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            capture.release()
+            self.error = f"Could not open {self.source}"
+            return False
+        self.capture = capture
+        self._read_fps()
+        return True
+
+    def run(self):
+        if self.capture is None and not self._open():
+            self.state = "error"
+            self.slot.close()
+            if self.on_end and not self.stop_event.is_set():
+                self.on_end()
+            return
+        self.state = "running"
+
+        interval = 1.0 / self.fps
+        next_due = time.monotonic()
+        failures = 0
+        window_start, window_frames = time.monotonic(), 0
+
+        try:
+            while not self.stop_event.is_set():
+                ok, image = self.capture.read()
+                if not ok:
+                    failures += 1
+                    if failures >= MAX_READ_FAILURES:
+                        break
+                    self.stop_event.wait(interval)
+                    continue
+                failures = 0
+
+                frame = Frame(image, self.frames, time.time(), self.source)
+                self.frames += 1
+                self.slot.put(frame)
+                if self.on_frame:
+                    self.on_frame(frame)
+
+                # Measured capture rate over ~1 second windows
+                window_frames += 1
+                now = time.monotonic()
+                if now - window_start >= 1.0:
+                    self.measured_fps = window_frames / (now - window_start)
+                    window_start, window_frames = now, 0
+
+                # Pace to the source frame rate instead of a fixed sleep
+                next_due += interval
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+                else:
+                    next_due = time.monotonic()  # Behind schedule; don't try to catch up
+        except Exception as e:
+            print(f"Camera capture error: {e}", file=sys.stderr)
+            self.error = str(e)
+        finally:
+            try:
+                self.capture.release()
+            except Exception:
+                pass
+            self.state = "error" if self.error else "ended"
+            self.slot.close()
+            if self.on_end and not self.stop_event.is_set():
+                self.on_end()
+
+    def stop(self):
+        """Ask the loop to end; the capture is released once the current read returns"""
+        self.stop_event.set()
+
+
+def motion_thumbnail(image: np.ndarray) -> np.ndarray:
+    """Tiny grayscale thumbnail used to tell whether the scene changed"""
+    small = cv2.resize(image, MOTION_THUMBNAIL, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small
+
+
+class AdaptiveScheduler:
+    """
+    Decides when the live decoder should run.
+
+    Decodes every frame while decoding fits in ``budget_ms``; when the
+    smoothed decode latency goes over budget the pause between decodes
+    doubles (up to MAX_DECODE_INTERVAL), and halves again once latency is
+    back under budget. Frames whose motion thumbnail barely differs from
+    the last decoded frame are skipped, except for a periodic refresh.
+    """
+
+    def __init__(self, budget_ms: float = DEFAULT_DECODE_BUDGET_MS,
+                 motion_threshold: float = MOTION_THRESHOLD,
+                 refresh_interval: float = REFRESH_INTERVAL):
+        self.budget_ms = budget_ms
+        self.motion_threshold = motion_threshold
+        self.refresh_interval = refresh_interval
+        self.interval = 0.0
+        self.latency_ms = 0.0  # Exponentially smoothed decode latency
+        self.skipped = 0
+        self._last_decode = 0.0
+        self._last_thumbnail = None
+        self._pending_thumbnail = None
+        self._recent = deque()  # Decode timestamps for the effective rate
+
+    def wait_time(self) -> float:
+        """Seconds to wait before the next decode is allowed"""
+        return self.interval - (time.monotonic() - self._last_decode)
+
+    def should_decode(self, image: np.ndarray) -> bool:
+        """Return False for frames that are unchanged since the last decode"""
+        thumbnail = motion_thumbnail(image)
+        if (self._last_thumbnail is not None
+                and time.monotonic() - self._last_decode < self.refresh_interval):
+            score = float(cv2.absdiff(thumbnail, self._last_thumbnail).mean())
+            if score < self.motion_threshold:
+                self.skipped += 1
+                return False
+        self._pending_thumbnail = thumbnail
+        return True
+
+    def record(self, latency: float):
+        """Update the schedule after a decode that took ``latency`` seconds"""
+        now = time.monotonic()
+        latency_ms = latency * 1000.0
+        if self.latency_ms:
+            self.latency_ms = 0.7 * self.latency_ms + 0.3 * latency_ms
+        else:
+            self.latency_ms = latency_ms
+
+        if self.latency_ms > self.budget_ms:
+            self.interval = min(MAX_DECODE_INTERVAL, max(0.02, self.interval * 2.0))
+        else:
+            self.interval = self.interval / 2.0 if self.interval > 0.005 else 0.0
+
+        self._last_decode = now
+        self._last_thumbnail = self._pending_thumbnail
+        self._recent.append(now)
+        while self._recent and now - self._recent[0] > 2.0:
+            self._recent.popleft()
+
+    @property
+    def decode_rate(self) -> float:
+        """Effective decodes per second over the last two seconds"""
+        recent = self._recent
+        if len(recent) < 2:
+            return float(len(recent))
+        span = max(time.monotonic() - recent[0], 1e-3)
+        return len(recent) / span
+
@@ -0,0 +1,428 @@
+"""
+QRiftly command line interface
+
+Usage:
+    python qr_scanner.py scan <paths...> [-r] [-j WORKERS] [-s PROFILE] [--preprocess STEPS] [-f FORMAT] [-o FILE] [--history]
+    python qr_scanner.py video <files...> [--interval 0.2] [-s PROFILE] [-f FORMAT] [-o FILE] [--history]
+    python qr_scanner.py history [QUERY] [-t TYPE] [--since 7d] [-n LIMIT] [-f jsonl]
+
+Only the decoding engine is imported here, never the Tk GUI, so the
+commands work on headless machines and start quickly.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+# Parser defaults come from qriftly.constants, which the engine shares, so
+# building the parser stays free of OpenCV/pyzbar imports
+from .constants import (BACKEND_NAMES, CASCADE, DEFAULT_BUDGET_MS, DEFAULT_CHUNK_SIZE, DEFAULT_STEPS,
+                        DEFAULT_SYMBOLOGY, SINK_FORMATS, SYMBOLOGY_PROFILES)
+
+# Choices and defaults of the scan/video options
+BACKEND_CHOICES = (CASCADE,) + BACKEND_NAMES
+SYMBOLOGY_CHOICES = tuple(SYMBOLOGY_PROFILES)
+PREPROCESS_STEPS = ','.join(DEFAULT_STEPS)
+PREPROCESS_BUDGET_MS = DEFAULT_BUDGET_MS
+
+# Result formats of scan/video: plain text or one of the sinks
+OUTPUT_FORMATS = ('text',) + SINK_FORMATS
+
+# What the .vcf and .ics formats keep, for the summary line
+FORMAT_RECORDS = {'vcf': "contact(s)", 'ics': "event(s)"}
+
+# Sub-commands handled by the CLI instead of launching the GUI
+COMMANDS = ('scan', 'video', 'history')
+
+# Suffixes accepted by --since/--until for relative ages, in seconds
+TIME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# Exit status when the reader of stdout goes away (128 + SIGPIPE, as a shell reports it)
+EXIT_BROKEN_PIPE = 141
+
+
+def cmd_scan(args) -> int:
+    """Decode every image given on the command line and print the results"""
+    from .batch import iter_image_paths, scan_paths
+    from .documents import page_location
+    from .preprocess import parse_steps
+    from .structured import StructuredAppendBuffer
+
+    try:
+        steps = parse_steps(args.preprocess)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    decoder_options = {'backend': args.backend, 'roi': args.roi, 'symbology': args.symbology,
+                       'preprocess': steps, 'preprocess_budget_ms': args.budget}
+    if not check_decoder_options(decoder_options):
+        return 2
+
+    sink = None
+    if args.format != 'text':
+        from .sinks import open_sink
+        sink = open_sink(args.format, args.output or "-")
+    elif args.output:
+        output = open(args.output, 'w', encoding='utf-8')
+    else:
+        output = sys.stdout
+
+    cache = None
+    if args.cache:
+        from .cache import DecodeCache, default_cache_path
+        cache = DecodeCache(path=default_cache_path() if args.cache == 'default' else args.cache)
+
+    history = None
+    if args.history:
+        from .history import ScanHistory
+        from .payload import detect_qr_type
+        history = ScanHistory(args.db)
+
+    paths = iter_image_paths(args.paths, recursive=args.recursive)
+    # Parts of a multi-part code may be in different files; no time limit between them
+    sequences = StructuredAppendBuffer(timeout=float('inf'))
+    scanned = 0
+    found = 0
+    failed = 0
+    cached = 0
+    rescued = Counter()  # Codes found per preprocessing step
+
+    try:
+        for result in scan_paths(paths, workers=args.workers,
+                                 chunk_size=args.chunk_size,
+                                 ordered=not args.unordered,
+                                 decoder_options=decoder_options,
+                                 cache=cache):
+            scanned += 1
+            if result.error:
+                print(f"{result.path}: error: {result.error}", file=sys.stderr)
+                failed += 1
+                continue
+
+            symbols = sequences.process(result.symbols)
+            found += len(symbols)
+            rescued.update(symbol.preprocess for symbol in result.symbols if symbol.preprocess)
+            cached += bool(result.timings.get('cache_hit'))
+            if args.timings:
+                stages = ", ".join(f"{stage}={value:.1f}" if isinstance(value, float) else f"{stage}={value}"
+                                   for stage, value in result.timings.items())
+                print(f"{result.path}: {result.elapsed * 1000.0:.1f} ms ({stages})", file=sys.stderr)
+            if history:
+                for symbol in symbols:
+                    history.add(symbol.data, detect_qr_type(symbol.data),
+                                page_location(result.path, symbol.page),
+                                symbol.symbol_type, symbol.backend)
+            if sink:
+                sink.write_many(symbols, result.path, result.elapsed,
+                                stages=result.timings if args.timings else None)
+            else:
+                for symbol in symbols:
+                    print(f"{page_location(result.path, symbol.page)}\t{symbol.symbol_type}\t{symbol.data}",
+                          file=output, flush=True)
+    finally:
+        if cache:
+            cache.save()
+        if history:
+            history.close()
+        if sink:
+            sink.close()
+        elif output is not sys.stdout:
+            output.close()
+
+    if not args.quiet:
+        print(f"Scanned {scanned} file(s), found {found} code(s), "
+              f"{failed} error(s)", file=sys.stderr)
+        if cache:
+            print(f"Decode cache: {cached} of {scanned} file(s) answered from {cache.path} "
+                  f"({len(cache)} entries)", file=sys.stderr)
+        if rescued:
+            steps = ", ".join(f"{step} {count}" for step, count in rescued.most_common())
+            print(f"Preprocessing found {sum(rescued.values())} code(s): {steps}", file=sys.stderr)
+        report_sequences(sequences)
+        report_sink(sink, args.format)
+
+    if failed:
+        return 2
+    return 0 if found else 1
+
+
+def check_decoder_options(options: dict) -> bool:
+    """Report a backend/profile combination QRDecoder rejects before any output is opened"""
+    from .engine import QRDecoder
+    try:
+        QRDecoder(**options)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+def report_sequences(sequences):
+    """Warn about multi-part codes that never got all of their parts"""
+    for parity, total, seen in sequences.pending():
+        missing = ", ".join(str(index + 1) for index in range(total) if index not in seen)
+        print(f"Incomplete multi-part code (parity 0x{parity:02x}): {len(seen)} of {total} "
+              f"parts found, missing part(s) {missing}", file=sys.stderr)
+    if sequences.corrupt:
+        print(f"{sequences.corrupt} multi-part code(s) failed the parity check", file=sys.stderr)
+
+
+def report_sink(sink, format: str):
+    """Summary line for the formats that keep only some results"""
+    if sink and format in FORMAT_RECORDS:
+        target = "stdout" if sink.path == "-" else sink.path
+        print(f"Wrote {sink.count} {FORMAT_RECORDS[format]} to {target}", file=sys.stderr)
+
+
+def cmd_video(args) -> int:
+    """Scan recorded video files and print each code with its frame and time"""
+    from .engine import QRDecoder
+    from .structured import StructuredAppendBuffer
+    from .video import VideoScanner, format_video_time
+
+    decoder_options = {'backend': args.backend, 'symbology': args.symbology}
+    if not check_decoder_options(decoder_options):
+        return 2
+
+    sink = None
+    if args.format != 'text':
+        from .sinks import open_sink
+        sink = open_sink(args.format, args.output or "-")
+    elif args.output:
+        output = open(args.output, 'w', encoding='utf-8')
+    else:
+        output = sys.stdout
+
+    history = None
+    if args.history:
+        from .history import ScanHistory
+        from .payload import detect_qr_type
+        history = ScanHistory(args.db)
+
+    decoder = QRDecoder(**decoder_options)
+    found = 0
+    failed = 0
+
+    try:
+        for path in args.paths:
+            scanner = VideoScanner(path, decoder, sparse_interval=args.interval,
+                                   dense_window=args.dense, backfill=not args.no_backfill)
+            # Parts of a multi-part code time out on video time
+            sequences = StructuredAppendBuffer()
+            try:
+                for hit in scanner.hits():
+                    joined = sequences.process([hit.symbol], now=hit.time)
+                    if not joined:
+                        continue
+                    found += 1
+                    symbol = joined[0]
+                    if history:
+                        history.add(symbol.data, detect_qr_type(symbol.data),
+                                    f"{path}#t={hit.time:.3f}", symbol.symbol_type, symbol.backend)
+                    if sink:
+                        sink.write_many([symbol], path,
+                                        extra={'frame': hit.frame, 'video_time_s': round(hit.time, 3)})
+                    else:
+                        print(f"{path}\t{hit.frame}\t{format_video_time(hit.time)}\t"
+                              f"{symbol.symbol_type}\t{symbol.data}", file=output, flush=True)
+            except Exception as e:
+                print(f"{path}: error: {e}", file=sys.stderr)
+                failed += 1
+                continue
+
+            if not args.quiet:
+                report_sequences(sequences)
+                stats = scanner.stats()
+                print(f"{path}: {stats['duration_s']:.1f} s of video in {stats['elapsed_s']:.1f} s "
+                      f"({stats['speed']:.1f}x real time), {stats['decoded']} of {stats['frames']} "
+                      f"frames decoded", file=sys.stderr)
+    finally:
+        if history:
+            history.close()
+        if sink:
+            sink.close()
+        elif args.output:
+            output.close()
+
+    if not args.quiet:
+        print(f"Scanned {len(args.paths)} video(s), found {found} code(s), "
+              f"{failed} error(s)", file=sys.stderr)
+        report_sink(sink, args.format)
+    return 2 if failed else 0
+
+
+def parse_when(value: str) -> float:
+    """Parse an ISO 8601 date/time or a relative age such as 30m, 12h or 7d"""
+    unit = TIME_UNITS.get(value[-1:].lower())
+    if unit and value[:-1].replace('.', '', 1).isdigit():
+        return time.time() - float(value[:-1]) * unit
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid time '{value}' (use e.g. 2025-09-22, 2025-09-22T14:30, 12h or 7d)")
+
+
+def cmd_history(args) -> int:
+    """Search the scan history database"""
+    import json
+    from .history import ScanHistory
+    from .sinks import format_timestamp
+
+    with ScanHistory(args.db) as history:
+        if args.stats:
+            print(f"{history.count()} result(s) in {history.path}")
+            for qr_type, count in history.type_counts().items():
+                print(f"{count:>10}  {qr_type}")
+            return 0
+
+        start = time.perf_counter()
+        entries = history.search(args.query, qr_type=args.type, since=args.since,
+                                 until=args.until, exact=args.exact, limit=args.limit)
+        elapsed = time.perf_counter() - start
+
+    for entry in entries:
+        if args.format == 'jsonl':
+            print(json.dumps({
+                'id': entry.id,
+                'timestamp': format_timestamp(entry.timestamp),
+                'payload': entry.payload,
+                'type': entry.qr_type,
+                'symbol_type': entry.symbol_type,
+                'source': entry.source,
+                'backend': entry.backend,
+            }, ensure_ascii=False))
+        else:
+            stamp = datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{stamp}\t{entry.qr_type}\t{entry.source or ''}\t{entry.payload}")
+
+    if not args.quiet:
+        print(f"{len(entries)} result(s) in {elapsed * 1000.0:.1f} ms", file=sys.stderr)
+    return 0 if entries else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for all sub-commands"""
+    parser = argparse.ArgumentParser(
+        prog="qr_scanner.py",
+        description="QRiftly - Professional QR Code Scanner (headless mode)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = subparsers.add_parser('scan', help="Decode QR codes in image files")
+    scan_parser.add_argument('paths', nargs='+',
+                             help="Image or PDF files, directories or glob patterns (e.g. 'scans/**/*.png')")
+    scan_parser.add_argument('-r', '--recursive', action='store_true',
+                             help="Descend into sub-directories")
+    scan_parser.add_argument('-j', '--workers', type=int, default=1,
+                             help="Number of decoding processes (0 = one per CPU core)")
+    scan_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                             help="Files sent to a worker per task (default: %(default)s)")
+    scan_parser.add_argument('--unordered', action='store_true',
+                             help="Print results as they complete instead of in input order")
+    scan_parser.add_argument('-b', '--backend', choices=BACKEND_CHOICES, default=CASCADE,
+                             help="Decoder backend; 'cascade' tries the cheapest first (default)")
+    scan_parser.add_argument('-s', '--symbology', choices=SYMBOLOGY_CHOICES, default=DEFAULT_SYMBOLOGY,
+                             help="Symbol types to look for: all (default), qr, 2d (QR, SQ Code, "
+                                  "PDF417) or logistics (EAN/UPC, Code 128, ITF, DataBar); "
+                                  "fewer types decode faster")
+    scan_parser.add_argument('--preprocess', default=PREPROCESS_STEPS, metavar='STEPS',
+                             help="Steps retried, in order, on images where nothing decoded: "
+                                  "adaptive, clahe, sharpen, invert, deskew, comma-separated, "
+                                  "or 'none' (default: %(default)s)")
+    scan_parser.add_argument('--budget', type=float, default=PREPROCESS_BUDGET_MS, metavar='MS',
+                             help="Decode time per image after which no further preprocessing "
+                                  "step is tried (default: %(default)s)")
+    scan_parser.add_argument('--roi', choices=('auto', 'on', 'off'), default='auto',
+                             help="Finder-pattern region search before decoding (default: auto, "
+                                  "for images of 1600px and larger)")
+    scan_parser.add_argument('--timings', action='store_true',
+                             help="Report per-stage decode timings (stderr, and stages_ms in JSONL)")
+    scan_parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='text',
+                             help="Output format: tab-separated text, JSON Lines, CSV (with contact "
+                                  "and event columns), vcf (contacts only) or ics (events only)")
+    scan_parser.add_argument('-o', '--output',
+                             help="Write results to this file instead of stdout")
+    scan_parser.add_argument('--cache', nargs='?', const='default', metavar='FILE',
+                             help="Reuse results for unchanged files and identical images, "
+                                  "persisted to FILE (default: per-user data folder)")
+    scan_parser.add_argument('--history', action='store_true',
+                             help="Also record the results in the scan history database")
+    scan_parser.add_argument('--db', help="History database path (default: per-user data folder)")
+    scan_parser.add_argument('-q', '--quiet', action='store_true',
+                             help="Do not print the summary line")
+    scan_parser.set_defaults(func=cmd_scan)
+
+    video_parser = subparsers.add_parser('video', help="Decode QR codes in recorded video files")
+    video_parser.add_argument('paths', nargs='+', help="Video files (anything FFmpeg can read)")
+    video_parser.add_argument('-b', '--backend', choices=BACKEND_CHOICES, default=CASCADE,
+                              help="Decoder backend; 'cascade' tries the cheapest first (default)")
+    video_parser.add_argument('-s', '--symbology', choices=SYMBOLOGY_CHOICES, default=DEFAULT_SYMBOLOGY,
+                              help="Symbol types to look for: all (default), qr, 2d or logistics")
+    video_parser.add_argument('--interval', type=float, default=0.2,
+                              help="Seconds of video between decoded frames while no code is in view "
+                                   "(default: %(default)s)")
+    video_parser.add_argument('--dense', type=float, default=1.0,
+                              help="Seconds after each new code during which every frame is decoded "
+                                   "(default: %(default)s)")
+    video_parser.add_argument('--no-backfill', action='store_true',
+                              help="Do not revisit skipped frames to find where each code first appeared")
+    video_parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='text',
+                              help="Output format: tab-separated text (path, frame, time, symbol type, "
+                                   "content), JSON Lines, CSV, vcf (contacts only) or ics (events only)")
+    video_parser.add_argument('-o', '--output',
+                              help="Write results to this file instead of stdout")
+    video_parser.add_argument('--history', action='store_true',
+                              help="Also record the results in the scan history database")
+    video_parser.add_argument('--db', help="History database path (default: per-user data folder)")
+    video_parser.add_argument('-q', '--quiet', action='store_true',
+                              help="Do not print the summary lines")
+    video_parser.set_defaults(func=cmd_video)
+
+    history_parser = subparsers.add_parser('history', help="Search previously scanned results")
+    history_parser.add_argument('query', nargs='?',
+                                help="Text to find anywhere in the payload")
+    history_parser.add_argument('--exact', action='store_true',
+                                help="Match the whole payload instead of a substring")
+    history_parser.add_argument('-t', '--type',
+                                help="Only results of this type (e.g. URL, 'WiFi Configuration')")
+    history_parser.add_argument('--since', type=parse_when,
+                                help="Only results after this time (ISO date/time, or an age like 12h or 7d)")
+    history_parser.add_argument('--until', type=parse_when,
+                                help="Only results before this time")
+    history_parser.add_argument('-n', '--limit', type=int, default=100,
+                                help="Maximum number of results, newest first (default: %(default)s)")
+    history_parser.add_argument('-f', '--format', choices=('text', 'jsonl'), default='text',
+                                help="Output format: tab-separated text or JSON Lines")
+    history_parser.add_argument('--stats', action='store_true',
+                                help="Print the number of stored results per type")
+    history_parser.add_argument('--db', help="History database path (default: per-user data folder)")
+    history_parser.add_argument('-q', '--quiet', action='store_true',
+                                help="Do not print the summary line")
+    history_parser.set_defaults(func=cmd_history)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for the command line interface"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'workers', None) == 0:
+        args.workers = None  # One worker per CPU core
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # stdout was closed early (e.g. "scan ... -f jsonl | head"). Stop quietly,
+        # and send what is still buffered to devnull so the flush at exit
+        # does not fail again
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return EXIT_BROKEN_PIPE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
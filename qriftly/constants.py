@@ -0,0 +1,41 @@
+"""
+QRiftly shared defaults
+
+Names and defaults needed both by the decoding modules and by the command
+line parser. Nothing here imports OpenCV or pyzbar, so the CLI builds its
+parser from the same values the engine uses without loading either.
+"""
+
+from typing import Dict, FrozenSet, Optional
+
+# Files handed to a worker process at a time by the batch scanner
+DEFAULT_CHUNK_SIZE = 32
+
+# Pseudo-backend name that runs every available backend, cheapest first
+CASCADE = "cascade"
+
+# Concrete backends, as registered in qriftly.backends.BACKENDS
+BACKEND_NAMES = ('pyzbar', 'opencv', 'opencv-aruco', 'opencv-barcode')
+
+# Symbology profiles: the zbar symbol types each one decodes. "all" leaves
+# zbar's defaults alone and runs the QR backends, as before profiles existed.
+# Neither zbar nor OpenCV reads Data Matrix, so "2d" is QR plus the other 2D
+# codes zbar knows
+SYMBOLOGY_PROFILES: Dict[str, Optional[FrozenSet[str]]] = {
+    'all': None,
+    'qr': frozenset({'QRCODE'}),
+    '2d': frozenset({'QRCODE', 'SQCODE', 'PDF417'}),
+    'logistics': frozenset({'EAN13', 'EAN8', 'UPCA', 'UPCE', 'CODE128', 'I25',
+                            'DATABAR', 'DATABAR_EXP'}),
+}
+
+DEFAULT_SYMBOLOGY = 'all'
+
+# Preprocessing steps tried after a failed plain pass, in order
+DEFAULT_STEPS = ('adaptive', 'clahe', 'sharpen', 'invert', 'deskew')
+
+# Time per image for the whole ladder, including the plain pass (ms)
+DEFAULT_BUDGET_MS = 500.0
+
+# Result file formats, as registered in qriftly.sinks.SINKS
+SINK_FORMATS = ('jsonl', 'csv', 'vcf', 'ics')
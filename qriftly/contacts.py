@@ -0,0 +1,484 @@
+"""
+QRiftly contacts and events
+
+Parsers for the structured payloads of business-card and calendar codes:
+vCard 2.1/3.0/4.0, iCalendar VEVENT and MeCard. ``ComponentParser`` is
+incremental: text is fed in chunks (a QR payload, or a .vcf/.ics file read
+piece by piece) and every contact or event is returned as soon as its END
+line arrives, so arbitrarily large files are parsed in constant memory.
+
+Content lines are unfolded as they are read (RFC 6350/5545 folding, plus
+the quoted-printable soft line breaks of vCard 2.1), and QUOTED-PRINTABLE
+values are decoded in their declared CHARSET.
+"""
+
+import hashlib
+import quopri
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Longest line written before folding, in octets (RFC 5545 and 6350)
+FOLD_OCTETS = 75
+
+# "KEY:value;" fields of WIFI:, MECARD: and MATMSG: codes; \; \: \, \\ are escapes
+_FIELD = re.compile(r'([A-Za-z\-]+):((?:\\.|[^;\\])*)(?:;|$)')
+_FIELD_ESCAPE = re.compile(r'\\(.)')
+_CONTENT_LINE = re.compile(r'(?:([A-Za-z0-9\-]+)\.)?([A-Za-z0-9\-]+)((?:;(?:"[^"]*"|[^:;"])*)*):(.*)', re.DOTALL)
+_PARAM = re.compile(r';([^;=:"]+)(?:=((?:"[^"]*"|[^;:"])*))?')
+_PARAM_VALUE = re.compile(r'"([^"]*)"|([^,"]*)')
+_TEXT_ESCAPE = re.compile(r'\\([\\;,:nN])')
+_LINE_END = re.compile(r'\r\n|\r|\n')
+
+# Encodings vCard 2.1 allows as bare parameters ("TEL;CELL;QUOTED-PRINTABLE:")
+_BARE_ENCODINGS = {'QUOTED-PRINTABLE', 'BASE64', 'B', '8BIT', '7BIT'}
+
+TypedValue = Tuple[str, Tuple[str, ...]]  # Value and its TYPE parameters, e.g. ("+1555", ("CELL",))
+
+# Components of an ADR value, in order (RFC 6350 section 6.3.1; MeCard uses the same)
+ADDRESS_PARTS = ('po_box', 'extended', 'street', 'locality', 'region', 'postal_code', 'country')
+
+# An ADR value split into ADDRESS_PARTS, and its TYPE parameters
+TypedAddress = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+def split_fields(body: str) -> Dict[str, List[str]]:
+    """``KEY:value;`` pairs of a WIFI:/MECARD:/MATMSG: body, keys upper-cased"""
+    fields: Dict[str, List[str]] = {}
+    for key, value in _FIELD.findall(body):
+        if '\\' in value:
+            value = _FIELD_ESCAPE.sub(r'\1', value)
+        fields.setdefault(key.upper(), []).append(value)
+    return fields
+
+
+def unescape_text(value: str) -> str:
+    """Undo vCard/iCalendar TEXT escaping (\\n, \\, \\; \\\\)"""
+    if '\\' not in value:
+        return value
+    return _TEXT_ESCAPE.sub(lambda match: '\n' if match.group(1) in 'nN' else match.group(1), value)
+
+
+def escape_text(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def split_components(value: str, separator: str = ';') -> List[str]:
+    """Split a structured value (N, ADR, ORG) on unescaped separators, unescaping each part"""
+    if '\\' not in value:
+        return value.split(separator)
+    parts: List[str] = []
+    for piece in value.split(separator):
+        # A separator preceded by an odd number of backslashes was escaped
+        if parts and (len(parts[-1]) - len(parts[-1].rstrip('\\'))) % 2:
+            parts[-1] += separator + piece
+        else:
+            parts.append(piece)
+    return [unescape_text(part) for part in parts]
+
+
+def address_parts(parts: List[str]) -> Tuple[str, ...]:
+    """Exactly one stripped value per ADDRESS_PARTS entry"""
+    parts = [part.strip() for part in parts[:len(ADDRESS_PARTS)]]
+    return tuple(parts + [""] * (len(ADDRESS_PARTS) - len(parts)))
+
+
+def format_address(parts: Tuple[str, ...]) -> str:
+    """ADR components on one line, empty ones left out"""
+    return ", ".join(part for part in parts if part)
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line at FOLD_OCTETS octets, never inside a UTF-8 sequence"""
+    if len(line) <= FOLD_OCTETS and line.isascii():
+        return line + "\r\n"
+    pieces = []
+    current = ""
+    size = 0
+    limit = FOLD_OCTETS
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            pieces.append(current)
+            current, size, limit = "", 0, FOLD_OCTETS - 1  # Continuations start with a space
+        current += char
+        size += width
+    pieces.append(current)
+    return "\r\n ".join(pieces) + "\r\n"
+
+
+class ContentLine:
+    """One unfolded ``group.NAME;PARAM=value:value`` line"""
+
+    __slots__ = ('group', 'name', 'params', 'value')
+
+    def __init__(self, group: str, name: str, params: Dict[str, List[str]], value: str):
+        self.group = group
+        self.name = name  # Upper-cased
+        self.params = params  # Upper-cased names; TYPE values upper-cased too
+        self.value = value  # Transfer encoding removed, TEXT escapes kept
+
+    @property
+    def types(self) -> Tuple[str, ...]:
+        return tuple(self.params.get('TYPE', ()))
+
+    @property
+    def text(self) -> str:
+        return unescape_text(self.value)
+
+    def __repr__(self):
+        return f"ContentLine({self.name!r}, {self.params!r}, {self.value!r})"
+
+
+def _decode_quoted_printable(value: str, charset: str) -> str:
+    raw = quopri.decodestring(value.encode('utf-8'))
+    try:
+        return raw.decode(charset or 'utf-8')
+    except (LookupError, UnicodeDecodeError):
+        return raw.decode('utf-8', errors='replace')
+
+
+def parse_content_line(line: str) -> Optional[ContentLine]:
+    """Parse one unfolded line; None for lines that are not content lines"""
+    match = _CONTENT_LINE.match(line)
+    if not match:
+        return None
+    group, name, raw_params, value = match.groups()
+
+    params: Dict[str, List[str]] = {}
+    for key, raw_value in _PARAM.findall(raw_params):
+        key = key.strip().upper()
+        if not raw_value and '=' not in key:
+            # vCard 2.1 bare parameter: an encoding or a type ("TEL;CELL;VOICE:")
+            key, raw_value = ('ENCODING', key) if key in _BARE_ENCODINGS else ('TYPE', key)
+        # Commas separate values, except inside quotes ("1 Main St, Springfield")
+        values = [quoted if quoted else plain for quoted, plain in _PARAM_VALUE.findall(raw_value)
+                  if quoted or plain] or [""]
+        if key == 'TYPE':
+            # TYPE="work,voice" is a list too (RFC 6350 writes it that way)
+            values = [item.upper() for value in values for item in value.split(',') if item]
+        params.setdefault(key, []).extend(values)
+
+    encoding = params.get('ENCODING', [""])[0].upper()
+    if encoding in ('QUOTED-PRINTABLE', 'Q'):
+        value = _decode_quoted_printable(value, params.get('CHARSET', [""])[0])
+    return ContentLine(group or "", name.upper(), params, value)
+
+
+class ContentLineReader:
+    """
+    Turns text fed in arbitrary chunks into unfolded logical lines.
+
+    A line is only complete once the next line shows it is not folded, so
+    each line is yielded when its successor arrives (or on ``close``).
+    ``keep_fold_whitespace`` selects vCard 2.1 unfolding, which keeps the
+    whitespace that starts a continuation line.
+    """
+
+    def __init__(self):
+        self.keep_fold_whitespace = False
+        self._partial = ""  # Physical line still being received
+        self._pending: Optional[str] = None  # Logical line that may continue
+
+    def feed(self, chunk: str) -> Iterator[str]:
+        text = self._partial + chunk
+        lines = _LINE_END.split(text)
+        # The last piece has no line end yet; a trailing CR may be half a CRLF
+        self._partial = lines.pop()
+        if text.endswith('\r'):
+            self._partial = lines.pop() + '\r'
+        for line in lines:
+            yield from self._push(line)
+
+    def close(self) -> Iterator[str]:
+        if self._partial:
+            yield from self._push(self._partial.rstrip('\r'))
+            self._partial = ""
+        if self._pending is not None:
+            yield self._pending
+            self._pending = None
+
+    def _push(self, line: str) -> Iterator[str]:
+        pending = self._pending
+        if pending is not None:
+            if line[:1] in (' ', '\t'):
+                self._pending = pending + (line if self.keep_fold_whitespace else line[1:])
+                return
+            if pending.endswith('=') and 'QUOTED-PRINTABLE' in pending.split(':', 1)[0].upper():
+                self._pending = pending[:-1] + line  # Quoted-printable soft line break
+                return
+            yield pending
+        self._pending = line if line else None
+
+
+class Contact:
+    """A parsed vCard or MeCard"""
+
+    __slots__ = ('format', 'version', 'formatted_name', 'family_name', 'given_name',
+                 'additional_names', 'prefix', 'suffix', 'nickname', 'organization',
+                 'department', 'title', 'role', 'phones', 'emails', 'addresses', 'urls',
+                 'note', 'birthday', 'uid')
+
+    def __init__(self, format: str = 'vcard', version: str = ""):
+        self.format = format  # 'vcard' or 'mecard'
+        self.version = version  # "2.1", "3.0", "4.0" ("" for MeCard)
+        self.formatted_name = ""
+        self.family_name = ""
+        self.given_name = ""
+        self.additional_names = ""
+        self.prefix = ""
+        self.suffix = ""
+        self.nickname = ""
+        self.organization = ""
+        self.department = ""
+        self.title = ""
+        self.role = ""
+        self.phones: List[TypedValue] = []
+        self.emails: List[TypedValue] = []
+        self.addresses: List[TypedAddress] = []
+        self.urls: List[str] = []
+        self.note = ""
+        self.birthday = ""
+        self.uid = ""
+
+    @property
+    def name(self) -> str:
+        """Display name: FN, or the given and family names"""
+        if self.formatted_name:
+            return self.formatted_name
+        return " ".join(part for part in (self.prefix, self.given_name, self.additional_names,
+                                          self.family_name, self.suffix) if part)
+
+    def add(self, line: ContentLine):
+        """Apply one content line of a vCard"""
+        name = line.name
+        if name == 'VERSION':
+            self.version = line.value.strip()
+        elif name == 'FN':
+            self.formatted_name = line.text
+        elif name == 'N':
+            parts = split_components(line.value) + [""] * 5
+            (self.family_name, self.given_name, self.additional_names,
+             self.prefix, self.suffix) = (part.strip() for part in parts[:5])
+        elif name == 'NICKNAME':
+            self.nickname = line.text
+        elif name == 'ORG':
+            parts = split_components(line.value)
+            self.organization = parts[0]
+            self.department = ", ".join(part for part in parts[1:] if part)
+        elif name == 'TITLE':
+            self.title = line.text
+        elif name == 'ROLE':
+            self.role = line.text
+        elif name == 'TEL':
+            value = line.text
+            if value.lower().startswith('tel:'):  # vCard 4.0 VALUE=uri
+                value = value[4:]
+            self.phones.append((value, line.types))
+        elif name == 'EMAIL':
+            self.emails.append((line.text, line.types))
+        elif name == 'ADR':
+            self.addresses.append((address_parts(split_components(line.value)), line.types))
+        elif name == 'URL':
+            self.urls.append(line.text)
+        elif name == 'NOTE':
+            self.note = f"{self.note}\n{line.text}" if self.note else line.text
+        elif name == 'BDAY':
+            self.birthday = line.value.strip()
+        elif name == 'UID':
+            self.uid = line.value.strip()
+
+    def to_vcard(self, version: str = "3.0") -> str:
+        """Serialize as a vCard 3.0 or 4.0, folded, with CRLF line ends"""
+        def params(types: Tuple[str, ...]) -> str:
+            return f";TYPE={','.join(types).lower()}" if types else ""
+
+        lines = ["BEGIN:VCARD", f"VERSION:{version}",
+                 f"FN:{escape_text(self.name)}",
+                 "N:" + ";".join(escape_text(part) for part in (self.family_name, self.given_name,
+                                                                 self.additional_names, self.prefix,
+                                                                 self.suffix))]
+        if self.nickname:
+            lines.append(f"NICKNAME:{escape_text(self.nickname)}")
+        if self.organization or self.department:
+            lines.append(f"ORG:{escape_text(self.organization)}"
+                         + (f";{escape_text(self.department)}" if self.department else ""))
+        if self.title:
+            lines.append(f"TITLE:{escape_text(self.title)}")
+        if self.role:
+            lines.append(f"ROLE:{escape_text(self.role)}")
+        lines += [f"TEL{params(types)}:{escape_text(value)}" for value, types in self.phones]
+        lines += [f"EMAIL{params(types)}:{escape_text(value)}" for value, types in self.emails]
+        lines += [f"ADR{params(types)}:" + ";".join(escape_text(part) for part in parts)
+                  for parts, types in self.addresses]
+        lines += [f"URL:{url}" for url in self.urls]
+        if self.birthday:
+            lines.append(f"BDAY:{self.birthday}")
+        if self.note:
+            lines.append(f"NOTE:{escape_text(self.note)}")
+        if self.uid:
+            lines.append(f"UID:{self.uid}")
+        lines.append("END:VCARD")
+        return "".join(fold_line(line) for line in lines)
+
+    def __repr__(self):
+        return f"Contact({self.name!r}, phones={[value for value, _ in self.phones]!r})"
+
+
+class Event:
+    """A parsed iCalendar VEVENT; ``lines`` keeps its properties as written"""
+
+    __slots__ = ('uid', 'summary', 'start', 'end', 'duration', 'location', 'description',
+                 'organizer', 'url', 'status', 'lines')
+
+    def __init__(self):
+        self.uid = ""
+        self.summary = ""
+        self.start = ""  # As written, e.g. 20250922T100000Z
+        self.end = ""
+        self.duration = ""
+        self.location = ""
+        self.description = ""
+        self.organizer = ""
+        self.url = ""
+        self.status = ""
+        self.lines: List[str] = []  # Unfolded property lines, nested components included
+
+    _PROPERTIES = {'UID': 'uid', 'DTSTART': 'start', 'DTEND': 'end', 'DURATION': 'duration',
+                   'URL': 'url', 'STATUS': 'status'}
+    _TEXT_PROPERTIES = {'SUMMARY': 'summary', 'LOCATION': 'location', 'DESCRIPTION': 'description'}
+
+    def add(self, line: ContentLine):
+        """Apply one content line of the event itself (not of a nested VALARM)"""
+        if line.name in self._TEXT_PROPERTIES:
+            setattr(self, self._TEXT_PROPERTIES[line.name], line.text)
+        elif line.name in self._PROPERTIES:
+            setattr(self, self._PROPERTIES[line.name], line.value.strip())
+        elif line.name == 'ORGANIZER':
+            value = line.value.strip()
+            self.organizer = value[7:] if value.lower().startswith('mailto:') else value
+
+    def to_vevent(self) -> str:
+        """Serialize as a VEVENT with the UID and DTSTAMP RFC 5545 requires"""
+        names = {line.split(':', 1)[0].split(';', 1)[0].upper() for line in self.lines}
+        lines = ["BEGIN:VEVENT"]
+        if 'UID' not in names:
+            digest = hashlib.sha1("\n".join(self.lines).encode('utf-8')).hexdigest()
+            lines.append(f"UID:{digest}@qriftly")
+        if 'DTSTAMP' not in names:
+            lines.append("DTSTAMP:" + time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()))
+        lines += self.lines
+        lines.append("END:VEVENT")
+        return "".join(fold_line(line) for line in lines)
+
+    def __repr__(self):
+        return f"Event({self.summary!r}, start={self.start!r})"
+
+
+Component = Union[Contact, Event]
+
+
+class ComponentParser:
+    """
+    Incremental vCard/iCalendar parser.
+
+    ``feed(text)`` returns the contacts and events completed by that chunk;
+    ``close()`` returns what is left, including a component whose END line
+    never came (common in QR payloads). Anything outside VCARD and VEVENT
+    components (VCALENDAR headers, VTIMEZONE) is skipped.
+    """
+
+    def __init__(self):
+        self._reader = ContentLineReader()
+        self._current: Optional[Component] = None
+        self._nested = 0  # Depth of components inside the current one (VALARM)
+
+    def feed(self, chunk: str) -> List[Component]:
+        return self._handle(self._reader.feed(chunk))
+
+    def close(self) -> List[Component]:
+        done = self._handle(self._reader.close())
+        if self._current is not None:
+            done.append(self._current)
+            self._current = None
+        return done
+
+    def _handle(self, lines: Iterable[str]) -> List[Component]:
+        done = []
+        for raw in lines:  # Lazily: a VERSION line changes how later lines unfold
+            line = parse_content_line(raw)
+            if line is None:
+                continue
+            if line.name in ('BEGIN', 'END'):
+                component = line.value.strip().upper()
+                if line.name == 'BEGIN' and self._current is None:
+                    if component == 'VCARD':
+                        self._current = Contact()
+                        self._reader.keep_fold_whitespace = False
+                    elif component == 'VEVENT':
+                        self._current = Event()
+                    continue
+                if self._current is not None:
+                    if self._nested == 0 and line.name == 'END':
+                        done.append(self._current)
+                        self._current = None
+                        continue
+                    self._nested += 1 if line.name == 'BEGIN' else -1
+
+            current = self._current
+            if current is None:
+                continue
+            if isinstance(current, Event):
+                current.lines.append(raw)
+                if self._nested == 0:
+                    current.add(line)
+            else:
+                current.add(line)
+                if line.name == 'VERSION' and current.version == '2.1':
+                    self._reader.keep_fold_whitespace = True
+        return done
+
+
+def iter_components(stream, chunk_size: int = 65536) -> Iterator[Component]:
+    """Yield every contact and event of a text stream (.vcf/.ics), reading it in chunks"""
+    parser = ComponentParser()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_vcard(text: str) -> Contact:
+    """Parse a vCard payload (an empty Contact if it holds none)"""
+    parser = ComponentParser()
+    components = parser.feed(text) + parser.close()
+    return next((item for item in components if isinstance(item, Contact)), Contact())
+
+
+def parse_vevent(text: str) -> Event:
+    """Parse a VEVENT payload, bare or wrapped in a VCALENDAR"""
+    parser = ComponentParser()
+    components = parser.feed(text) + parser.close()
+    return next((item for item in components if isinstance(item, Event)), Event())
+
+
+def parse_mecard(text: str) -> Contact:
+    """Parse a ``MECARD:N:Doe,John;TEL:...;;`` payload"""
+    fields = split_fields(text.partition(':')[2])
+    contact = Contact('mecard')
+    family, _, given = fields.get('N', [""])[0].partition(',')
+    contact.family_name, contact.given_name = family.strip(), given.strip()
+    contact.nickname = fields.get('NICKNAME', [""])[0]
+    contact.organization = fields.get('ORG', [""])[0]
+    contact.phones = [(value, ()) for value in fields.get('TEL', [])]
+    contact.phones += [(value, ('VIDEO',)) for value in fields.get('TEL-AV', [])]
+    contact.emails = [(value, ()) for value in fields.get('EMAIL', [])]
+    # ADR is "PO box,extended,street,city,region,postal code,country"
+    contact.addresses = [(address_parts(value.split(',')), ()) for value in fields.get('ADR', [])]
+    contact.urls = fields.get('URL', [])
+    contact.note = "\n".join(fields.get('NOTE', []))
+    contact.birthday = fields.get('BDAY', [""])[0]
+    return contact
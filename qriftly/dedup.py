@@ -0,0 +1,78 @@
+"""
+QRiftly temporal de-duplication
+
+Continuous scanning sees the same code in many consecutive frames. The
+deduplicator reports each payload once while it stays in view, and again
+only after it has been out of view for a while or its report window has
+expired. Entries live in a bounded LRU so memory stays flat in long sessions.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from .symbols import DecodedSymbol
+
+# Seconds a payload must be unseen before it counts as having left the frame.
+# Longer than the scheduler's refresh interval, so a code held still (whose
+# frames are skipped as unchanged) is not mistaken for a new appearance
+LEAVE_TIMEOUT = 2.0
+
+# Seconds after which a payload that never left the frame is reported again
+REPORT_WINDOW = 30.0
+
+# Distinct payloads remembered at once
+MAX_ENTRIES = 512
+
+
+class TemporalDeduplicator:
+    """Time-windowed LRU filter for decoded payloads"""
+
+    def __init__(self, leave_timeout: float = LEAVE_TIMEOUT,
+                 window: float = REPORT_WINDOW, max_entries: int = MAX_ENTRIES):
+        self.leave_timeout = leave_timeout
+        self.window = window
+        self.max_entries = max_entries
+        # payload -> [last seen, last reported]
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reported = 0
+        self.suppressed = 0
+
+    def is_new(self, payload: str, now: Optional[float] = None) -> bool:
+        """Record a sighting of ``payload``; True if it should be reported"""
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(payload)
+            if entry is not None:
+                last_seen, last_reported = entry
+                entry[0] = now
+                self._entries.move_to_end(payload)
+                if now - last_seen <= self.leave_timeout and now - last_reported <= self.window:
+                    self.suppressed += 1
+                    return False
+                entry[1] = now
+            else:
+                self._entries[payload] = [now, now]
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)  # Least recently seen
+
+            self.reported += 1
+            return True
+
+    def filter(self, symbols: Iterable[DecodedSymbol],
+               now: Optional[float] = None) -> List[DecodedSymbol]:
+        """Return only the symbols that should be reported"""
+        if now is None:
+            now = time.monotonic()
+        return [symbol for symbol in symbols if self.is_new(symbol.data, now)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,341 @@
+"""
+QRiftly documents
+
+Multi-page and oversized inputs. ``iter_pages`` streams the frames of a
+multi-page TIFF or animated GIF and the pages of a PDF one at a time, so
+only the page being decoded is in memory. ``iter_tiles`` cuts a large page
+into overlapping tiles. Uncompressed rasters (TIFF, BMP, PPM) and PDF pages
+are read one band of rows at a time, which keeps peak memory proportional
+to the page width rather than its area. Compressed rasters are loaded once
+as 8-bit grayscale and tiled from that buffer, up to MAX_LOADED_PIXELS;
+larger ones are rejected.
+
+Pillow's decompression-bomb limit stays in force. Only files it refuses
+that can be read band by band are reopened without it.
+
+PDF support needs ``pypdfium2`` (``pip install pypdfium2``).
+"""
+
+import importlib.util
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import BmpImagePlugin, Image, PpmImagePlugin, TiffImagePlugin
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom in page pixels
+
+PDF_EXTENSIONS = ('.pdf',)
+
+# Resolution PDF pages are rendered at; 200 dpi keeps 0.5 mm modules decodable
+PDF_DPI = 200
+
+# Pages with at least this many pixels are decoded tile by tile
+TILED_MIN_PIXELS = 40_000_000
+
+# Tile edge, and how much neighbouring tiles share. The overlap must be wider
+# than the largest code expected so every code lies whole inside some tile
+TILE_SIZE = 2048
+TILE_OVERLAP = 384
+
+# Largest compressed raster decoded whole (as 8-bit grayscale, one byte per
+# pixel); compressed rasters cannot be read band by band
+MAX_LOADED_PIXELS = 120_000_000
+
+# Formats whose uncompressed rows can be read band by band, tried in this
+# order for files Pillow refuses as decompression bombs
+_BANDED_FORMATS = (TiffImagePlugin.TiffImageFile, BmpImagePlugin.BmpImageFile,
+                   PpmImagePlugin.PpmImageFile)
+
+# Bits per pixel of the raw modes whose rows can be addressed in the file
+_RAW_BITS = {'1': 1, '1;I': 1, 'L': 8, 'P': 8, 'RGB': 24, 'BGR': 24,
+             'RGBA': 32, 'RGBX': 32, 'BGRA': 32, 'BGRX': 32, 'CMYK': 32}
+
+_pdfium_lock = threading.Lock()  # pdfium is not thread-safe
+
+
+def pdf_available() -> bool:
+    """Whether the optional PDF renderer is installed"""
+    return importlib.util.find_spec('pypdfium2') is not None
+
+
+def is_pdf(path: str) -> bool:
+    return path.lower().endswith(PDF_EXTENSIONS)
+
+
+def page_location(path: str, page: Optional[int]) -> str:
+    """``path`` or ``path#page=N`` (the PDF open-parameter form)"""
+    return path if page is None else f"{path}#page={page}"
+
+
+def _open_banded(path: str) -> Image.Image:
+    """
+    Open a file Pillow refused as too large, if its rows can be read band
+    by band; anything else is rejected rather than loaded whole.
+
+    The format plugins are used directly because only Image.open applies
+    the decompression-bomb check, and the limit itself is process-wide.
+    """
+    for image_class in _BANDED_FORMATS:
+        try:
+            image = image_class(path)
+        except SyntaxError:
+            continue  # Not this format
+        if _band_tiles(image, 0, 1):
+            return image
+        image.close()
+        break
+    raise RuntimeError(f"{path}: image too large to decode (only uncompressed TIFF, BMP and PPM "
+                       f"files are read beyond Pillow's {Image.MAX_IMAGE_PIXELS:,} pixel limit)")
+
+
+def _open_image(path: str, frame: int = 0) -> Image.Image:
+    try:
+        image = Image.open(path)
+    except Image.DecompressionBombError:
+        image = _open_banded(path)
+    if frame:
+        image.seek(frame)
+    return image
+
+
+def _to_gray(image: Image.Image) -> np.ndarray:
+    if image.mode != 'L':
+        image = image.convert('L')
+    return np.asarray(image)
+
+
+def _band_tiles(image: Image.Image, top: int, bottom: int) -> Optional[list]:
+    """
+    Tile descriptors that decode only rows ``top``..``bottom`` of an image.
+
+    Works for uncompressed full-width strips, where each row sits at a known
+    file offset; returns None for anything else (compressed data, tiled TIFFs).
+    """
+    width = image.size[0]
+    tiles = []
+    for tile in getattr(image, 'tile', None) or ():
+        codec, (x0, y0, x1, y1), offset, args = tile
+        if isinstance(args, str):  # PPM gives just the raw mode
+            args = (args,)
+        if codec != 'raw' or x0 != 0 or x1 != width or not isinstance(args, tuple):
+            return None
+        rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+        if rawmode not in _RAW_BITS or orientation not in (1, -1):
+            return None
+        stride = stride or (width * _RAW_BITS[rawmode] + 7) // 8
+
+        first, last = max(y0, top), min(y1, bottom)
+        if first >= last:
+            continue
+        if orientation == 1:
+            offset += (first - y0) * stride
+        else:  # Bottom-up rows (BMP): the band starts at its last row
+            offset += (y1 - last) * stride
+        tiles.append((codec, (0, first - top, width, last - top), offset, (rawmode, stride, orientation)))
+    return tiles
+
+
+def _load_band(image: Image.Image, tiles: list, width: int, height: int) -> Optional[np.ndarray]:
+    """
+    Load only ``tiles`` by shrinking the image to the band's size.
+
+    This relies on Pillow internals (``tile``, ``_size`` and TIFF's
+    ``_tile_size``); returns None when they are missing or behave
+    differently, so the caller can fall back to a plain crop.
+    """
+    if not hasattr(image, '_size'):
+        return None
+    image.tile = tiles
+    image._size = (width, height)
+    if image.size != (width, height):
+        return None
+    if hasattr(image, '_tile_size'):  # TIFF checks this against the bomb limit on load
+        image._tile_size = image._size
+    try:
+        image.load()
+    except (OSError, ValueError):
+        return None
+    gray = _to_gray(image)
+    return gray if gray.shape == (height, width) else None
+
+
+class Page(ABC):
+    """
+    One page or frame of a document.
+
+    ``number`` is 1-based; single-frame images have ``count`` 1. ``read``
+    returns a region as an 8-bit grayscale array.
+    """
+
+    def __init__(self, number: int, count: int, width: int, height: int):
+        self.number = number
+        self.count = count
+        self.width = width
+        self.height = height
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @abstractmethod
+    def read(self, box: Optional[Box] = None) -> np.ndarray:
+        """Pixels of ``box`` (default: the whole page) as 8-bit grayscale"""
+
+    def release(self):
+        """Drop any pixels held for this page"""
+
+
+class ImagePage(Page):
+    """A frame of a raster image, read lazily"""
+
+    def __init__(self, path: str, frame: int, count: int, width: int, height: int):
+        super().__init__(frame + 1, count, width, height)
+        self.path = path
+        self.frame = frame
+        self._gray: Optional[np.ndarray] = None
+        self._banded: Optional[bool] = None
+
+    def _read_band(self, top: int, bottom: int) -> Optional[np.ndarray]:
+        """
+        Decode just rows ``top``..``bottom`` straight from the file; None
+        if the file's rows cannot be read band by band
+        """
+        with _open_image(self.path, self.frame) as image:
+            tiles = _band_tiles(image, top, bottom)
+            if not tiles:
+                return None
+            band = _load_band(image, tiles, self.width, bottom - top)
+        if band is None:  # This Pillow cannot be steered; read the rows the public way
+            with _open_image(self.path, self.frame) as image:
+                band = _to_gray(image.crop((0, top, self.width, bottom)))
+        return band
+
+    def _load(self) -> np.ndarray:
+        if self._gray is None:
+            gray = None
+            if self.count == 1:
+                # OpenCV decodes straight to one byte per pixel, with no RGB copy
+                gray = cv2.imread(self.path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                with _open_image(self.path, self.frame) as image:
+                    gray = _to_gray(image)
+            self._gray = gray
+        return self._gray
+
+    def read(self, box: Optional[Box] = None) -> np.ndarray:
+        if box is None:
+            return self._load()
+        left, top, right, bottom = box
+        if self._gray is None and self._banded is not False and self.pixels >= TILED_MIN_PIXELS:
+            band = self._read_band(top, bottom)
+            self._banded = band is not None
+            if band is not None:
+                return band[:, left:right]
+        return self._load()[top:bottom, left:right]
+
+    def release(self):
+        self._gray = None
+
+
+class PdfPage(Page):
+    """A PDF page rendered at ``dpi``; regions are rendered on their own"""
+
+    def __init__(self, page, number: int, count: int, dpi: int = PDF_DPI):
+        self._page = page
+        self.scale = dpi / 72.0
+        points_width, points_height = page.get_size()
+        # The size pdfium renders at, which rounds up
+        super().__init__(number, count, math.ceil(points_width * self.scale),
+                         math.ceil(points_height * self.scale))
+
+    def read(self, box: Optional[Box] = None) -> np.ndarray:
+        left, top, right, bottom = box or (0, 0, self.width, self.height)
+        # pdfium crops (left, bottom, right, top) margins, in points, and rounds
+        # each back up to pixels; half a pixel less keeps float error from
+        # adding a pixel
+        crop = tuple((margin - 0.5) / self.scale
+                     for margin in (left, self.height - bottom, self.width - right, top))
+        with _pdfium_lock:
+            bitmap = self._page.render(scale=self.scale, crop=crop, grayscale=True)
+            gray = bitmap.to_numpy()
+        if gray.ndim == 3:
+            gray = gray[:, :, 0]
+        return np.ascontiguousarray(gray)
+
+    def release(self):
+        with _pdfium_lock:
+            self._page.close()
+
+
+def _iter_pdf_pages(path: str, dpi: int) -> Iterator[Page]:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise RuntimeError("PDF support needs pypdfium2 (pip install pypdfium2)")
+
+    with _pdfium_lock:
+        document = pdfium.PdfDocument(path)
+    try:
+        count = len(document)
+        for index in range(count):
+            with _pdfium_lock:
+                page = document[index]
+            yield PdfPage(page, index + 1, count, dpi)
+    finally:
+        with _pdfium_lock:
+            document.close()
+
+
+def _iter_image_pages(path: str) -> Iterator[Page]:
+    # Frames are visited in order on one handle; GIF frames can only be
+    # composed by seeking forward from the previous one
+    with _open_image(path) as image:
+        count = getattr(image, 'n_frames', 1)
+        for frame in range(count):
+            if frame:
+                image.seek(frame)
+            width, height = image.size
+            page = ImagePage(path, frame, count, width, height)
+            if page.pixels < TILED_MIN_PIXELS:
+                page._gray = _to_gray(image)
+            elif page.pixels > MAX_LOADED_PIXELS and not _band_tiles(image, 0, 1):
+                raise RuntimeError(f"{path}: {page.pixels / 1e6:.0f} MP compressed page is too large "
+                                   f"to decode (limit {MAX_LOADED_PIXELS / 1e6:.0f} MP; save it as "
+                                   f"uncompressed TIFF to scan it band by band)")
+            yield page
+
+
+def iter_pages(path: str, dpi: int = PDF_DPI) -> Iterator[Page]:
+    """
+    Yield the pages of a PDF or the frames of an image, one at a time.
+
+    Pages are read lazily; each is released once the caller moves on.
+    """
+    pages = _iter_pdf_pages(path, dpi) if is_pdf(path) else _iter_image_pages(path)
+    for page in pages:
+        try:
+            yield page
+        finally:
+            page.release()
+
+
+def iter_tiles(page: Page, size: int = TILE_SIZE,
+               overlap: int = TILE_OVERLAP) -> Iterator[Tuple[Box, np.ndarray]]:
+    """
+    Yield (box, gray) tiles of a page.
+
+    Each band of rows is read once and its tiles are views into it, so at
+    most one band is held at a time.
+    """
+    step = max(1, size - overlap)
+    for top in range(0, max(page.height - overlap, 1), step):
+        bottom = min(top + size, page.height)
+        band = page.read((0, top, page.width, bottom))
+        for left in range(0, max(page.width - overlap, 1), step):
+            right = min(left + size, page.width)
+            yield (left, top, right, bottom), band[:, left:right]
+        del band
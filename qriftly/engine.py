@@ -0,0 +1,457 @@
+"""
+QRiftly decoding engine
+
+Headless QR code decoding shared by the desktop GUI and the command line.
+This module must never import tkinter, ImageTk or pyautogui so that batch
+jobs can run on machines without a display.
+"""
+
+import sys
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .backends import CASCADE, DEFAULT_SYMBOLOGY, cascade_order, get_backend, symbology_set
+from .cache import DecodeCache, content_key, file_key
+from .documents import TILED_MIN_PIXELS, Page, iter_pages, iter_tiles
+from .preprocess import DEFAULT_BUDGET_MS, DEFAULT_STEPS, PreprocessLadder
+from .roi import COVERED_FRACTION, Region, coverage, crop_for_decode, find_regions
+from .symbols import DecodedSymbol, decode_payload  # noqa: F401 (re-exported)
+
+
+# Backend name, symbology profile and that profile's symbol types (None for
+# every type). Replaced as a whole so a decode never mixes two settings
+Selection = Tuple[str, str, Optional[FrozenSet[str]]]
+
+# Symbol types the region search can find all of on its own
+_ROI_SYMBOLOGIES = frozenset({'QRCODE'})
+
+
+def _select(backend: str, symbology: str) -> Selection:
+    """Validated selection; ValueError for unknown names or a backend that cannot read the profile"""
+    symbologies = symbology_set(symbology)
+    if backend != CASCADE:
+        reader = get_backend(backend)
+        if symbologies is not None and not reader.handles(symbologies):
+            raise ValueError(f"Backend '{backend}' cannot read the '{symbology}' symbologies")
+    return backend, symbology, symbologies
+
+
+def load_image(path: str) -> Image.Image:
+    """Open an image file for decoding"""
+    image = Image.open(path)
+    image.load()
+    return image
+
+
+def unique_symbols(symbols: List[DecodedSymbol]) -> List[DecodedSymbol]:
+    """Drop symbols whose payload was already seen, keeping the first"""
+    results = []
+    seen = set()
+    for symbol in symbols:
+        if symbol.data in seen:  # Avoid duplicates
+            continue
+        seen.add(symbol.data)
+        results.append(symbol)
+    return results
+
+
+def _translate(symbol: DecodedSymbol, region: Region, factor: float) -> DecodedSymbol:
+    """Map a symbol found in an (upscaled) crop back to full-image coordinates"""
+    x0, y0 = region[0], region[1]
+    symbol.polygon = [(int(x / factor) + x0, int(y / factor) + y0) for x, y in symbol.polygon]
+    if symbol.rect:
+        x, y, w, h = symbol.rect
+        symbol.rect = (int(x / factor) + x0, int(y / factor) + y0, int(w / factor), int(h / factor))
+    return symbol
+
+
+class StageTimer:
+    """Records milliseconds spent in each decode stage into a dict"""
+
+    __slots__ = ('timings', '_last')
+
+    def __init__(self, timings: Optional[Dict[str, float]]):
+        self.timings = timings
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + (now - self._last) * 1000.0
+        self._last = now
+
+    def reset(self):
+        """Start the next stage now, leaving out time spent elsewhere"""
+        self._last = time.perf_counter()
+
+
+class QRDecoder:
+    """
+    Stateless-by-default QR decoder.
+
+    The GUI, the CLI and the batch workers all go through this class so
+    that every entry point decodes images the same way.
+    """
+
+    def __init__(self, backend: str = CASCADE, cascade: Optional[List[str]] = None,
+                 roi: str = 'auto', roi_min_side: int = 1600,
+                 cache: Optional[DecodeCache] = None, symbology: str = DEFAULT_SYMBOLOGY,
+                 preprocess: Optional[Sequence[str]] = DEFAULT_STEPS,
+                 preprocess_budget_ms: float = DEFAULT_BUDGET_MS):
+        """
+        ``backend`` is a backend name from qriftly.backends or "cascade",
+        which tries ``cascade`` (default: every backend) cheapest first and
+        stops at the first backend that decodes anything.
+
+        ``roi`` controls the finder-pattern region search: "auto" uses it
+        for images whose longest side is at least ``roi_min_side``, "on"
+        always and "off" never. Regions are decoded as upscaled crops and
+        the whole image is still decoded and merged in, except when the
+        profile is QR-only and a region decoded, or when the regions cover
+        the image.
+
+        With a ``cache``, results are reused for identical grayscale buffers
+        and for files whose path, modification time and size are unchanged.
+
+        ``symbology`` names a profile from SYMBOLOGY_PROFILES. zbar only
+        looks for that profile's symbol types, and the cascade skips
+        backends that cannot read any of them.
+
+        Images that decode to nothing are retried with the ``preprocess``
+        steps from qriftly.preprocess (adaptive threshold, CLAHE, sharpen,
+        invert, deskew), one at a time, until one decodes or
+        ``preprocess_budget_ms`` has passed; None or () disables this.
+        Per-step statistics are kept in ``self.ladder.stats()``.
+        """
+        selection = _select(backend, symbology)  # Fail early on unknown names
+        if roi not in ('auto', 'on', 'off'):
+            raise ValueError(f"Invalid roi mode '{roi}' (choose from: auto, on, off)")
+        self._selection = selection
+        self._select_lock = threading.Lock()
+        self.cascade = list(cascade) if cascade else None
+        self.roi = roi
+        self.roi_min_side = roi_min_side
+        self.cache = cache
+        self.ladder = PreprocessLadder(preprocess, preprocess_budget_ms) if preprocess else None
+        # Per-thread grayscale buffers, reused for same-sized camera frames
+        self._local = threading.local()
+
+    @property
+    def backend(self) -> str:
+        return self._selection[0]
+
+    @property
+    def symbology(self) -> str:
+        return self._selection[1]
+
+    @property
+    def symbologies(self) -> Optional[FrozenSet[str]]:
+        return self._selection[2]
+
+    def set_backend(self, backend: str):
+        """
+        Switch the backend for later decodes; ValueError if it cannot read
+        the current symbology profile
+        """
+        with self._select_lock:
+            self._selection = _select(backend, self._selection[1])
+
+    def set_symbology(self, profile: str):
+        """
+        Switch the symbology profile for later decodes. A backend that cannot
+        read the profile's types is replaced by the cascade; check
+        ``backend`` afterwards.
+        """
+        symbologies = symbology_set(profile)
+        with self._select_lock:
+            backend = self._selection[0]
+            if (backend != CASCADE and symbologies is not None
+                    and not get_backend(backend).handles(symbologies)):
+                backend = CASCADE
+            self._selection = (backend, profile, symbologies)
+
+    def _selection_for(self, backend: Optional[str]) -> Selection:
+        """The current selection, read once, with a per-call backend override"""
+        selection = self._selection
+        if backend:
+            selection = (backend,) + selection[1:]
+        return selection
+
+    def _gray_buffer(self, shape: Tuple[int, int]) -> np.ndarray:
+        """Return this thread's preallocated gray buffer for a frame size"""
+        buffer = getattr(self._local, 'gray', None)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._local.gray = buffer
+        return buffer
+
+    def to_grayscale(self, image) -> np.ndarray:
+        """
+        Convert a PIL image or BGR/BGRA/grayscale array to an 8-bit gray array.
+
+        PIL images go straight to mode 'L'; arrays take a single colour
+        conversion into a reused per-thread buffer, so camera frames do not
+        allocate a new array each time.
+        """
+        if hasattr(image, 'save'):  # PIL Image
+            if image.mode != 'L':
+                image = image.convert('L')
+            return np.asarray(image)
+
+        image = np.asarray(image)
+        if image.ndim == 2:
+            if image.dtype != np.uint8:
+                image = image.astype(np.uint8)
+            return image
+
+        channels = image.shape[2]
+        if channels == 1:
+            return np.ascontiguousarray(image[:, :, 0])
+
+        code = cv2.COLOR_BGRA2GRAY if channels == 4 else cv2.COLOR_BGR2GRAY
+        buffer = self._gray_buffer(image.shape[:2])
+        return cv2.cvtColor(image, code, dst=buffer)
+
+    def _decode_backends(self, gray: np.ndarray, selection: Selection) -> List[DecodedSymbol]:
+        """Run one backend, or the cascade until a backend decodes something"""
+        name, symbology, symbologies = selection
+        if name != CASCADE:
+            return get_backend(name).decode(gray, symbologies)
+
+        backends = cascade_order(self.cascade, symbologies)
+        if not backends:
+            raise RuntimeError(f"No decoder backend available for the '{symbology}' symbologies")
+
+        for candidate in backends:
+            try:
+                symbols = candidate.decode(gray, symbologies)
+            except Exception as e:
+                print(f"{candidate.name} decode error: {e}", file=sys.stderr)
+                continue
+            if symbols:
+                return symbols
+        return []
+
+    def cache_config(self, backend: Optional[str] = None, escalate: bool = True) -> str:
+        """Settings that change decode results; part of every cache key"""
+        return self._cache_config(self._selection_for(backend), escalate)
+
+    def _cache_config(self, selection: Selection, escalate: bool) -> str:
+        backend, symbology, _ = selection
+        ladder = self.ladder.config() if self.ladder and escalate else ""
+        return (f"{backend}|{','.join(self.cascade or [])}|{self.roi}|"
+                f"{self.roi_min_side}|{symbology}|{ladder}")
+
+    def _use_roi(self, gray: np.ndarray, symbologies: Optional[FrozenSet[str]]) -> bool:
+        if symbologies is not None and 'QRCODE' not in symbologies:
+            return False  # The region search looks for QR finder patterns
+        if self.roi == 'auto':
+            return max(gray.shape) >= self.roi_min_side
+        return self.roi == 'on'
+
+    def decode_gray(self, gray: np.ndarray, backend: Optional[str] = None,
+                    timings: Optional[Dict[str, float]] = None,
+                    escalate: bool = True) -> List[DecodedSymbol]:
+        """
+        Decode an 8-bit grayscale array, searching candidate regions first.
+
+        If nothing decodes and ``escalate`` is set, the preprocessing ladder
+        retries the image; found symbols record the step in ``preprocess``.
+        """
+        return self._decode_gray(gray, self._selection_for(backend), timings, escalate)[0]
+
+    def _decode_gray(self, gray: np.ndarray, selection: Selection,
+                     timings: Optional[Dict[str, float]], escalate: bool,
+                     roi: bool = True) -> Tuple[List[DecodedSymbol], bool]:
+        """Symbols, and whether they can be cached (False if the ladder ran out of time)"""
+        started = time.perf_counter()
+        symbols = self._decode_plain(gray, selection, timings, roi)
+        if symbols or not escalate or self.ladder is None:
+            return symbols, True
+
+        timer = StageTimer(timings)
+        symbols, _, complete = self.ladder.run(gray, lambda image: self._decode_backends(image, selection),
+                                               started)
+        timer.mark('preprocess')
+        if not complete and timings is not None:
+            timings['out_of_budget'] = 1
+        return unique_symbols(symbols), complete
+
+    def _decode_plain(self, gray: np.ndarray, selection: Selection,
+                      timings: Optional[Dict[str, float]], roi: bool = True) -> List[DecodedSymbol]:
+        timer = StageTimer(timings)
+
+        if roi and self._use_roi(gray, selection[2]):
+            regions = find_regions(gray)
+            timer.mark('detect')
+            if timings is not None:
+                timings['regions'] = len(regions)
+
+            symbols = []
+            for region in regions:
+                crop, factor = crop_for_decode(gray, region)
+                symbols.extend(_translate(symbol, region, factor)
+                               for symbol in self._decode_backends(crop, selection))
+            timer.mark('roi_decode')
+            # Finder patterns only point at QR codes; other types still need the full decode
+            if ((symbols and selection[2] == _ROI_SYMBOLOGIES)
+                    or coverage(regions, gray.shape) >= COVERED_FRACTION):
+                return unique_symbols(symbols)
+        else:
+            symbols = []
+
+        symbols.extend(self._decode_backends(gray, selection))
+        timer.mark('full_decode')
+        return unique_symbols(symbols)
+
+    def decode(self, image, backend: Optional[str] = None,
+               timings: Optional[Dict[str, float]] = None,
+               use_cache: bool = True, escalate: bool = True) -> List[DecodedSymbol]:
+        """
+        Decode every symbol in an image, dropping duplicate payloads.
+
+        ``backend`` overrides the decoder's backend for this call only.
+        Each returned symbol records which backend produced it. Pass a dict
+        as ``timings`` to receive milliseconds per stage (grayscale, cache,
+        detect, roi_decode, full_decode, preprocess), the number of
+        candidate regions, ``cache_hit`` when the result came from the
+        cache and ``out_of_budget`` when the ladder ran out of time (such
+        results are not cached). Pass ``use_cache=False`` for content that never repeats
+        (camera frames), and ``escalate=False`` where a failed image is
+        cheaper to skip than to retry (live video, most frames are empty).
+        """
+        return self._decode(image, self._selection_for(backend), timings, use_cache, escalate)[0]
+
+    def _decode(self, image, selection: Selection, timings: Optional[Dict[str, float]],
+                use_cache: bool, escalate: bool) -> Tuple[List[DecodedSymbol], bool]:
+        """
+        ``decode`` with the settings read once, so the cache key matches the
+        decode; also returns whether the result can be cached
+        """
+        timer = StageTimer(timings)
+        gray = self.to_grayscale(image)
+        timer.mark('grayscale')
+        if self.cache is None or not use_cache:
+            return self._decode_gray(gray, selection, timings, escalate)
+
+        key = content_key(gray, self._cache_config(selection, escalate))
+        symbols = self.cache.get(key)
+        timer.mark('cache')
+        if symbols is not None:
+            if timings is not None:
+                timings['cache_hit'] = 1
+            return symbols, True
+
+        symbols, complete = self._decode_gray(gray, selection, timings, escalate)
+        if complete:
+            self.cache.put(key, symbols)
+        return symbols, complete
+
+    def decode_texts(self, image) -> List[str]:
+        """Decode an image and return only the text payloads"""
+        try:
+            return [symbol.data for symbol in self.decode(image)]
+        except Exception as e:
+            print(f"QR decode error: {e}", file=sys.stderr)
+            return []
+
+    def decode_page(self, page: Page, backend: Optional[str] = None,
+                    timings: Optional[Dict[str, float]] = None) -> List[DecodedSymbol]:
+        """
+        Decode one page of a document.
+
+        Pages of TILED_MIN_PIXELS or more are decoded as overlapping tiles,
+        read a band at a time, so the decoder never sees the whole page.
+        Tiles skip the region search and the preprocessing ladder.
+        """
+        return self._decode_page(page, self._selection_for(backend), timings)[0]
+
+    def _decode_page(self, page: Page, selection: Selection,
+                     timings: Optional[Dict[str, float]]) -> Tuple[List[DecodedSymbol], bool]:
+        complete = True
+        if page.pixels < TILED_MIN_PIXELS:
+            symbols, complete = self._decode(page.read(), selection, timings, True, True)
+        else:
+            symbols = []
+            timer = StageTimer(timings)
+            for box, tile in iter_tiles(page):
+                timer.mark('load')
+                if timings is not None:
+                    timings['tiles'] = timings.get('tiles', 0) + 1
+                # Most tiles hold no code; retrying or region-searching each of
+                # them would swamp the budget
+                found, _ = self._decode_gray(tile, selection, timings, escalate=False, roi=False)
+                symbols.extend(_translate(symbol, box, 1.0) for symbol in found)
+                timer.reset()
+            symbols = unique_symbols(symbols)  # Codes in the overlaps are found twice
+
+        if page.count > 1:
+            for symbol in symbols:
+                symbol.page = page.number
+        return symbols, complete
+
+    def decode_file(self, path: str, backend: Optional[str] = None,
+                    timings: Optional[Dict[str, float]] = None,
+                    on_page: Optional[Callable[[Page, List[DecodedSymbol]], None]] = None
+                    ) -> List[DecodedSymbol]:
+        """
+        Open an image or PDF file and decode every symbol on every page.
+
+        Pages are decoded one at a time; ``on_page(page, symbols)`` is called
+        after each. Symbols from multi-page files carry their page number.
+        """
+        selection = self._selection_for(backend)
+        timer = StageTimer(timings)
+        key = None
+        if self.cache is not None:
+            key = file_key(path, self._cache_config(selection, True))
+            symbols = self.cache.get(key)
+            timer.mark('cache')
+            if symbols is not None:
+                if timings is not None:
+                    timings['cache_hit'] = 1
+                return symbols  # Unchanged file: not even opened
+
+        symbols = []
+        complete = True
+        for page in iter_pages(path):
+            timer.mark('load')
+            found, page_complete = self._decode_page(page, selection, timings)
+            complete = complete and page_complete
+            if timings is not None:
+                timings['pages'] = page.count
+            if on_page:
+                on_page(page, found)
+            symbols.extend(found)
+            timer.reset()
+        if key and complete:
+            self.cache.put(key, symbols)
+        return symbols
+
+    def remember_file(self, path: str, symbols: List[DecodedSymbol],
+                      backend: Optional[str] = None):
+        """Cache a file result decoded elsewhere (e.g. by a batch worker)"""
+        if self.cache is not None:
+            self.cache.put(file_key(path, self.cache_config(backend)), symbols)
+
+
+_default_decoder = None
+
+
+def get_default_decoder() -> QRDecoder:
+    """Return the shared module-level decoder"""
+    global _default_decoder
+    if _default_decoder is None:
+        _default_decoder = QRDecoder()
+    return _default_decoder
+
+
+def decode_qr_codes(image) -> List[str]:
+    """Decode QR codes from an image using the default decoder"""
+    return get_default_decoder().decode_texts(image)
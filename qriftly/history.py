@@ -0,0 +1,282 @@
+"""
+QRiftly scan history
+
+Every result can be kept in a local SQLite database so it survives restarts
+and can be searched later. Writes are queued and committed in batches by a
+background thread (one transaction per batch, WAL journal), so recording a
+result never blocks the caller. Reads use their own connection per thread
+and are served from indexes on payload hash, type and timestamp; substring
+search uses an FTS5 trigram index when the SQLite build provides one.
+"""
+
+import hashlib
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Rows committed per transaction at most
+DEFAULT_BATCH_SIZE = 500
+
+# Longest a queued row waits before it is committed, in seconds
+FLUSH_INTERVAL = 0.5
+
+# Rows returned by a search unless a limit is given
+DEFAULT_SEARCH_LIMIT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id           INTEGER PRIMARY KEY,
+    timestamp    REAL    NOT NULL,
+    payload      TEXT    NOT NULL,
+    payload_hash INTEGER NOT NULL,
+    type         TEXT    NOT NULL,
+    symbol_type  TEXT,
+    source       TEXT,
+    backend      TEXT
+);
+CREATE INDEX IF NOT EXISTS scans_payload_hash ON scans (payload_hash);
+CREATE INDEX IF NOT EXISTS scans_type_timestamp ON scans (type, timestamp);
+CREATE INDEX IF NOT EXISTS scans_timestamp ON scans (timestamp);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS scans_fts USING fts5 (
+    payload, content='scans', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS scans_fts_insert AFTER INSERT ON scans BEGIN
+    INSERT INTO scans_fts (rowid, payload) VALUES (new.id, new.payload);
+END;
+CREATE TRIGGER IF NOT EXISTS scans_fts_delete AFTER DELETE ON scans BEGIN
+    INSERT INTO scans_fts (scans_fts, rowid, payload) VALUES ('delete', old.id, old.payload);
+END;
+"""
+
+# Trigram indexes cannot answer queries shorter than this
+MIN_FTS_QUERY = 3
+
+_COLUMNS = ("scans.id, scans.timestamp, scans.payload, scans.type, "
+            "scans.symbol_type, scans.source, scans.backend")
+
+
+def default_history_path() -> str:
+    """Per-user location of the history database"""
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or os.path.expanduser("~")
+        return os.path.join(base, "QRiftly", "history.db")
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "qriftly", "history.db")
+
+
+def payload_hash(payload: str) -> int:
+    """Signed 64-bit hash of a payload, for indexed exact lookups"""
+    digest = hashlib.blake2b(payload.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class HistoryEntry:
+    """One row of the scan history"""
+
+    __slots__ = ('id', 'timestamp', 'payload', 'qr_type', 'symbol_type', 'source', 'backend')
+
+    def __init__(self, id: int, timestamp: float, payload: str, qr_type: str,
+                 symbol_type: Optional[str] = None, source: Optional[str] = None,
+                 backend: Optional[str] = None):
+        self.id = id
+        self.timestamp = timestamp
+        self.payload = payload
+        self.qr_type = qr_type
+        self.symbol_type = symbol_type
+        self.source = source
+        self.backend = backend
+
+
+class ScanHistory:
+    """
+    SQLite-backed scan history.
+
+    ``add`` only enqueues the row; a writer thread commits queued rows in
+    batches. Call ``flush`` to wait for pending rows and ``close`` when done.
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.path = path or default_history_path()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._local = threading.local()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self.written = 0
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        try:
+            connection.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False  # SQLite built without FTS5/trigram; fall back to LIKE
+        connection.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True,
+                                        name="qriftly-history")
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Connection owned by the calling thread.
+
+        Every connection is also listed so ``close`` can close the ones other
+        threads opened; it is only ever used by its own thread otherwise.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                # Drop the connections of threads that have finished
+                for thread, finished in self._connections:
+                    if not thread.is_alive():
+                        finished.close()
+                self._connections = [(thread, other) for thread, other in self._connections
+                                     if thread.is_alive()]
+                self._connections.append((threading.current_thread(), connection))
+        return connection
+
+    def add(self, payload: str, qr_type: str, source: str = "", symbol_type: Optional[str] = None,
+            backend: Optional[str] = None, timestamp: Optional[float] = None):
+        """Queue one result for writing"""
+        if self._closed:
+            return
+        self._queue.put((time.time() if timestamp is None else timestamp, payload,
+                         payload_hash(payload), qr_type, symbol_type, source, backend))
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            row = self._queue.get()
+            if row is None:
+                self._queue.task_done()
+                break
+
+            # Gather whatever else arrives within the flush interval
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+
+            try:
+                with connection:  # One transaction per batch
+                    connection.executemany(
+                        "INSERT INTO scans (timestamp, payload, payload_hash, type, "
+                        "symbol_type, source, backend) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                self.written += len(batch)
+            except sqlite3.Error as e:
+                print(f"History write error: {e}", file=sys.stderr)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                break
+        connection.close()
+
+    def flush(self):
+        """Wait until every queued row has been committed"""
+        self._queue.join()
+
+    def close(self):
+        """
+        Commit pending rows, stop the writer thread and close the connection
+        of every thread that used this history. Call it once no other
+        thread is still searching.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._connections_lock:
+            for _, connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local.connection = None
+
+    def search(self, text: Optional[str] = None, qr_type: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               exact: bool = False, limit: int = DEFAULT_SEARCH_LIMIT,
+               offset: int = 0) -> List[HistoryEntry]:
+        """
+        Newest-first rows matching every given filter.
+
+        ``text`` matches anywhere in the payload, or the whole payload when
+        ``exact`` is set. ``since``/``until`` are UNIX timestamps.
+        """
+        clauses, params = [], []
+        use_fts = bool(text) and not exact and self.has_fts and len(text) >= MIN_FTS_QUERY
+        if text:
+            if exact:
+                clauses.append("payload_hash = ? AND scans.payload = ?")
+                params += [payload_hash(text), text]
+            elif use_fts:
+                clauses.append("scans_fts MATCH ?")
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                clauses.append("scans.payload LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+        if qr_type:
+            clauses.append("type = ?")
+            params.append(qr_type)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+
+        if use_fts:
+            # Drive the query from the trigram index in rowid order so common
+            # terms stop after ``limit`` matches; rows are inserted in time order
+            sql = f"SELECT {_COLUMNS} FROM scans_fts JOIN scans ON scans.id = scans_fts.rowid"
+            order = "scans_fts.rowid DESC"
+        else:
+            sql = f"SELECT {_COLUMNS} FROM scans"
+            order = "timestamp DESC, scans.id DESC"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        rows = self._connect().execute(sql, params).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+
+    def type_counts(self) -> Dict[str, int]:
+        """Number of rows per payload type"""
+        rows = self._connect().execute(
+            "SELECT type, COUNT(*) FROM scans GROUP BY type ORDER BY COUNT(*) DESC")
+        return dict(rows.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
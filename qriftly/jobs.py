@@ -0,0 +1,149 @@
+"""
+QRiftly background jobs
+
+A small job queue for work that must not run on the UI thread: a thread
+pool runs the jobs, and completion, failure and progress callbacks are
+handed back through a ``dispatch`` function (the GUI passes one built on
+``root.after``). Jobs can be cancelled: queued jobs never start, running
+jobs stop at their next ``check_cancelled``/``report`` call.
+
+Nothing here imports tkinter.
+"""
+
+import itertools
+import os
+import sys
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Jobs running at once unless the caller chooses otherwise
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+
+class Job:
+    """Handle for a submitted job"""
+
+    def __init__(self, job_id: int, name: str, queue: "JobQueue",
+                 on_progress: Optional[Callable[["Job"], None]] = None):
+        self.id = job_id
+        self.name = name
+        self.progress = 0.0  # 0.0 to 1.0
+        self.message = ""
+        self.future: Optional[Future] = None
+        self._queue = queue
+        self._on_progress = on_progress
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def cancel(self):
+        """Ask the job to stop; a job that has not started yet never runs"""
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check_cancelled(self):
+        """Call from inside the job at safe points to honour cancellation"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.name)
+
+    def report(self, progress: float, message: str = ""):
+        """Publish progress from inside the job (also a cancellation point)"""
+        self.check_cancelled()
+        self.progress = max(0.0, min(1.0, progress))
+        self.message = message
+        if self._on_progress:
+            self._queue.dispatch(self._on_progress, self)
+        self._queue._changed()
+
+
+class JobQueue:
+    """
+    Thread pool with UI-thread callbacks.
+
+    ``dispatch(fn, *args)`` must arrange for ``fn(*args)`` to run on the UI
+    thread; the default calls it directly on the worker thread.
+    ``on_change(queue)`` is dispatched whenever jobs start, finish or report.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS,
+                 dispatch: Optional[Callable[..., None]] = None,
+                 on_change: Optional[Callable[["JobQueue"], None]] = None):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qriftly-job")
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self.on_change = on_change
+        self._jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, fn: Callable[..., object], *args,
+               on_done: Optional[Callable[[object], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               on_progress: Optional[Callable[[Job], None]] = None,
+               on_cancelled: Optional[Callable[[], None]] = None, **kwargs) -> Job:
+        """
+        Run ``fn(job, *args, **kwargs)`` on the pool.
+
+        Exactly one of ``on_done(result)``, ``on_error(exception)`` or
+        ``on_cancelled()`` is dispatched when the job ends.
+        """
+        job = Job(next(self._ids), name, self, on_progress)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        def finished(future: Future):
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            try:
+                result = future.result()
+            except (CancelledError, JobCancelled):
+                if on_cancelled:
+                    self.dispatch(on_cancelled)
+            except BaseException as e:
+                if on_error:
+                    self.dispatch(on_error, e)
+                else:
+                    print(f"Background job '{name}' failed: {e}", file=sys.stderr)
+            else:
+                if job.cancelled:
+                    if on_cancelled:
+                        self.dispatch(on_cancelled)
+                elif on_done:
+                    self.dispatch(on_done, result)
+            self._changed()
+
+        job.future = self._executor.submit(fn, job, *args, **kwargs)
+        job.future.add_done_callback(finished)
+        self._changed()
+        return job
+
+    def _changed(self):
+        if self.on_change:
+            self.dispatch(self.on_change, self)
+
+    @property
+    def active(self) -> List[Job]:
+        """Jobs that are queued or running"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel_all(self):
+        for job in self.active:
+            job.cancel()
+
+    def shutdown(self, cancel: bool = True):
+        """Stop accepting jobs; optionally cancel the ones in flight"""
+        if cancel:
+            self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=cancel)
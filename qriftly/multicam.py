@@ -0,0 +1,265 @@
+"""
+QRiftly multi-camera scanning
+
+Scans several video sources at once: camera device indices, video files
+and network streams (RTSP/HTTP URLs). Every source has its own capture
+thread and "latest frame wins" slot; one shared pool of decode threads
+serves the sources round robin. A source is queued at most once and has at
+most one decode in flight, so a fast camera cannot starve a slow one, and
+when decoding falls behind each source simply drops its stale frames.
+
+Nothing here imports tkinter; the GUI plugs in through callbacks.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import urlparse
+
+from .camera import (DEFAULT_DECODE_BUDGET_MS, AdaptiveScheduler, CaptureThread, Frame,
+                     LatestFrameSlot)
+from .engine import QRDecoder
+from .symbols import DecodedSymbol
+
+Source = Union[int, str]
+
+# Decode threads shared by all sources
+DEFAULT_DECODE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def parse_source(text: str) -> Source:
+    """A device index ("0", "1"), or a file path / stream URL as given"""
+    text = text.strip()
+    return int(text) if text.isdigit() else text
+
+
+def parse_sources(text: str) -> List[Source]:
+    """Comma- or newline-separated sources, e.g. "0, 1, rtsp://cam/stream" """
+    return [parse_source(item) for item in text.replace("\n", ",").split(",") if item.strip()]
+
+
+def source_name(source: Source) -> str:
+    """Short display name for a source"""
+    if isinstance(source, int):
+        return f"Camera {source}"
+    url = urlparse(source)
+    if url.scheme and url.netloc:
+        return f"{url.netloc}{url.path}" if url.path not in ("", "/") else url.netloc
+    return os.path.basename(source) or source
+
+
+class CameraSource:
+    """One source's capture thread, frame slot, schedule and counters"""
+
+    def __init__(self, source: Source, budget_ms: float):
+        self.source = source
+        self.name = source_name(source)
+        self.slot: Optional[LatestFrameSlot] = None
+        self.capture_thread: Optional[CaptureThread] = None
+        self.scheduler = AdaptiveScheduler(budget_ms)
+        self.decoded = 0
+        self.found = 0  # Symbols decoded from this source
+        self.decode_ms = 0.0  # Last decode
+        self.latency_ms = 0.0  # Smoothed capture-to-result latency
+        self.busy = False  # Being decoded right now
+        self.queued = False  # Waiting in the pool's ready queue
+
+    @property
+    def running(self) -> bool:
+        return self.capture_thread is not None and self.capture_thread.is_alive()
+
+    def record(self, frame: Frame, latency: float, symbols: List[DecodedSymbol]):
+        self.scheduler.record(latency)
+        self.decoded += 1
+        self.found += len(symbols)
+        self.decode_ms = latency * 1000.0
+        end_to_end = (time.time() - frame.timestamp) * 1000.0
+        self.latency_ms = 0.7 * self.latency_ms + 0.3 * end_to_end if self.latency_ms else end_to_end
+
+    def stats(self) -> dict:
+        capture = self.capture_thread
+        return {
+            'source': self.source,
+            'name': self.name,
+            'state': capture.state if capture else "stopped",
+            'error': capture.error if capture else None,
+            'camera_fps': capture.fps if capture else 0.0,
+            'capture_fps': capture.measured_fps if capture else 0.0,
+            'frames': capture.frames if capture else 0,
+            'dropped': self.slot.dropped if self.slot else 0,
+            'decoded': self.decoded,
+            'skipped': self.scheduler.skipped,
+            'found': self.found,
+            'decode_ms': self.decode_ms,
+            'latency_ms': self.latency_ms,
+            'decode_rate': self.scheduler.decode_rate,
+        }
+
+
+class DecodePool:
+    """
+    Decode threads shared by several sources, scheduled round robin.
+
+    ``notify(source)`` marks a source as having a new frame. Workers take
+    the oldest ready source whose adaptive schedule allows a decode, decode
+    its newest frame and requeue it at the back if another frame arrived
+    meanwhile.
+    """
+
+    def __init__(self, decoder: QRDecoder,
+                 on_results: Callable[[List[DecodedSymbol], Frame], None],
+                 workers: int = DEFAULT_DECODE_WORKERS):
+        self.decoder = decoder
+        self.on_results = on_results
+        self._ready: "deque[CameraSource]" = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._run, daemon=True, name=f"qriftly-decode-{index}")
+                         for index in range(max(1, workers))]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def notify(self, source: CameraSource):
+        with self._condition:
+            if source.queued or source.busy or self._stopped:
+                return
+            source.queued = True
+            self._ready.append(source)
+            self._condition.notify()
+
+    def _next_source(self) -> Optional[CameraSource]:
+        """Oldest ready source that is due, waiting as needed (None once stopped)"""
+        with self._condition:
+            while not self._stopped:
+                wait = None
+                for source in self._ready:
+                    due_in = source.scheduler.wait_time()
+                    if due_in <= 0:
+                        self._ready.remove(source)
+                        source.queued = False
+                        source.busy = True
+                        return source
+                    wait = due_in if wait is None else min(wait, due_in)
+                self._condition.wait(wait)
+            return None
+
+    def _run(self):
+        while True:
+            source = self._next_source()
+            if source is None:
+                return
+            try:
+                self._decode(source)
+            finally:
+                with self._condition:
+                    source.busy = False
+                if source.slot is not None and source.slot.pending:
+                    self.notify(source)  # Back of the queue: the others go first
+
+    def _decode(self, source: CameraSource):
+        frame = source.slot.take() if source.slot else None
+        if frame is None or not source.scheduler.should_decode(frame.image):
+            return
+
+        start = time.perf_counter()
+        try:
+            symbols = self.decoder.decode(frame.image, use_cache=False, escalate=False)
+        except Exception as e:
+            print(f"Camera decode error ({source.name}): {e}", file=sys.stderr)
+            symbols = []
+        source.record(frame, time.perf_counter() - start, symbols)
+        if not self._stopped:
+            self.on_results(symbols, frame)
+
+    def stop(self, timeout: float = 1.0):
+        """Stop the workers, waiting up to ``timeout`` seconds in total for them"""
+        with self._condition:
+            self._stopped = True
+            self._ready.clear()
+            self._condition.notify_all()
+        _join_all(self._threads, timeout)
+
+
+def _join_all(threads: List[threading.Thread], timeout: float):
+    """Join ``threads`` with one deadline shared by all of them"""
+    current = threading.current_thread()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if thread is not current and thread.is_alive():
+            thread.join(remaining)
+
+
+class MultiCameraPipeline:
+    """
+    Live scanning of several sources at once.
+
+    Callbacks run on worker threads and must hand work to the UI thread
+    themselves: ``on_frame(frame)`` for every captured frame (``frame.source``
+    tells which source), ``on_results(symbols, frame)`` for every decode and
+    ``on_end(source)`` when a source stops delivering frames.
+    """
+
+    def __init__(self, sources: List[Source], decoder: Optional[QRDecoder] = None,
+                 on_frame: Optional[Callable[[Frame], None]] = None,
+                 on_results: Optional[Callable[[List[DecodedSymbol], Frame], None]] = None,
+                 on_end: Optional[Callable[[Source], None]] = None,
+                 budget_ms: float = DEFAULT_DECODE_BUDGET_MS,
+                 workers: int = DEFAULT_DECODE_WORKERS):
+        if not sources:
+            raise ValueError("No camera sources given")
+        self.decoder = decoder or QRDecoder()
+        self.on_frame = on_frame
+        self.on_results = on_results or (lambda symbols, frame: None)
+        self.on_end = on_end
+        self.sources: Dict[Source, CameraSource] = {}
+        for source in sources:
+            if source not in self.sources:
+                self.sources[source] = CameraSource(source, budget_ms)
+        self.pool = DecodePool(self.decoder, self.on_results, workers)
+
+    @property
+    def running(self) -> bool:
+        return any(source.running for source in self.sources.values())
+
+    def start(self):
+        """Start the decode pool and one capture thread per source"""
+        self.pool.start()
+        for source in self.sources.values():
+            source.slot = LatestFrameSlot(on_put=lambda slot, source=source: self.pool.notify(source))
+            on_end = (lambda source=source.source: self.on_end(source)) if self.on_end else None
+            # Opened on its own thread: network streams can take seconds to connect
+            source.capture_thread = CaptureThread(None, source.slot, source.source,
+                                                  self.on_frame, on_end)
+            source.capture_thread.start()
+
+    def set_budget(self, budget_ms: float):
+        for source in self.sources.values():
+            source.scheduler.budget_ms = budget_ms
+
+    def stop(self, timeout: float = 0.0):
+        """
+        Stop every capture thread and the decode pool.
+
+        Returns at once by default, so the UI thread never waits on a
+        blocked read: each capture thread releases its device itself when
+        its loop ends. ``timeout`` waits up to that many seconds in total
+        for the threads to finish (e.g. on exit).
+        """
+        threads = [source.capture_thread for source in self.sources.values() if source.capture_thread]
+        for thread in threads:
+            thread.stop()
+        deadline = time.monotonic() + timeout
+        self.pool.stop(timeout)
+        _join_all(threads, deadline - time.monotonic())
+
+    def stats(self) -> List[dict]:
+        """Per-source counters, in the order the sources were given"""
+        return [source.stats() for source in self.sources.values()]
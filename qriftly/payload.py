@@ -0,0 +1,402 @@
+"""
+QRiftly payload helpers
+
+Classification of decoded QR payloads. Kept free of GUI imports so batch
+output can carry the same type labels the desktop app shows.
+
+``parse_payload`` looks at a payload once: the URI scheme (the text before
+the first colon, or the ``BCD`` header of an EPC payment code) picks a
+parser from a table, and only scheme-less text falls through to the
+precompiled e-mail and phone patterns. The result is a typed object
+(``WifiPayload``, ``ContactPayload``, ``EpcPayment``...) with the fields of
+that payload type. Results are memoized, so the GUI, the history and the
+result sinks can all ask about the same payload without parsing it again;
+treat them as read-only.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple, Type
+from urllib.parse import parse_qs, unquote
+
+from .contacts import Contact, Event, format_address, parse_mecard, parse_vcard, parse_vevent, split_fields
+
+# Prefixes the old prefix-based URL check matched (kept for callers and benchmarks)
+URL_PREFIXES = ('http://', 'https://', 'www.', 'ftp://')
+
+# Distinct payloads whose parse is remembered
+PARSE_CACHE_SIZE = 8192
+
+# Longest scheme looked up in the dispatch table ("mailto", "smsto", "matmsg")
+_MAX_SCHEME = 8
+
+# A whole payload that is one address. Domain labels cannot contain the dots
+# between them, so a failed match is linear instead of quadratic
+_EMAIL = re.compile(r'[^@\s]+@[^@\s.]+(?:\.[^@\s.]+)+')
+# At least 10 digits, optionally punctuated with + - ( ) and spaces
+_PHONE = re.compile(r'[+\-() ]*(?:\d[+\-() ]*){10,}')
+_EPC_HEADER = re.compile(r'BCD\r?\n\d{3}\r?\n\d?\r?\nSCT\r?\n')
+_VEVENT_LINE = re.compile(r'^BEGIN:VEVENT', re.IGNORECASE | re.MULTILINE)
+_LINE_BREAK = re.compile(r'\r\n|\r|\n')
+_GEO = re.compile(r'(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)(?:,(-?\d+(?:\.\d+)?))?')
+_AMOUNT = re.compile(r'([A-Z]{3})(\d+(?:\.\d{1,2})?)')
+
+
+class Payload:
+    """A classified payload; subclasses add the fields of their type"""
+
+    __slots__ = ('text',)
+
+    kind = 'text'
+    label = "Text"
+    _field_names: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_names = cls._field_names + tuple(name for name in cls.__dict__.get('__slots__', ())
+                                                    if not name.startswith('_'))
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def fields(self) -> dict:
+        """Type-specific fields by name (empty for plain text)"""
+        return {name: getattr(self, name) for name in self._field_names}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.fields() or self.text!r})"
+
+
+class UrlPayload(Payload):
+    __slots__ = ('url',)
+
+    kind = 'url'
+    label = "URL"
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.url = text.strip()
+
+
+class EmailPayload(Payload):
+    __slots__ = ('address', 'subject', 'body')
+
+    kind = 'email'
+    label = "Email"
+
+    def __init__(self, text: str, address: str, subject: str = "", body: str = ""):
+        super().__init__(text)
+        self.address = address
+        self.subject = subject
+        self.body = body
+
+
+class PhonePayload(Payload):
+    __slots__ = ('number',)
+
+    kind = 'phone'
+    label = "Phone Number"
+
+    def __init__(self, text: str, number: str):
+        super().__init__(text)
+        self.number = number
+
+
+class SmsPayload(Payload):
+    __slots__ = ('number', 'message')
+
+    kind = 'sms'
+    label = "SMS"
+
+    def __init__(self, text: str, number: str, message: str = ""):
+        super().__init__(text)
+        self.number = number
+        self.message = message
+
+
+class WifiPayload(Payload):
+    __slots__ = ('ssid', 'password', 'security', 'hidden')
+
+    kind = 'wifi'
+    label = "WiFi Configuration"
+
+    def __init__(self, text: str, ssid: str = "", password: str = "",
+                 security: str = "NONE", hidden: bool = False):
+        super().__init__(text)
+        self.ssid = ssid
+        self.password = password
+        self.security = security  # WPA, WEP, NONE...
+        self.hidden = hidden
+
+
+class GeoPayload(Payload):
+    __slots__ = ('latitude', 'longitude', 'altitude', 'query')
+
+    kind = 'geo'
+    label = "Location/GPS"
+
+    def __init__(self, text: str, latitude: Optional[float] = None,
+                 longitude: Optional[float] = None, altitude: Optional[float] = None,
+                 query: str = ""):
+        super().__init__(text)
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.query = query  # "?q=" search text, if any
+
+
+class ContactPayload(Payload):
+    """A vCard or MeCard contact"""
+
+    __slots__ = ('_contact', 'name', 'organization', 'title', 'phones', 'emails', 'addresses',
+                 'urls', 'note')
+
+    kind = 'vcard'
+    label = "Contact (vCard)"
+
+    def __init__(self, text: str, contact: Contact, name: str = "", organization: str = "",
+                 title: str = "", phones: Tuple[str, ...] = (), emails: Tuple[str, ...] = (),
+                 addresses: Tuple[str, ...] = (), urls: Tuple[str, ...] = (), note: str = ""):
+        super().__init__(text)
+        self._contact = contact
+        self.name = name
+        self.organization = organization
+        self.title = title
+        self.phones = phones
+        self.emails = emails
+        self.addresses = addresses
+        self.urls = urls
+        self.note = note
+
+    @property
+    def contact(self) -> Contact:
+        """The full parse (phone types, name parts, birthday...)"""
+        return self._contact
+
+
+class MeCardPayload(ContactPayload):
+    __slots__ = ()
+
+    kind = 'mecard'
+    label = "Contact (MeCard)"
+
+
+class EventPayload(Payload):
+    """An iCalendar VEVENT"""
+
+    __slots__ = ('_event', 'summary', 'start', 'end', 'location', 'description')
+
+    kind = 'event'
+    label = "Calendar Event"
+
+    def __init__(self, text: str, event: Event, summary: str = "", start: str = "", end: str = "",
+                 location: str = "", description: str = ""):
+        super().__init__(text)
+        self._event = event
+        self.summary = summary
+        self.start = start  # As written, e.g. 20250922T100000Z
+        self.end = end
+        self.location = location
+        self.description = description
+
+    @property
+    def event(self) -> Event:
+        """The full parse, including the property lines as written"""
+        return self._event
+
+
+class EpcPayment(Payload):
+    """An EPC (SEPA credit transfer) payment code, a.k.a. GiroCode"""
+
+    __slots__ = ('name', 'iban', 'bic', 'amount', 'currency', 'purpose', 'reference', 'remittance')
+
+    kind = 'epc'
+    label = "Payment (EPC)"
+
+    def __init__(self, text: str, name: str = "", iban: str = "", bic: str = "",
+                 amount: Optional[float] = None, currency: str = "", purpose: str = "",
+                 reference: str = "", remittance: str = ""):
+        super().__init__(text)
+        self.name = name
+        self.iban = iban
+        self.bic = bic
+        self.amount = amount
+        self.currency = currency
+        self.purpose = purpose
+        self.reference = reference  # Structured creditor reference
+        self.remittance = remittance  # Unstructured text
+
+
+def _first(fields: dict, key: str) -> str:
+    values = fields.get(key)
+    return values[0] if values else ""
+
+
+def _parse_url(text: str, rest: str) -> Payload:
+    return UrlPayload(text)
+
+
+def _parse_wifi(text: str, rest: str) -> Payload:
+    fields = split_fields(rest)
+    return WifiPayload(text, ssid=_first(fields, 'S'), password=_first(fields, 'P'),
+                       security=_first(fields, 'T').upper() or "NONE",
+                       hidden=_first(fields, 'H').lower() == 'true')
+
+
+def _parse_mailto(text: str, rest: str) -> Payload:
+    address, _, query = rest.partition('?')
+    params = {key.lower(): values[0] for key, values in parse_qs(query).items()} if query else {}
+    return EmailPayload(text, unquote(address), params.get('subject', ""), params.get('body', ""))
+
+
+def _parse_matmsg(text: str, rest: str) -> Payload:
+    fields = split_fields(rest)
+    return EmailPayload(text, _first(fields, 'TO'), _first(fields, 'SUB'), _first(fields, 'BODY'))
+
+
+def _parse_email_address(text: str, rest: str) -> Payload:
+    return EmailPayload(text, text.strip())
+
+
+def _parse_tel(text: str, rest: str) -> Payload:
+    return PhonePayload(text, rest.strip())
+
+
+def _parse_sms(text: str, rest: str) -> Payload:
+    # sms:+123?body=hi (RFC 5724), sms:+123:hi and SMSTO:+123:hi
+    number, separator, message = rest.partition('?')
+    if separator:
+        message = parse_qs(message).get('body', [""])[0]
+    else:
+        number, _, message = rest.partition(':')
+    return SmsPayload(text, number.strip(), message)
+
+
+def _parse_geo(text: str, rest: str) -> Payload:
+    coordinates, _, query = rest.partition('?')
+    query = unquote(query[2:]) if query.startswith('q=') else ""
+    match = _GEO.match(coordinates)
+    if not match:
+        return GeoPayload(text, query=query)
+    latitude, longitude, altitude = match.groups()
+    return GeoPayload(text, float(latitude), float(longitude),
+                      float(altitude) if altitude else None, query)
+
+
+def _parse_contact(payload_class, text: str, contact: Contact) -> Payload:
+    return payload_class(text, contact, name=contact.name, organization=contact.organization,
+                         title=contact.title,
+                         phones=tuple(value for value, _ in contact.phones),
+                         emails=tuple(value for value, _ in contact.emails),
+                         addresses=tuple(format_address(parts) for parts, _ in contact.addresses),
+                         urls=tuple(contact.urls), note=contact.note)
+
+
+def _parse_mecard(text: str, rest: str) -> Payload:
+    return _parse_contact(MeCardPayload, text, parse_mecard(text))
+
+
+def _parse_vcard(text: str, rest: str) -> Payload:
+    return _parse_contact(ContactPayload, text, parse_vcard(text))
+
+
+def _parse_vevent(text: str, rest: str) -> Payload:
+    event = parse_vevent(text)
+    return EventPayload(text, event, summary=event.summary, start=event.start, end=event.end,
+                        location=event.location, description=event.description)
+
+
+def _parse_epc(text: str, rest: str) -> Payload:
+    lines = _LINE_BREAK.split(text)
+    lines += [""] * (12 - len(lines))
+    match = _AMOUNT.fullmatch(lines[7].strip())
+    return EpcPayment(text, name=lines[5], iban=lines[6].replace(' ', ''), bic=lines[4],
+                      amount=float(match.group(2)) if match else None,
+                      currency=match.group(1) if match else "",
+                      purpose=lines[8], reference=lines[9], remittance=lines[10])
+
+
+def _parse_phone(text: str, rest: str) -> Payload:
+    return PhonePayload(text, text.strip())
+
+
+def _parse_text(text: str, rest: str) -> Payload:
+    return Payload(text)
+
+
+Parser = Callable[[str, str], Payload]
+Entry = Tuple[Type[Payload], Parser]
+
+# Payload type and parser for each URI scheme (lower case). Parsers get the
+# whole text and what follows the scheme's colon
+_SCHEMES: Dict[str, Entry] = {
+    'http': (UrlPayload, _parse_url),
+    'https': (UrlPayload, _parse_url),
+    'ftp': (UrlPayload, _parse_url),
+    'wifi': (WifiPayload, _parse_wifi),
+    'mailto': (EmailPayload, _parse_mailto),
+    'matmsg': (EmailPayload, _parse_matmsg),
+    'tel': (PhonePayload, _parse_tel),
+    'sms': (SmsPayload, _parse_sms),
+    'smsto': (SmsPayload, _parse_sms),
+    'mms': (SmsPayload, _parse_sms),
+    'mmsto': (SmsPayload, _parse_sms),
+    'geo': (GeoPayload, _parse_geo),
+    'mecard': (MeCardPayload, _parse_mecard),
+}
+
+_VCARD: Entry = (ContactPayload, _parse_vcard)
+_VEVENT: Entry = (EventPayload, _parse_vevent)
+_EPC: Entry = (EpcPayment, _parse_epc)
+_BARE_URL: Entry = (UrlPayload, _parse_url)
+_BARE_EMAIL: Entry = (EmailPayload, _parse_email_address)
+_BARE_PHONE: Entry = (PhonePayload, _parse_phone)
+_TEXT: Entry = (Payload, _parse_text)
+
+
+def _classify(text: str) -> Tuple[Entry, int]:
+    """The payload's type and parser, and where its scheme's colon is (-1 if none)"""
+    colon = text.find(':', 0, _MAX_SCHEME + 1)
+    if colon > 0:
+        scheme = text[:colon].lower()
+        if scheme in _SCHEMES:
+            return _SCHEMES[scheme], colon
+        if scheme == 'begin':
+            component = text[colon + 1:colon + 10].upper()
+            if component.startswith('VCARD'):
+                return _VCARD, colon
+            if component.startswith('VEVENT') or (component == 'VCALENDAR' and _VEVENT_LINE.search(text)):
+                return _VEVENT, colon
+
+    # No known scheme
+    if text[:3] == 'BCD' and _EPC_HEADER.match(text):
+        return _EPC, -1
+    if text[:4].lower() == 'www.':
+        return _BARE_URL, -1
+    if '@' in text and _EMAIL.fullmatch(text.strip()):
+        return _BARE_EMAIL, -1
+    if _PHONE.fullmatch(text):
+        return _BARE_PHONE, -1
+    return _TEXT, -1
+
+
+def payload_type(text: str) -> Type[Payload]:
+    """The Payload subclass a payload parses to, without parsing its fields"""
+    return _classify(text)[0][0]
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_payload(text: str) -> Payload:
+    """Classify a payload and parse the fields of its type (memoized)"""
+    (_, parser), colon = _classify(text)
+    return parser(text, text[colon + 1:])
+
+
+def is_url(text: str) -> bool:
+    """Check if text is a URL (as detect_qr_type labels it)"""
+    return parse_payload(text).kind == 'url'
+
+
+def detect_qr_type(qr_data: str) -> str:
+    """Detect the type of QR code content"""
+    return _classify(qr_data)[0][0].label
@@ -0,0 +1,265 @@
+"""
+QRiftly preprocessing ladder
+
+Hard images (glare-washed phone photos, faded low-contrast prints,
+light-on-dark codes, skewed barcodes) often fail the plain grayscale pass.
+The ladder retries them with one enhancement at a time, cheapest first,
+and stops at the first step that decodes anything or when the image's time
+budget runs out, so easy images pay nothing. Each step's attempts, hits and
+cost are counted so the order can be tuned from real scans.
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .constants import DEFAULT_BUDGET_MS, DEFAULT_STEPS
+from .symbols import DecodedSymbol
+
+# Longest side of the copy used to estimate the skew angle
+_SKEW_SAMPLE_SIDE = 512
+
+# Resolution of the edge-angle histogram
+_SKEW_BINS_PER_DEGREE = 2
+
+# Skew angles closer to 0 than this are treated as axis-aligned (degrees)
+_MIN_SKEW = 2.0
+
+# Weight of the newest attempt in a step's running cost estimate
+_COST_SMOOTHING = 0.2
+
+# Each time a step is skipped its estimate shrinks by this factor, so one
+# pathological decode does not rule the step out for good
+_SKIP_DECAY = 0.8
+
+# A step's output image, plus the 2x3 affine matrix that maps its
+# coordinates back to the input (None when the geometry is unchanged)
+StepResult = Tuple[np.ndarray, Optional[np.ndarray]]
+
+
+def adaptive_threshold(gray: np.ndarray) -> StepResult:
+    """Binarize against the local mean, which flattens glare and shading"""
+    block = max(15, min(gray.shape) // 24) | 1
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, block, 3), None
+
+
+def equalize_contrast(gray: np.ndarray) -> StepResult:
+    """CLAHE: stretch contrast per tile for faded or unevenly lit prints"""
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    return clahe.apply(gray), None
+
+
+def sharpen(gray: np.ndarray) -> StepResult:
+    """Unsharp mask, for slightly out-of-focus module edges"""
+    blurred = cv2.GaussianBlur(gray, (0, 0), 2.0)
+    return cv2.addWeighted(gray, 1.8, blurred, -0.8, 0), None
+
+
+def invert(gray: np.ndarray) -> StepResult:
+    """Light modules on a dark background (dark-mode codes)"""
+    return cv2.bitwise_not(gray), None
+
+
+def skew_angle(gray: np.ndarray) -> float:
+    """
+    Dominant edge direction in degrees, folded into [-45, 45).
+
+    A gradient-magnitude weighted histogram of edge angles modulo 90, so
+    the bars of a 1D code and the module edges of a 2D code both vote for
+    the same angle.
+    """
+    scale = _SKEW_SAMPLE_SIDE / max(gray.shape)
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gx = cv2.Scharr(gray, cv2.CV_32F, 1, 0)
+    gy = cv2.Scharr(gray, cv2.CV_32F, 0, 1)
+    magnitude, angle = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+    bins = (angle.ravel() % 90.0 * _SKEW_BINS_PER_DEGREE).astype(np.int32) % (90 * _SKEW_BINS_PER_DEGREE)
+    histogram = np.bincount(bins, weights=magnitude.ravel(), minlength=90 * _SKEW_BINS_PER_DEGREE)
+    # Smooth circularly so an angle split between neighbouring bins still wins
+    histogram = sum(np.roll(histogram, shift) for shift in range(-2, 3))
+    peak = int(np.argmax(histogram))
+    # Parabola through the peak and its neighbours for a sub-bin estimate
+    left, centre, right = histogram[peak - 1], histogram[peak], histogram[(peak + 1) % len(histogram)]
+    curvature = left - 2 * centre + right
+    offset = 0.5 * (left - right) / curvature if curvature else 0.0
+    degrees = (peak + 0.5 + offset) / _SKEW_BINS_PER_DEGREE
+    return degrees - 90.0 if degrees >= 45.0 else degrees
+
+
+def deskew(gray: np.ndarray) -> StepResult:
+    """
+    Rotate so the dominant edges are axis-aligned; zbar only scans along
+    rows and columns. Images that are already straight are turned 45
+    degrees instead, for codes at an angle to straight surroundings.
+    """
+    angle = skew_angle(gray)
+    if abs(angle) < _MIN_SKEW:
+        angle = 45.0
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2.0, height / 2.0), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_width = int(math.ceil(height * sin + width * cos))
+    new_height = int(math.ceil(height * cos + width * sin))
+    matrix[0, 2] += new_width / 2.0 - width / 2.0
+    matrix[1, 2] += new_height / 2.0 - height / 2.0
+    rotated = cv2.warpAffine(gray, matrix, (new_width, new_height),
+                             flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    return rotated, cv2.invertAffineTransform(matrix)
+
+
+STEPS: Dict[str, Callable[[np.ndarray], StepResult]] = {
+    'adaptive': adaptive_threshold,
+    'clahe': equalize_contrast,
+    'sharpen': sharpen,
+    'invert': invert,
+    'deskew': deskew,
+}
+
+
+def parse_steps(value: str) -> List[str]:
+    """Step names from a comma-separated list ("none" or "" for no ladder)"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if names == ['none']:
+        return []
+    check_steps(names)
+    return names
+
+
+def check_steps(names: Sequence[str]):
+    """Raise ValueError for names that are not in STEPS"""
+    for name in names:
+        if name not in STEPS:
+            raise ValueError(f"Unknown preprocessing step '{name}' (choose from: {', '.join(STEPS)})")
+
+
+def _map_back(symbol: DecodedSymbol, inverse: np.ndarray) -> DecodedSymbol:
+    """Map a symbol found in a transformed image back to input coordinates"""
+    if not symbol.polygon:
+        return symbol
+    points = np.array(symbol.polygon, dtype=np.float32).reshape(-1, 1, 2)
+    mapped = cv2.transform(points, inverse).reshape(-1, 2)
+    symbol.polygon = [(int(round(x)), int(round(y))) for x, y in mapped]
+    x, y, w, h = cv2.boundingRect(mapped.astype(np.int32))
+    symbol.rect = (x, y, w, h)
+    return symbol
+
+
+class StepStats:
+    """Counters for one ladder step"""
+
+    __slots__ = ('attempts', 'hits', 'skipped', 'elapsed_ms', 'estimate_ms')
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.skipped = 0  # Left out because its estimated cost did not fit the budget
+        self.elapsed_ms = 0.0
+        self.estimate_ms = 0.0  # Smoothed cost of recent attempts, for scheduling
+
+    def record(self, elapsed_ms: float, hit: bool):
+        self.attempts += 1
+        self.hits += hit
+        self.elapsed_ms += elapsed_ms
+        if self.attempts == 1:
+            self.estimate_ms = elapsed_ms
+        else:
+            self.estimate_ms += _COST_SMOOTHING * (elapsed_ms - self.estimate_ms)
+
+
+class PreprocessLadder:
+    """
+    Retries a failed decode on enhanced copies of the image.
+
+    ``steps`` are names from STEPS, tried in order. The ladder stops at the
+    first step that decodes anything, or once ``budget_ms`` has passed since
+    the image's plain decode started. A step whose recent cost would not fit
+    in the time left is skipped in favour of the next one. The budget is
+    checked between steps; a decode that has started is never interrupted.
+    Thread-safe; the counters are shared by every thread using the same
+    decoder.
+    """
+
+    def __init__(self, steps: Sequence[str] = DEFAULT_STEPS, budget_ms: float = DEFAULT_BUDGET_MS):
+        check_steps(steps)
+        self.steps = tuple(steps)
+        self.budget_ms = budget_ms
+        self._lock = threading.Lock()
+        self.clear()
+
+    def config(self) -> str:
+        """Settings that change decode results, for cache keys"""
+        return f"{','.join(self.steps)}@{self.budget_ms:g}"
+
+    def run(self, gray: np.ndarray, decode: Callable[[np.ndarray], List[DecodedSymbol]],
+            started: float) -> Tuple[List[DecodedSymbol], Optional[str], bool]:
+        """
+        Try each step on ``gray`` until one decodes; returns (symbols, step,
+        complete).
+
+        ``started`` is the perf_counter() time the image's plain decode
+        began, so the budget covers the whole image. ``complete`` is False
+        when the budget stopped or skipped a step before anything decoded:
+        the result then depends on timing and should not be cached.
+        """
+        deadline = started + self.budget_ms / 1000.0
+        complete = True
+        with self._lock:
+            self.images += 1
+        for name in self.steps:
+            begin = time.perf_counter()
+            stats = self._steps[name]
+            if begin >= deadline:
+                with self._lock:
+                    self.out_of_budget += 1
+                return [], None, False
+            if begin + stats.estimate_ms / 1000.0 > deadline:
+                with self._lock:
+                    stats.skipped += 1
+                    stats.estimate_ms *= _SKIP_DECAY
+                complete = False
+                continue
+
+            image, inverse = STEPS[name](gray)
+            symbols = decode(image)
+            if inverse is not None:
+                symbols = [_map_back(symbol, inverse) for symbol in symbols]
+            for symbol in symbols:
+                symbol.preprocess = name
+
+            with self._lock:
+                stats.record((time.perf_counter() - begin) * 1000.0, bool(symbols))
+            if symbols:
+                return symbols, name, True
+        return [], None, complete
+
+    def stats(self) -> dict:
+        """Per-step attempts, hits, hit rate, skips and mean cost, in ladder order"""
+        with self._lock:
+            steps = {}
+            for name in self.steps:
+                stats = self._steps[name]
+                steps[name] = {
+                    'attempts': stats.attempts,
+                    'hits': stats.hits,
+                    'hit_rate': stats.hits / stats.attempts if stats.attempts else 0.0,
+                    'skipped': stats.skipped,
+                    'mean_ms': stats.elapsed_ms / stats.attempts if stats.attempts else 0.0,
+                }
+            return {
+                'images': self.images,
+                'rescued': sum(stats['hits'] for stats in steps.values()),
+                'out_of_budget': self.out_of_budget,
+                'steps': steps,
+            }
+
+    def clear(self):
+        with self._lock:
+            self.images = 0  # Images that reached the ladder
+            self.out_of_budget = 0
+            self._steps = {name: StepStats() for name in self.steps}
@@ -0,0 +1,107 @@
+"""
+QRiftly live preview
+
+Turns captured camera frames into preview images at a fixed, lower frame
+rate than the camera delivers. Capture threads only ``offer`` their newest
+frame; at most one render is ever scheduled on the UI thread, and frames
+that arrive before it runs simply replace each other. Rendering resizes
+into a reused buffer and refills one PIL image in place, so a running
+preview allocates no per-frame images.
+
+Nothing here imports tkinter: the GUI passes a ``schedule`` callback (e.g.
+``root.after``) and pastes ``image`` into its one PhotoImage.
+"""
+
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Size of the camera window's preview, in pixels
+PREVIEW_SIZE = (400, 300)
+
+# Preview frames per second; decoding runs at its own rate regardless
+PREVIEW_FPS = 15.0
+
+_RGB_CODES = {1: cv2.COLOR_GRAY2RGB, 3: cv2.COLOR_BGR2RGB, 4: cv2.COLOR_BGRA2RGB}
+
+
+def _block_image(size: Tuple[int, int]) -> Image.Image:
+    """
+    An RGB image stored in a single memory block.
+
+    ImageTk blits block images straight into a PhotoImage; any other image is
+    first copied into a temporary block on every paste.
+    """
+    try:
+        return Image.Image()._new(Image.core.new_block('RGB', size))
+    except AttributeError:  # Older Pillow
+        return Image.new('RGB', size)
+
+
+class PreviewRenderer:
+    """
+    Rate-limited, coalescing frame-to-preview conversion.
+
+    ``schedule(delay_seconds)`` must arrange for the UI thread to call
+    ``render()`` after the delay and show ``image`` if it returns one.
+    """
+
+    def __init__(self, schedule: Callable[[float], None],
+                 size: Tuple[int, int] = PREVIEW_SIZE, max_fps: float = PREVIEW_FPS):
+        self.schedule = schedule
+        self.size = size
+        self.max_fps = max_fps
+        self.image = _block_image(size)
+        self.offered = 0
+        self.rendered = 0
+        self.coalesced = 0  # Frames replaced by a newer one before they were shown
+        self._lock = threading.Lock()
+        self._latest: Optional[np.ndarray] = None
+        self._pending = False
+        self._last_render = 0.0
+        self._resized: Optional[np.ndarray] = None
+        self._rgb = np.empty((size[1], size[0], 3), dtype=np.uint8)
+
+    def offer(self, image: np.ndarray):
+        """Hand over a new BGR/BGRA/gray frame (any thread)"""
+        with self._lock:
+            self.offered += 1
+            if self._latest is not None:
+                self.coalesced += 1
+            self._latest = image
+            if self._pending:
+                return
+            self._pending = True
+            delay = max(0.0, self._last_render + 1.0 / self.max_fps - time.perf_counter())
+        self.schedule(delay)
+
+    def render(self) -> Optional[Image.Image]:
+        """Convert the newest frame into ``image`` (UI thread); None if none is waiting"""
+        with self._lock:
+            frame, self._latest = self._latest, None
+            self._pending = False
+            self._last_render = time.perf_counter()
+        if frame is None:
+            return None
+
+        channels = 1 if frame.ndim == 2 else frame.shape[2]
+        width, height = self.size
+        if self._resized is None or self._resized.shape != (height, width) + frame.shape[2:]:
+            self._resized = np.empty((height, width) + frame.shape[2:], dtype=np.uint8)
+        cv2.resize(frame, self.size, dst=self._resized)
+        cv2.cvtColor(self._resized, _RGB_CODES[channels], dst=self._rgb)
+        self.image.frombytes(self._rgb)  # Copies into the existing pixels
+        self.rendered += 1
+        return self.image
+
+    def stats(self) -> dict:
+        """Frames offered, shown and dropped in favour of newer ones"""
+        return {
+            'offered': self.offered,
+            'rendered': self.rendered,
+            'coalesced': self.coalesced,
+        }
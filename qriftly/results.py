@@ -0,0 +1,104 @@
+"""
+QRiftly result store
+
+Scan results kept in memory as compact records in a fixed-size ring buffer.
+The store is the source of truth for the results list, copying and export;
+views read rows from it on demand instead of accumulating formatted text,
+so memory and insert cost stay flat however long a session runs.
+"""
+
+import time
+from typing import Iterator, List, Optional
+
+# Results kept before the oldest are discarded
+DEFAULT_CAPACITY = 10000
+
+
+class ResultRecord:
+    """One scan result"""
+
+    __slots__ = ('seq', 'timestamp', 'payload', 'qr_type', 'source')
+
+    def __init__(self, seq: int, timestamp: float, payload: str, qr_type: str, source: str = ""):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.payload = payload
+        self.qr_type = qr_type
+        self.source = source
+
+
+class ResultStore:
+    """
+    Ring buffer of the most recent ``capacity`` results.
+
+    Index 0 is the newest record. Appending to a full store overwrites the
+    oldest record in place. Not thread-safe: the GUI only touches it from
+    the Tk main loop.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._records: List[Optional[ResultRecord]] = [None] * capacity
+        self._next = 0  # Slot the next record is written to
+        self._count = 0
+        self.total = 0  # Results ever added
+        self.evicted = 0  # Results overwritten because the store was full
+
+    @property
+    def capacity(self) -> int:
+        return len(self._records)
+
+    def append(self, payload: str, qr_type: str, source: str = "",
+               timestamp: Optional[float] = None) -> ResultRecord:
+        """Add a result, discarding the oldest one when full"""
+        self.total += 1
+        record = ResultRecord(self.total, time.time() if timestamp is None else timestamp,
+                              payload, qr_type, source)
+        if self._count == len(self._records):
+            self.evicted += 1
+        else:
+            self._count += 1
+        self._records[self._next] = record
+        self._next = (self._next + 1) % len(self._records)
+        return record
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> ResultRecord:
+        """Record ``index`` counting from the newest (0)"""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("result index out of range")
+        return self._records[(self._next - 1 - index) % len(self._records)]
+
+    def rows(self, start: int, stop: int) -> List[ResultRecord]:
+        """Records ``start`` to ``stop`` (exclusive), newest first"""
+        start, stop = max(0, start), min(stop, self._count)
+        return [self[index] for index in range(start, stop)]
+
+    def newest_first(self) -> Iterator[ResultRecord]:
+        for index in range(self._count):
+            yield self[index]
+
+    def __iter__(self) -> Iterator[ResultRecord]:
+        """Oldest to newest"""
+        for index in range(self._count - 1, -1, -1):
+            yield self[index]
+
+    def resize(self, capacity: int):
+        """Change the cap, keeping the newest records that still fit"""
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        kept = list(self)[-capacity:]
+        self.evicted += self._count - len(kept)
+        self._records = kept + [None] * (capacity - len(kept))
+        self._count = len(kept)
+        self._next = len(kept) % capacity
+
+    def clear(self):
+        self._records = [None] * len(self._records)
+        self._next = 0
+        self._count = 0
@@ -0,0 +1,213 @@
+"""
+QRiftly region-of-interest search
+
+Finds candidate QR regions on a downscaled copy of a large capture by
+looking for finder patterns (the three nested squares in QR corners), so
+only small crops have to be decoded at native resolution. A 4K desktop
+screenshot is mostly empty pixels; decoding a few crops is much cheaper
+than handing zbar the whole frame, and small codes can be upscaled.
+"""
+
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+# Longest side of the coarsest pyramid level used for detection
+DETECT_MAX_SIDE = 960
+
+# Finest pyramid level; small finder patterns only survive at full size
+MIN_DETECT_SCALE = 1.0
+
+# Offset below the local mean that counts as a dark module. High enough
+# that sensor noise and JPEG artefacts do not turn into thousands of specks
+THRESHOLD_OFFSET = 20
+
+# More contours than this means noise or texture, not a few QR codes
+MAX_CONTOURS = 20000
+
+# Finder centres of one symbol are (modules - 7) apart, about 11 finder
+# widths for version 17. Finders of larger codes that fail to link still
+# get overlapping single-finder regions, which are merged afterwards
+FINDER_LINK_DISTANCE = 12.0
+
+# Padding around a cluster of finders, in finder widths (covers the rest
+# of the symbol when only some finders were seen, plus the quiet zone)
+REGION_MARGIN = 2.0
+SINGLE_FINDER_MARGIN = 6.0
+
+# Too many candidates means a busy/textured image; decode it whole instead
+MAX_REGIONS = 12
+
+# Regions covering this much of the image leave nothing for a full decode
+COVERED_FRACTION = 0.9
+
+# Crops smaller than this are upscaled before decoding
+MIN_DECODE_SIDE = 240
+
+Region = Tuple[int, int, int, int]  # x, y, width, height in full-resolution pixels
+
+
+def _finder_patterns(binary: np.ndarray) -> List[Tuple[float, float, float]]:
+    """Return (centre x, centre y, size) of every nested-square contour"""
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None or len(contours) > MAX_CONTOURS:
+        return []
+    hierarchy = hierarchy[0]
+
+    # Only contours with a child that itself has a child can be finders
+    children = hierarchy[:, 2]
+    candidates = np.flatnonzero(children >= 0)
+    candidates = candidates[hierarchy[children[candidates], 2] >= 0]
+
+    finders = []
+    for index in candidates:
+        contour = contours[index]
+        grandchild = hierarchy[hierarchy[index][2]][2]
+
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < 5 or h < 5 or not 0.6 < w / h < 1.66:
+            continue
+
+        outer_area = cv2.contourArea(contour)
+        inner_area = cv2.contourArea(contours[grandchild])
+        if inner_area <= 0:
+            continue
+        # Outer 7x7 modules vs inner 3x3 modules: area ratio ≈ 5.4
+        if not 2.5 < outer_area / inner_area < 12.0:
+            continue
+
+        finders.append((x + w / 2.0, y + h / 2.0, float(max(w, h))))
+    return finders
+
+
+def _cluster(finders: List[Tuple[float, float, float]]) -> List[List[int]]:
+    """Group finder patterns that are close enough to belong to one code"""
+    parent = list(range(len(finders)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (xi, yi, si) in enumerate(finders):
+        for j in range(i + 1, len(finders)):
+            xj, yj, sj = finders[j]
+            # Finders of one symbol have almost the same size
+            if not 0.5 < si / sj < 2.0:
+                continue
+            limit = FINDER_LINK_DISTANCE * max(si, sj)
+            if (xi - xj) ** 2 + (yi - yj) ** 2 <= limit * limit:
+                parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(finders)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def _merge_overlapping(regions: List[Region]) -> List[Region]:
+    """Union regions that overlap until none do"""
+    merged = list(regions)
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        while merged:
+            x, y, w, h = merged.pop()
+            index = 0
+            while index < len(merged):
+                ox, oy, ow, oh = merged[index]
+                if x < ox + ow and ox < x + w and y < oy + oh and oy < y + h:
+                    nx, ny = min(x, ox), min(y, oy)
+                    w = max(x + w, ox + ow) - nx
+                    h = max(y + h, oy + oh) - ny
+                    x, y = nx, ny
+                    merged.pop(index)
+                    changed = True
+                else:
+                    index += 1
+            result.append((x, y, w, h))
+        merged = result
+    return merged
+
+
+def detect_at_scale(gray: np.ndarray, scale: float) -> List[Region]:
+    """Find candidate regions using a pyramid level at ``scale``"""
+    height, width = gray.shape
+    if scale < 1.0:
+        small = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+
+    blurred = cv2.GaussianBlur(small, (3, 3), 0)
+    binary = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                   cv2.THRESH_BINARY_INV, 31, THRESHOLD_OFFSET)
+    finders = _finder_patterns(binary)
+    if not finders:
+        return []
+
+    regions = []
+    for group in _cluster(finders):
+        size = max(finders[i][2] for i in group)
+        margin = (REGION_MARGIN if len(group) > 1 else SINGLE_FINDER_MARGIN) * size
+        xs = [finders[i][0] for i in group]
+        ys = [finders[i][1] for i in group]
+        x0 = max(0.0, min(xs) - margin)
+        y0 = max(0.0, min(ys) - margin)
+        x1 = min(small.shape[1], max(xs) + margin)
+        y1 = min(small.shape[0], max(ys) + margin)
+
+        regions.append((int(x0 / scale), int(y0 / scale),
+                        int((x1 - x0) / scale) + 1, int((y1 - y0) / scale) + 1))
+
+    regions = _merge_overlapping(regions)
+    return [(x, y, min(w, width - x), min(h, height - y)) for x, y, w, h in regions]
+
+
+def pyramid_scales(shape: Tuple[int, int]) -> List[float]:
+    """Detection scales from coarsest to finest for an image of ``shape``"""
+    longest = max(shape)
+    scale = min(1.0, DETECT_MAX_SIDE / float(longest))
+    scales = [scale]
+    while scale < MIN_DETECT_SCALE:
+        scale = min(MIN_DETECT_SCALE, scale * 2.0)
+        scales.append(scale)
+    return scales
+
+
+def find_regions(gray: np.ndarray) -> List[Region]:
+    """
+    Search every pyramid level and return the merged candidate regions.
+
+    Large codes are found at the coarse levels and small ones only at the
+    fine levels, so no level is skipped. Returns an empty list when nothing
+    plausible was found, or when the image is so busy that cropping would
+    not save any work.
+    """
+    regions: List[Region] = []
+    for scale in pyramid_scales(gray.shape):
+        regions = _merge_overlapping(regions + detect_at_scale(gray, scale))
+        if len(regions) > MAX_REGIONS:
+            return []
+    return regions
+
+
+def coverage(regions: List[Region], shape: Tuple[int, int]) -> float:
+    """Fraction of an image of ``shape`` inside non-overlapping ``regions``"""
+    area = sum(w * h for _, _, w, h in regions)
+    return area / float(shape[0] * shape[1])
+
+
+def crop_for_decode(gray: np.ndarray, region: Region) -> Tuple[np.ndarray, float]:
+    """Crop a region, upscaling small crops; returns (crop, upscale factor)"""
+    x, y, w, h = region
+    crop = gray[y:y + h, x:x + w]
+    shortest = min(w, h)
+    if 0 < shortest < MIN_DECODE_SIDE:
+        factor = float(np.ceil(MIN_DECODE_SIDE / shortest))
+        crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_NEAREST)
+        return crop, factor
+    return np.ascontiguousarray(crop), 1.0
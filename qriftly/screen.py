@@ -0,0 +1,173 @@
+"""
+QRiftly screen capture
+
+Capture backends that return the screen (or one monitor, or a region of it)
+as a NumPy array ready for QRDecoder. The fast path uses ``mss``, whose raw
+BGRA buffer is wrapped by NumPy without a copy; Pillow's ImageGrab and
+pyautogui are fallbacks for systems without mss. Capturing only the monitor
+or region of interest means fewer pixels to convert and decode.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+Region = Tuple[int, int, int, int]  # left, top, width, height in desktop pixels
+
+
+class Monitor:
+    """A capturable screen area; index 0 is the whole virtual desktop"""
+
+    __slots__ = ('index', 'left', 'top', 'width', 'height')
+
+    def __init__(self, index: int, left: int, top: int, width: int, height: int):
+        self.index = index
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+
+    @property
+    def region(self) -> Region:
+        return self.left, self.top, self.width, self.height
+
+    def __repr__(self):
+        return f"Monitor({self.index}, {self.width}x{self.height}+{self.left}+{self.top})"
+
+
+class CaptureBackend(ABC):
+    """Base class for screen capture backends"""
+
+    name = "base"
+
+    def available(self) -> bool:
+        """Whether the backend's dependencies could be loaded"""
+        return True
+
+    def monitors(self) -> List[Monitor]:
+        """Whole desktop followed by each physical monitor, if known"""
+        return []
+
+    @abstractmethod
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        """Capture ``region`` (default: the whole desktop)"""
+
+
+class MssBackend(CaptureBackend):
+    """mss: direct BGRA grabs without a PIL round trip"""
+
+    name = "mss"
+
+    def __init__(self):
+        self._local = threading.local()  # mss handles must not cross threads
+        self._error = None
+
+    def _handle(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is None and self._error is None:
+            try:
+                import mss
+                sct = self._local.sct = mss.mss()
+            except Exception as e:  # ImportError, or no display to connect to
+                self._error = e
+        return sct
+
+    def available(self) -> bool:
+        return self._handle() is not None
+
+    def monitors(self) -> List[Monitor]:
+        sct = self._handle()
+        if sct is None:
+            return []
+        return [Monitor(index, m['left'], m['top'], m['width'], m['height'])
+                for index, m in enumerate(sct.monitors)]
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        sct = self._handle()
+        if sct is None:
+            raise RuntimeError(f"mss capture unavailable: {self._error}")
+        if region is None:
+            area = sct.monitors[0]
+        else:
+            left, top, width, height = region
+            area = {'left': left, 'top': top, 'width': width, 'height': height}
+        shot = sct.grab(area)
+        # shot.raw is a bytearray; frombuffer views it, so no pixel copy is made
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+
+class ImageGrabBackend(CaptureBackend):
+    """Pillow's ImageGrab, converted straight to grayscale"""
+
+    name = "pillow"
+
+    def available(self) -> bool:
+        try:
+            from PIL import ImageGrab  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        from PIL import ImageGrab
+        bbox = None
+        if region is not None:
+            left, top, width, height = region
+            bbox = (left, top, left + width, top + height)
+        return np.asarray(ImageGrab.grab(bbox=bbox, all_screens=True).convert('L'))
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """pyautogui screenshots (primary monitor only on some platforms)"""
+
+    name = "pyautogui"
+
+    def available(self) -> bool:
+        try:
+            import pyautogui  # noqa: F401
+            return True
+        except Exception:  # ImportError, or no display on Linux
+            return False
+
+    def grab(self, region: Optional[Region] = None) -> np.ndarray:
+        import pyautogui
+        return np.asarray(pyautogui.screenshot(region=region).convert('L'))
+
+
+# Fastest first; the first available backend is the default
+CAPTURE_BACKENDS: Dict[str, Type[CaptureBackend]] = {
+    MssBackend.name: MssBackend,
+    ImageGrabBackend.name: ImageGrabBackend,
+    PyAutoGuiBackend.name: PyAutoGuiBackend,
+}
+
+_instances: Dict[str, CaptureBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def get_capture_backend(name: Optional[str] = None) -> CaptureBackend:
+    """Shared instance of a capture backend, or the fastest available one"""
+    if name is not None and name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend '{name}' "
+                         f"(choose from: {', '.join(CAPTURE_BACKENDS)})")
+    with _instances_lock:
+        for candidate in ([name] if name else CAPTURE_BACKENDS):
+            if candidate not in _instances:
+                _instances[candidate] = CAPTURE_BACKENDS[candidate]()
+            backend = _instances[candidate]
+            if name or backend.available():
+                return backend
+    raise RuntimeError("No screen capture backend available (install mss or Pillow)")
+
+
+def list_monitors(backend: Optional[CaptureBackend] = None) -> List[Monitor]:
+    """Monitors known to ``backend`` (default: the fastest available)"""
+    return (backend or get_capture_backend()).monitors()
+
+
+def grab_screen(region: Optional[Region] = None,
+                backend: Optional[CaptureBackend] = None) -> np.ndarray:
+    """Capture the desktop or a region with the fastest available backend"""
+    return (backend or get_capture_backend()).grab(region)
@@ -0,0 +1,279 @@
+"""
+QRiftly result sinks
+
+Streaming writers for decoded results. Records are written and flushed as
+they arrive so downstream tools can ``tail -f`` the output while a batch or
+live scan is still running, and nothing is kept once written: JSON Lines
+and CSV take every result, .vcf files collect the business cards (vCard and
+MeCard) and .ics files the calendar events.
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from .contacts import fold_line
+from .engine import DecodedSymbol
+from .payload import ContactPayload, EventPayload, parse_payload
+
+
+def format_timestamp(timestamp: float) -> str:
+    """Format a UNIX timestamp as an ISO 8601 UTC string"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='milliseconds')
+
+
+def symbol_record(symbol: DecodedSymbol, source: str, latency: float = 0.0,
+                  timestamp: Optional[float] = None, stages: Optional[dict] = None,
+                  extra: Optional[dict] = None) -> dict:
+    """Build the JSON-serialisable record for one decoded symbol"""
+    payload = parse_payload(symbol.data)
+    record = {
+        'source': source,
+        'timestamp': format_timestamp(time.time() if timestamp is None else timestamp),
+        'payload': symbol.data,
+        'type': payload.label,
+        'symbol_type': symbol.symbol_type,
+        'backend': symbol.backend,
+        'polygon': [list(point) for point in symbol.polygon],
+        'rect': list(symbol.rect) if symbol.rect else None,
+        'latency_ms': round(latency * 1000.0, 3),
+    }
+    fields = payload.fields()
+    if fields:
+        record['fields'] = fields
+    if symbol.page is not None:
+        record['page'] = symbol.page
+    if symbol.quality is not None:
+        record['quality'] = symbol.quality
+    if symbol.orientation:
+        record['orientation'] = symbol.orientation
+    if symbol.preprocess:
+        record['preprocess'] = symbol.preprocess
+    if stages:
+        record['stages_ms'] = {stage: round(value, 3) for stage, value in stages.items()}
+    if extra:
+        record.update(extra)
+    return record
+
+
+class StreamSink(ABC):
+    """
+    Base for writers that stream one record per decoded symbol.
+
+    ``path`` may be a file name or ``"-"`` for stdout. Writes are serialised
+    with a lock so the camera thread and the UI thread can share a sink.
+    Subclasses turn symbols into text with ``format_record`` and may write a
+    ``header`` when the file is started and a ``footer`` on ``close``.
+    """
+
+    header = ""
+    footer = ""
+    newline: Optional[str] = None  # '' for formats that write their own CRLF line ends
+
+    def __init__(self, path: str = "-", append: bool = False):
+        self.path = path
+        if path == "-":
+            self._stream = sys.stdout
+            self._owns_stream = False
+            started = False
+        else:
+            started = append and os.path.exists(path) and os.path.getsize(path) > 0
+            self._stream = open(path, 'a' if append else 'w', encoding='utf-8', newline=self.newline)
+            self._owns_stream = True
+        self._lock = threading.Lock()
+        self.count = 0
+        self._start(started)
+
+    def _start(self, appending: bool):
+        """Write the header, unless appending to a file that already has one"""
+        if self.header and not appending:
+            self._stream.write(self.header)
+            self._stream.flush()
+
+    @abstractmethod
+    def format_record(self, symbol: DecodedSymbol, source: str, latency: float, timestamp: float,
+                      stages: Optional[dict], extra: Optional[dict]) -> Optional[str]:
+        """Text written for one symbol, or None to skip it"""
+
+    def write(self, symbol: DecodedSymbol, source: str, latency: float = 0.0,
+              timestamp: Optional[float] = None):
+        """Write a single symbol and flush it immediately"""
+        self.write_many([symbol], source, latency, timestamp)
+
+    def write_many(self, symbols: Iterable[DecodedSymbol], source: str,
+                   latency: float = 0.0, timestamp: Optional[float] = None,
+                   stages: Optional[dict] = None, extra: Optional[dict] = None):
+        """
+        Write all symbols decoded from one image, then flush once.
+
+        ``extra`` fields (e.g. a video frame number) are added to every record.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        records = [record for record in (self.format_record(symbol, source, latency, timestamp, stages, extra)
+                                         for symbol in symbols) if record]
+        if not records:
+            return
+
+        with self._lock:
+            if self._stream is None:
+                return
+            self._stream.writelines(records)
+            self._stream.flush()
+            self.count += len(records)
+
+    def close(self):
+        """Write the footer, flush and close the underlying file (stdout is left open)"""
+        with self._lock:
+            if self._stream is None:
+                return
+            try:
+                if self.footer:
+                    self._stream.write(self.footer)
+                self._stream.flush()
+                if self._owns_stream:
+                    self._stream.close()
+            finally:
+                self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonLinesSink(StreamSink):
+    """Write one JSON object per decoded symbol (JSON Lines)"""
+
+    def format_record(self, symbol, source, latency, timestamp, stages, extra):
+        return json.dumps(symbol_record(symbol, source, latency, timestamp, stages, extra),
+                          ensure_ascii=False) + "\n"
+
+
+# CSV columns after the common ones; contact and event fields, empty for other types
+CSV_FIELD_COLUMNS = ('name', 'organization', 'title', 'phones', 'emails', 'addresses', 'urls',
+                     'note', 'summary', 'start', 'end', 'location')
+
+
+class CsvSink(StreamSink):
+    """
+    Write one CSV row per decoded symbol.
+
+    Parsed contact and event fields get their own columns (several phone
+    numbers or e-mails are joined with "; "), so a stack of scanned business
+    cards opens as a spreadsheet.
+    """
+
+    newline = ''
+    columns = ('source', 'timestamp', 'type', 'symbol_type', 'page', 'payload') + CSV_FIELD_COLUMNS
+
+    def __init__(self, path: str = "-", append: bool = False):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(self.columns)
+        self.header = self._row()
+        super().__init__(path, append)
+
+    def _row(self) -> str:
+        row = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return row
+
+    def format_record(self, symbol, source, latency, timestamp, stages, extra):
+        payload = parse_payload(symbol.data)
+        fields = payload.fields()
+        values = [source, format_timestamp(timestamp), payload.label, symbol.symbol_type,
+                  "" if symbol.page is None else symbol.page, symbol.data]
+        for column in CSV_FIELD_COLUMNS:
+            value = fields.get(column, "")
+            values.append("; ".join(value) if isinstance(value, tuple) else value)
+        with self._lock:  # The row buffer is shared
+            self._writer.writerow(values)
+            return self._row()
+
+
+class VCardSink(StreamSink):
+    """
+    Write every scanned contact to a .vcf file.
+
+    vCards are written as scanned (line ends normalised to CRLF); MeCards
+    are converted to vCard 3.0. Other payloads are skipped.
+    """
+
+    newline = ''
+
+    def format_record(self, symbol, source, latency, timestamp, stages, extra):
+        payload = parse_payload(symbol.data)
+        if not isinstance(payload, ContactPayload):
+            return None
+        if payload.kind == 'mecard':
+            return payload.contact.to_vcard()
+        lines = [line for line in symbol.data.strip().splitlines() if line]
+        if lines[-1].strip().upper() != 'END:VCARD':
+            lines.append('END:VCARD')  # Often cut off to save space in the code
+        return "".join(line + "\r\n" for line in lines)
+
+
+class ICalendarSink(StreamSink):
+    """
+    Write every scanned calendar event into one iCalendar (.ics) file.
+
+    Events keep their properties as scanned; a UID and DTSTAMP are added
+    where the code left them out. Other payloads are skipped. Each sink
+    writes one VCALENDAR, so appending to a file adds another calendar
+    object to the stream, as RFC 5545 allows.
+    """
+
+    newline = ''
+    header = "".join(fold_line(line) for line in (
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//QRiftly//QR Scanner//EN"))
+    footer = "END:VCALENDAR\r\n"
+
+    def _start(self, appending: bool):
+        super()._start(False)  # Every sink opens its own VCALENDAR
+
+    def format_record(self, symbol, source, latency, timestamp, stages, extra):
+        payload = parse_payload(symbol.data)
+        if not isinstance(payload, EventPayload):
+            return None
+        return payload.event.to_vevent()
+
+
+# Sink class for each output format name
+SINKS = {
+    'jsonl': JsonLinesSink,
+    'csv': CsvSink,
+    'vcf': VCardSink,
+    'ics': ICalendarSink,
+}
+
+
+# Output format for each file extension
+SINK_EXTENSIONS = {
+    '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+    '.csv': 'csv',
+    '.vcf': 'vcf', '.vcard': 'vcf',
+    '.ics': 'ics', '.ical': 'ics',
+}
+
+
+def sink_format(path: str) -> str:
+    """Output format for a file name, by extension (JSON Lines if unknown)"""
+    return SINK_EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'jsonl')
+
+
+def open_sink(format: str, path: str = "-", append: bool = False) -> StreamSink:
+    """Open the streaming writer for an output format name (see SINKS)"""
+    try:
+        return SINKS[format](path, append)
+    except KeyError:
+        raise ValueError(f"Unknown output format '{format}' (choose from: {', '.join(SINKS)})")
@@ -0,0 +1,528 @@
+"""
+QRiftly structured append
+
+A QR structured-append sequence splits one message over up to 16 symbols.
+Every part starts with a 20-bit header (mode 0011, its position, the
+number of parts and a parity byte of the whole message) that neither zbar
+nor OpenCV report: they either drop it or, when every part is in the same
+image, quietly join the parts themselves. ``read_header`` therefore reads
+the header straight from the symbol's modules, using the corners the
+backend already found, and ``StructuredAppendBuffer`` collects parts across
+images or camera frames and emits the joined message once every part has
+been seen. Partial sequences time out, and the oldest are evicted when too
+many are open, so memory stays bounded in long sessions.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .symbols import DecodedSymbol, decode_payload
+
+# Seconds a partial sequence waits for its missing parts
+SEQUENCE_TIMEOUT = 30.0
+
+# Partial sequences kept at once; the least recently extended goes first
+MAX_SEQUENCES = 64
+
+# Error-correction blocks per version, for levels L, M, Q, H (ISO/IEC 18004 table 9)
+_BLOCK_COUNTS = (
+    (1, 1, 1, 1), (1, 1, 1, 1), (1, 1, 2, 2), (1, 2, 2, 4), (1, 2, 4, 4),
+    (2, 4, 4, 4), (2, 4, 6, 5), (2, 4, 6, 6), (2, 5, 8, 8), (4, 5, 8, 8),
+    (4, 5, 8, 11), (4, 8, 10, 11), (4, 9, 12, 16), (4, 9, 16, 16), (6, 10, 12, 18),
+    (6, 10, 17, 16), (6, 11, 16, 19), (6, 13, 18, 21), (7, 14, 21, 25), (8, 16, 20, 25),
+    (8, 17, 23, 25), (9, 17, 23, 34), (9, 18, 25, 30), (10, 20, 27, 32), (12, 21, 29, 35),
+    (12, 23, 34, 37), (12, 25, 34, 40), (13, 26, 35, 42), (14, 28, 38, 45), (15, 29, 40, 48),
+    (16, 31, 43, 51), (17, 33, 45, 54), (18, 35, 48, 57), (19, 37, 51, 60), (19, 38, 53, 63),
+    (20, 40, 56, 66), (21, 43, 59, 70), (22, 45, 62, 74), (24, 47, 65, 77), (25, 49, 68, 81),
+)
+
+# Error-correction level bits of the format information -> column of _BLOCK_COUNTS
+_LEVEL_COLUMNS = {1: 0, 0: 1, 3: 2, 2: 3}
+
+_MODE_STRUCTURED_APPEND = 0b0011
+_MODE_BYTE = 0b0100
+
+# The 1:1:3:1:1 finder pattern as seen from its top-left corner, 1 = dark
+_FINDER = np.array([[1 if max(abs(r - 3), abs(c - 3)) in (0, 1, 3) else 0 for c in range(7)]
+                    for r in range(7)], dtype=np.uint8)
+
+_MASKS = (
+    lambda r, c: (r + c) % 2 == 0,
+    lambda r, c: r % 2 == 0,
+    lambda r, c: c % 3 == 0,
+    lambda r, c: (r + c) % 3 == 0,
+    lambda r, c: (r // 2 + c // 3) % 2 == 0,
+    lambda r, c: (r * c) % 2 + (r * c) % 3 == 0,
+    lambda r, c: ((r * c) % 2 + (r * c) % 3) % 2 == 0,
+    lambda r, c: ((r + c) % 2 + (r * c) % 3) % 2 == 0,
+)
+
+
+def _bch(value: int, generator: int, bits: int) -> int:
+    """``value`` followed by its BCH remainder for ``generator``"""
+    remainder = value << bits
+    top = generator.bit_length()
+    while remainder.bit_length() >= top:
+        remainder ^= generator << (remainder.bit_length() - top)
+    return (value << bits) | remainder
+
+
+# Every valid 15-bit format word (already XOR-masked) -> (level bits, mask)
+_FORMAT_WORDS = {_bch(value, 0x537, 10) ^ 0x5412: (value >> 3, value & 7) for value in range(32)}
+
+# Every valid 18-bit version word -> version
+_VERSION_WORDS = {_bch(version, 0x1F25, 12): version for version in range(7, 41)}
+
+
+class StructuredAppend:
+    """Structured-append header of one symbol"""
+
+    __slots__ = ('index', 'total', 'parity')
+
+    def __init__(self, index: int, total: int, parity: int):
+        self.index = index  # 0-based position of this symbol in the sequence
+        self.total = total
+        self.parity = parity  # XOR of every byte of the joined message
+
+    def __repr__(self):
+        return f"StructuredAppend({self.index + 1}/{self.total}, parity=0x{self.parity:02x})"
+
+
+def _nearest(words: Dict[int, object], value: int, max_distance: int):
+    """Entry of the closest valid BCH word, or None if more than max_distance bits away"""
+    distance, word = min((bin(word ^ value).count('1'), word) for word in words)
+    return words[word] if distance <= max_distance else None
+
+
+def _alignment_positions(version: int) -> List[int]:
+    if version == 1:
+        return []
+    count = version // 7 + 2
+    size = version * 4 + 17
+    step = 26 if version == 32 else (version * 4 + count * 2 + 1) // (count * 2 - 2) * 2
+    return [6] + sorted(size - 7 - i * step for i in range(count - 1))
+
+
+@lru_cache(maxsize=40)
+def _data_modules(version: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(rows, cols) of the data modules of a version, in bit-stream order"""
+    size = version * 4 + 17
+    reserved = np.zeros((size, size), dtype=bool)
+    reserved[:9, :9] = reserved[:9, -8:] = reserved[-8:, :9] = True  # Finders, format
+    reserved[6, :] = reserved[:, 6] = True  # Timing
+    positions = _alignment_positions(version)
+    for row in positions:
+        for col in positions:
+            if not reserved[row, col]:
+                reserved[row - 2:row + 3, col - 2:col + 3] = True
+    if version >= 7:
+        reserved[:6, size - 11:size - 8] = reserved[size - 11:size - 8, :6] = True
+
+    rows, cols = [], []
+    right = size - 1
+    while right >= 1:
+        if right == 6:
+            right = 5
+        upward = ((right + 1) & 2) == 0
+        for vertical in range(size):
+            row = size - 1 - vertical if upward else vertical
+            for col in (right, right - 1):
+                if not reserved[row, col]:
+                    rows.append(row)
+                    cols.append(col)
+        right -= 2
+    return np.array(rows), np.array(cols)
+
+
+class _Grid:
+    """Samples the modules of one candidate symbol layout from a gray image"""
+
+    def __init__(self, gray: np.ndarray, corners: np.ndarray, threshold: float):
+        self.gray = gray
+        self.threshold = threshold
+        unit = np.float32([[0, 0], [1, 0], [1, 1], [0, 1]])
+        self.transform = cv2.getPerspectiveTransform(unit, corners.astype(np.float32))
+        self.size = 0
+
+    def sample(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Dark (1) / light (0) at unit-square coordinates"""
+        points = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+        mapped = cv2.perspectiveTransform(points, self.transform).reshape(-1, 2)
+        height, width = self.gray.shape
+        px = np.clip(np.rint(mapped[:, 0]).astype(int), 0, width - 1)
+        py = np.clip(np.rint(mapped[:, 1]).astype(int), 0, height - 1)
+        return (self.gray[py, px] < self.threshold).astype(np.uint8)
+
+    def modules(self, rows, cols) -> np.ndarray:
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        return self.sample((cols + 0.5) / self.size, (rows + 0.5) / self.size)
+
+    def estimate_size(self) -> int:
+        """Modules per side, from where the top-left finder's outer ring ends"""
+        t = np.linspace(0.0, 0.45, 512)
+        dark = self.sample(t, t)
+        # Along the diagonal: ring (1), gap (1), core (3), gap (1), ring (1), separator.
+        # The outline may sit a fraction of a module outside the ring
+        start = int(np.argmax(dark))
+        runs = np.flatnonzero(np.diff(dark[start:])) + start + 1
+        if not dark[start] or len(runs) < 5 or t[start] > 0.05:
+            return 0
+        return int(round(7.0 / t[runs[4]]))
+
+    def finders_match(self) -> bool:
+        """Finder patterns in three corners and none in the fourth"""
+        far = self.size - 7
+        offsets = np.arange(7)
+        rows, cols = np.meshgrid(offsets, offsets, indexing='ij')
+        rows = np.concatenate([rows, rows, rows + far, rows + far]).ravel()
+        cols = np.concatenate([cols, cols + far, cols, cols + far]).ravel()
+        found = self.modules(rows, cols).reshape(4, 49)
+        scores = np.mean(found == _FINDER.ravel(), axis=1)
+        return scores[:3].min() >= 0.85 and scores[3] < 0.85
+
+    def timing_score(self) -> float:
+        """Fraction of the two timing patterns that alternate as they should"""
+        cells = np.arange(8, self.size - 8)
+        expected = (cells % 2 == 0).astype(np.uint8)
+        row = self.modules(np.full_like(cells, 6), cells)
+        col = self.modules(cells, np.full_like(cells, 6))
+        return float(np.mean(np.concatenate([row == expected, col == expected])))
+
+    def _map(self, col: float, row: float) -> np.ndarray:
+        point = np.float32([[[col / self.size, row / self.size]]])
+        return cv2.perspectiveTransform(point, self.transform)[0, 0]
+
+    def _find_center(self, col: float, row: float, modules: float) -> np.ndarray:
+        """
+        Image position of the dark blob of ``modules`` square modules centred
+        at (col, row): a finder's 3x3 core or an alignment pattern's centre.
+        Falls back to the predicted position.
+        """
+        predicted = self._map(col, row)
+        module = float(np.linalg.norm(self._map(col + 1, row) - predicted))
+        radius = int(module * 5) + 2
+        height, width = self.gray.shape
+        x0, y0 = max(int(predicted[0]) - radius, 0), max(int(predicted[1]) - radius, 0)
+        window = self.gray[y0:min(int(predicted[1]) + radius, height),
+                           x0:min(int(predicted[0]) + radius, width)]
+        if window.size == 0:
+            return predicted
+        dark = (window < self.threshold).astype(np.uint8)
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(dark, connectivity=4)
+        expected = modules * module * module
+        best, best_distance = predicted, module * 3.0
+        for label in range(1, count):
+            if not 0.4 * expected <= stats[label, cv2.CC_STAT_AREA] <= 2.0 * expected:
+                continue
+            center = centroids[label] + (x0, y0)
+            distance = float(np.linalg.norm(center - predicted))
+            if distance < best_distance:
+                best, best_distance = center, distance
+        return np.float32(best)
+
+    def refine(self):
+        """
+        Re-fit the grid to the finder patterns (and the bottom-right alignment
+        pattern from version 2). Backends report outlines that can be off by a
+        module or two, which is enough to misread the data modules.
+        """
+        size = self.size
+        anchors = [(3.5, 3.5, 9), (size - 3.5, 3.5, 9), (3.5, size - 3.5, 9)]
+        if size > 21:
+            anchors.append((size - 6.5, size - 6.5, 1))
+        found = np.float32([self._find_center(col, row, area) for col, row, area in anchors])
+        unit = np.float32([(col / size, row / size) for col, row, _ in anchors])
+        if len(anchors) == 4:
+            self.transform = cv2.getPerspectiveTransform(unit, found)
+        else:
+            self.transform = np.vstack([cv2.getAffineTransform(unit, found), [0, 0, 1]])
+
+
+def _orientations(corners: np.ndarray) -> Iterable[np.ndarray]:
+    """The corner order as given first, then its other rotations and the mirrored winding"""
+    for ordered in (corners, corners[::-1]):
+        for shift in range(4):
+            yield np.roll(ordered, -shift, axis=0)
+
+
+def _bits_to_int(bits: Sequence[int]) -> int:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _locate(gray: np.ndarray, polygon: List[Tuple[int, int]]) -> Iterable[_Grid]:
+    """
+    Grids whose corner order, size and finder patterns agree with the image,
+    best fit per corner order. A grid read with the wrong winding is the
+    symbol transposed, which has the same finders and timing patterns, so
+    the caller tells them apart by their format information.
+    """
+    points = np.array(polygon, dtype=np.float32)
+    if len(points) != 4:
+        if len(points) < 3:
+            return
+        points = cv2.boxPoints(cv2.minAreaRect(points))
+
+    x, y, w, h = cv2.boundingRect(points.astype(np.int32))
+    step = max(1, max(w, h) // 256)  # A subsample is plenty for the threshold
+    crop = gray[max(y, 0):y + h:step, max(x, 0):x + w:step]
+    if crop.size == 0:
+        return
+    threshold, _ = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    for corners in _orientations(points):
+        estimate = _Grid(gray, corners, threshold + 0.5).estimate_size()
+        if estimate < 21:
+            continue
+        # Sizes are 17 + 4 * version. The estimate can be a version or two off,
+        # so nearby sizes are fitted too, nearest first, until the timing
+        # patterns fit well; failing that the best fit wins
+        version = int(round((estimate - 17) / 4.0))
+        best, best_score = None, 0.8
+        for candidate in (version, version - 1, version + 1, version - 2, version + 2):
+            if not 1 <= candidate <= 40:
+                continue
+            grid = _Grid(gray, corners, threshold + 0.5)
+            grid.size = candidate * 4 + 17
+            grid.refine()
+            if not grid.finders_match():
+                continue
+            score = grid.timing_score()
+            if score >= 0.95:
+                best = grid
+                break
+            if score > best_score:
+                best, best_score = grid, score
+        if best is not None:
+            yield best
+
+
+def _read_version(grid: _Grid) -> Optional[int]:
+    """Version from the size, confirmed by the version information from version 7"""
+    version = (grid.size - 17) // 4
+    if version < 7:
+        return version
+    size = grid.size
+    # Bit i sits at column size-11+i%3, row i//3 (top right) and transposed (bottom left)
+    index = np.arange(18)
+    words = [grid.modules(index // 3, size - 11 + index % 3),
+             grid.modules(size - 11 + index % 3, index // 3)]
+    for bits in words:
+        found = _nearest(_VERSION_WORDS, _bits_to_int(bits[::-1]), 3)
+        if found == version:
+            return version
+    return None
+
+
+def _read_format(grid: _Grid) -> Optional[Tuple[Tuple[int, int], int]]:
+    """
+    ((level bits, mask), errors) from the closer copy of the format
+    information; errors counts the bits both copies are off by
+    """
+    size = grid.size
+    # Bit i of the first copy runs down column 8 and left along row 8 around the finder
+    first = ([(i, 8) for i in range(6)] + [(7, 8), (8, 8), (8, 7)]
+             + [(8, 14 - i) for i in range(9, 15)])
+    second = [(8, size - 1 - i) for i in range(8)] + [(size - 15 + i, 8) for i in range(8, 15)]
+    copies = []
+    for cells in (first, second):
+        rows, cols = zip(*cells)
+        value = _bits_to_int(grid.modules(rows, cols)[::-1])
+        copies.append(min((bin(word ^ value).count('1'), word) for word in _FORMAT_WORDS))
+    distance, word = min(copies)
+    if distance > 3:
+        return None
+    return _FORMAT_WORDS[word], sum(errors for errors, _ in copies)
+
+
+def _leading_codewords(grid: _Grid, version: int, level_bits: int, mask: int,
+                       count: int) -> List[int]:
+    """The first ``count`` data codewords of the message"""
+    blocks = _BLOCK_COUNTS[version - 1][_LEVEL_COLUMNS[level_bits]]
+    rows, cols = _data_modules(version)
+    # Codewords are interleaved across blocks: codeword k of block 1 is k * blocks
+    # in the stream, and every block holds at least 9 data codewords
+    picks = np.concatenate([np.arange(8) + 8 * k * blocks for k in range(count)])
+    rows, cols = rows[picks], cols[picks]
+    bits = grid.modules(rows, cols)
+    bits ^= _MASKS[mask](rows, cols).astype(np.uint8)
+    return [_bits_to_int(bits[8 * k:8 * k + 8]) for k in range(count)]
+
+
+def read_header(gray: np.ndarray, polygon: List[Tuple[int, int]],
+                raw: Optional[bytes] = None) -> Optional[StructuredAppend]:
+    """
+    Structured-append header of the QR symbol at ``polygon``, or None.
+
+    ``polygon`` is the symbol outline reported by the backend. ``raw`` is
+    the decoded data: a symbol whose data already is the whole message
+    (parts joined by the backend) is not reported as a part.
+    """
+    # The symbol and its transpose both fit the outline; the true one is the
+    # grid whose format information needs the fewest corrections
+    best, best_errors = None, None
+    for grid in _locate(gray, polygon):
+        version = _read_version(grid)
+        found = _read_format(grid)
+        if version is None or found is None:
+            continue
+        format_info, errors = found
+        if best is None or errors < best_errors:
+            best, best_errors = (grid, version, format_info), errors
+    if best is None:
+        return None
+
+    grid, version, (level_bits, mask) = best
+    codewords = _leading_codewords(grid, version, level_bits, mask, 6)
+    bits = ''.join(f"{codeword:08b}" for codeword in codewords)
+    if int(bits[0:4], 2) != _MODE_STRUCTURED_APPEND:
+        return None
+    header = StructuredAppend(int(bits[4:8], 2), int(bits[8:12], 2) + 1, int(bits[12:20], 2))
+    if header.total < 2 or header.index >= header.total:
+        return None
+
+    if raw is not None and int(bits[20:24], 2) == _MODE_BYTE:
+        length = int(bits[24:32] if version < 10 else bits[24:40], 2)
+        if length > len(raw):
+            return None  # Misread: more bytes than were decoded
+        if length < len(raw) and message_parity(raw) == header.parity:
+            return None  # Already the joined message
+    return header
+
+
+def message_parity(data: bytes) -> int:
+    """The structured-append parity of a message: XOR of all of its bytes"""
+    parity = 0
+    for byte in data:
+        parity ^= byte
+    return parity
+
+
+class _Sequence:
+    """Parts of one structured-append message seen so far"""
+
+    __slots__ = ('total', 'parity', 'parts', 'first_seen', 'last_seen')
+
+    def __init__(self, total: int, parity: int, now: float):
+        self.total = total
+        self.parity = parity
+        self.parts: Dict[int, DecodedSymbol] = {}
+        self.first_seen = now
+        self.last_seen = now
+
+
+class StructuredAppendBuffer:
+    """
+    Joins structured-append parts seen across images or frames.
+
+    ``process`` passes ordinary symbols through, holds parts back and
+    returns the joined symbol in their place once the last part arrives.
+    Sequences are keyed by (parity, total); a sequence that has not grown
+    for ``timeout`` seconds is dropped, as is the least recently extended
+    one when more than ``max_sequences`` are open.
+    """
+
+    def __init__(self, timeout: float = SEQUENCE_TIMEOUT, max_sequences: int = MAX_SEQUENCES):
+        self.timeout = timeout
+        self.max_sequences = max_sequences
+        self._sequences: "OrderedDict[Tuple[int, int], _Sequence]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.corrupt = 0  # Complete sequences whose parity did not match
+
+    def add(self, symbol: DecodedSymbol, now: Optional[float] = None) -> Optional[DecodedSymbol]:
+        """Record one part; the joined symbol if it completed its sequence"""
+        header = symbol.sequence
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+            key = (header.parity, header.total)
+            sequence = self._sequences.get(key)
+            if sequence is None:
+                sequence = self._sequences[key] = _Sequence(header.total, header.parity, now)
+                if len(self._sequences) > self.max_sequences:
+                    self._sequences.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._sequences.move_to_end(key)
+            sequence.parts.setdefault(header.index, symbol)
+            sequence.last_seen = now
+            if len(sequence.parts) < sequence.total:
+                return None
+            del self._sequences[key]
+
+            joined = self._join(sequence)
+            if joined is None:
+                self.corrupt += 1
+            else:
+                self.completed += 1
+            return joined
+
+    def process(self, symbols: Iterable[DecodedSymbol],
+                now: Optional[float] = None) -> List[DecodedSymbol]:
+        """``symbols`` with parts replaced by any messages they completed"""
+        results = []
+        for symbol in symbols:
+            if symbol.sequence is None:
+                results.append(symbol)
+                continue
+            joined = self.add(symbol, now)
+            if joined is not None:
+                results.append(joined)
+        return results
+
+    def _expire(self, now: float):
+        while self._sequences:
+            key, sequence = next(iter(self._sequences.items()))
+            if now - sequence.last_seen <= self.timeout:
+                break
+            del self._sequences[key]
+            self.expired += 1
+
+    @staticmethod
+    def _join(sequence: _Sequence) -> Optional[DecodedSymbol]:
+        parts = [sequence.parts[index] for index in range(sequence.total)]
+        raw = b''.join(part.raw if part.raw is not None else part.data.encode('utf-8')
+                       for part in parts)
+        if message_parity(raw) != sequence.parity:
+            return None
+        data = decode_payload(raw)
+        if data is None:
+            return None
+        last = parts[-1]
+        return DecodedSymbol(data, last.symbol_type, last.rect, list(last.polygon), last.backend,
+                             last.page, raw=raw)
+
+    def pending(self) -> List[Tuple[int, int, List[int]]]:
+        """(parity, total, 0-based indices seen) of every partial sequence"""
+        with self._lock:
+            return [(sequence.parity, sequence.total, sorted(sequence.parts))
+                    for sequence in self._sequences.values()]
+
+    def stats(self) -> dict:
+        return {
+            'pending': len(self._sequences),
+            'completed': self.completed,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'corrupt': self.corrupt,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._sequences.clear()
+
+    def __len__(self):
+        return len(self._sequences)
@@ -0,0 +1,54 @@
+"""
+QRiftly symbol types
+
+Plain data objects shared by the engine and the decoder backends.
+"""
+
+from typing import List, Optional, Tuple
+
+
+class DecodedSymbol:
+    """A single decoded barcode symbol and where it was found"""
+
+    __slots__ = ('data', 'symbol_type', 'rect', 'polygon', 'backend', 'page',
+                 'quality', 'orientation', 'raw', 'sequence', 'preprocess')
+
+    def __init__(self, data: str, symbol_type: str = "QRCODE",
+                 rect: Optional[Tuple[int, int, int, int]] = None,
+                 polygon: Optional[List[Tuple[int, int]]] = None,
+                 backend: str = "", page: Optional[int] = None,
+                 quality: Optional[int] = None, orientation: Optional[str] = None,
+                 raw: Optional[bytes] = None, sequence=None,
+                 preprocess: Optional[str] = None):
+        self.data = data
+        self.symbol_type = symbol_type
+        self.rect = rect
+        self.polygon = polygon or []
+        self.backend = backend
+        self.page = page  # 1-based page/frame of a multi-page document, else None
+        self.quality = quality  # zbar's scan quality, None if the backend has none
+        self.orientation = orientation  # UP, RIGHT, DOWN or LEFT
+        self.raw = raw  # Payload bytes before text decoding
+        self.sequence = sequence  # StructuredAppend header of a part, else None
+        self.preprocess = preprocess  # Ladder step that made it decodable, None for the plain pass
+
+    def copy(self) -> 'DecodedSymbol':
+        """A copy whose polygon can be modified independently"""
+        return DecodedSymbol(self.data, self.symbol_type, self.rect, list(self.polygon),
+                             self.backend, self.page, self.quality, self.orientation,
+                             self.raw, self.sequence, self.preprocess)
+
+    def __repr__(self):
+        return f"DecodedSymbol({self.data!r}, {self.symbol_type!r}, backend={self.backend!r})"
+
+
+def decode_payload(raw: bytes) -> Optional[str]:
+    """Decode raw symbol bytes to text, falling back to latin-1"""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        # Try other encodings
+        try:
+            return raw.decode('latin-1')
+        except Exception:
+            return None
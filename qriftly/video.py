@@ -0,0 +1,250 @@
+"""
+QRiftly video scanning
+
+Finds codes in recorded video (conveyor cameras, screen recordings) as fast
+as the file can be decoded, not in real time. Frames are sampled sparsely
+while nothing is in view; skipped frames are only grabbed (demuxed and
+decoded by FFmpeg, never converted or copied). Around a detection every
+frame is decoded, and the frames skipped just before it are revisited so
+each hit reports the first frame the code appeared in. Payloads are
+de-duplicated on video time, so a code is reported once per appearance.
+
+The live camera pipeline is not used for files: its capture thread paces
+reads to the frame rate and its latest-frame slot drops whatever the
+decoder has not caught up with, which suits a camera but would play a file
+in real time and lose frames. Here the scanner drives the reads itself,
+so every frame stays reachable. Frames, the scene-change thumbnail and
+the deduplicator are shared with live scanning.
+"""
+
+import math
+import sys
+import time
+from typing import Callable, Iterator, List, Optional
+
+import cv2
+
+from .camera import DEFAULT_FPS, Frame
+from .dedup import LEAVE_TIMEOUT, TemporalDeduplicator
+from .engine import QRDecoder
+from .symbols import DecodedSymbol
+from .watch import CHANGE_THRESHOLD, change_thumbnail
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v', '.wmv', '.mpg', '.mpeg')
+
+# Seconds of video between decoded frames while no code is in view
+SPARSE_INTERVAL = 0.2
+
+# Seconds after a new detection during which every frame is decoded, so
+# codes following close behind (items on a belt) are not stepped over
+DENSE_WINDOW = 1.0
+
+# Seconds between progress callbacks
+PROGRESS_INTERVAL = 0.1
+
+
+def is_video(path: str) -> bool:
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def format_video_time(seconds: float) -> str:
+    """Position in a video as [H:]MM:SS.mmm"""
+    minutes, seconds = divmod(max(0.0, seconds), 60.0)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:06.3f}"
+    return f"{minutes:02d}:{seconds:06.3f}"
+
+
+class VideoHit:
+    """A code's appearance in a video"""
+
+    __slots__ = ('symbol', 'frame', 'time')
+
+    def __init__(self, symbol: DecodedSymbol, frame: int, time: float):
+        self.symbol = symbol
+        self.frame = frame  # 0-based index of the first frame it was seen in
+        self.time = time  # Seconds from the start of the video
+
+    def __repr__(self):
+        return f"VideoHit({self.symbol.data!r}, frame={self.frame}, time={format_video_time(self.time)})"
+
+
+class VideoScanner:
+    """
+    Scans one video file for codes.
+
+    ``sparse_interval`` sets how much video passes between decodes while
+    nothing is in view; codes visible for less than that may be missed.
+    ``backfill`` revisits the frames skipped before a new detection to
+    find where the code first appeared. Iterate ``hits()`` (or call
+    ``scan()``) once; ``stats()`` reports the work done.
+    """
+
+    def __init__(self, path: str, decoder: Optional[QRDecoder] = None,
+                 sparse_interval: float = SPARSE_INTERVAL,
+                 dense_window: float = DENSE_WINDOW,
+                 backfill: bool = True,
+                 dedup: Optional[TemporalDeduplicator] = None):
+        self.path = path
+        self.decoder = decoder or QRDecoder()
+        self.sparse_interval = sparse_interval
+        self.dense_window = dense_window
+        self.backfill = backfill
+        # A code that stays in view is reported once, however long it stays
+        self.dedup = dedup or TemporalDeduplicator(LEAVE_TIMEOUT, window=math.inf)
+
+        self.capture = None
+        self.fps = DEFAULT_FPS
+        self.frame_count = 0
+        self.frames = 0  # Frames read from the file, decoded or not
+        self.decoded = 0
+        self.unchanged = 0  # Decodes skipped because the scene did not change
+        self.backfilled = 0
+        self.elapsed = 0.0
+        self._last_thumbnail = None
+        self._last_symbols: List[DecodedSymbol] = []
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.path)
+        if not capture.isOpened():
+            capture.release()
+            raise RuntimeError(f"Could not open video {self.path}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self.fps = fps if 1.0 <= fps <= 1000.0 else DEFAULT_FPS
+        self.frame_count = max(0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self.capture = capture
+
+    def _frame_time(self, index: int) -> float:
+        """Timestamp of the frame just read (variable frame rate aware)"""
+        msec = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+        return msec / 1000.0 if msec > 0 or index == 0 else index / self.fps
+
+    def _read(self, index: int) -> Optional[Frame]:
+        ok, image = self.capture.read()
+        if not ok:
+            return None
+        return Frame(image, index, self._frame_time(index), self.path)
+
+    def _skip(self, count: int) -> bool:
+        """Advance past ``count`` frames without retrieving their pixels"""
+        for _ in range(count):
+            if not self.capture.grab():
+                return False
+            self.frames += 1
+        return True
+
+    def _decode(self, frame: Frame) -> List[DecodedSymbol]:
+        # Static scenes (paused screen recordings, idle belts) are decoded once.
+        # Compared per cell against the last decoded frame, so a code fading
+        # or sliding in slowly still registers once it differs enough
+        thumbnail = change_thumbnail(frame.image)
+        if (self._last_thumbnail is not None
+                and int(cv2.absdiff(thumbnail, self._last_thumbnail).max()) <= CHANGE_THRESHOLD):
+            self.unchanged += 1
+            return self._last_symbols
+
+        try:
+            symbols = self.decoder.decode(frame.image, use_cache=False, escalate=False)
+        except Exception as e:
+            print(f"Video decode error: {e}", file=sys.stderr)
+            symbols = []
+        self.decoded += 1
+        self._last_thumbnail = thumbnail
+        self._last_symbols = symbols
+        return symbols
+
+    def _first_sightings(self, start: int, stop: int, payloads: set) -> dict:
+        """
+        Decode frames ``start``..``stop - 1`` and return payload -> (frame, time)
+        for the first frame each of ``payloads`` shows up in.
+        """
+        found = {}
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        self._last_thumbnail = None
+        for index in range(start, stop):
+            frame = self._read(index)
+            if frame is None:
+                break
+            self.backfilled += 1
+            for symbol in self._decode(frame):
+                if symbol.data in payloads and symbol.data not in found:
+                    found[symbol.data] = (index, frame.timestamp)
+            if len(found) == len(payloads):
+                break
+        return found
+
+    def hits(self, on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[VideoHit]:
+        """
+        Yield each code's appearances in frame order.
+
+        ``on_progress(frame, frame_count)`` is called every PROGRESS_INTERVAL
+        seconds; ``frame_count`` is 0 when the container does not say.
+        """
+        self._open()
+        start_time = time.perf_counter()
+        last_progress = start_time
+        sparse_stride = max(1, round(self.sparse_interval * self.fps))
+        dense_frames = self.dense_window * self.fps
+        last_detection = -math.inf
+        last_decoded = -1
+        index = 0
+
+        try:
+            while True:
+                frame = self._read(index)
+                if frame is None:
+                    break
+                self.frames += 1
+                symbols = self._decode(frame)
+                new = [symbol for symbol in symbols if self.dedup.is_new(symbol.data, frame.timestamp)]
+
+                first_seen = {}
+                if new and self.backfill and index - last_decoded > 1:
+                    # Skipped frames may already show the code; find where it appeared
+                    first_seen = self._first_sightings(last_decoded + 1, index,
+                                                       {symbol.data for symbol in new})
+                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, index + 1)
+                    self._last_thumbnail = None
+                for symbol in new:
+                    hit_frame, hit_time = first_seen.get(symbol.data, (index, frame.timestamp))
+                    yield VideoHit(symbol, hit_frame, hit_time)
+
+                if new:
+                    last_detection = index
+                last_decoded = index
+                stride = 1 if index - last_detection <= dense_frames else sparse_stride
+                if stride > 1 and not self._skip(stride - 1):
+                    break
+                index += stride
+
+                now = time.perf_counter()
+                if on_progress and now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    on_progress(index, self.frame_count)
+        finally:
+            self.elapsed = time.perf_counter() - start_time
+            self.capture.release()
+
+    def scan(self, on_progress: Optional[Callable[[int, int], None]] = None) -> List[VideoHit]:
+        """Scan the whole video and return every hit"""
+        return list(self.hits(on_progress))
+
+    @property
+    def duration(self) -> float:
+        """Seconds of video covered so far"""
+        return self.frames / self.fps
+
+    def stats(self) -> dict:
+        """Work counters and speed relative to real time"""
+        return {
+            'frames': self.frames,
+            'decoded': self.decoded,
+            'unchanged': self.unchanged,
+            'backfilled': self.backfilled,
+            'fps': self.fps,
+            'duration_s': self.duration,
+            'elapsed_s': self.elapsed,
+            'speed': self.duration / self.elapsed if self.elapsed else 0.0,
+        }
+
@@ -0,0 +1,237 @@
+"""
+QRiftly watch mode
+
+Polls the clipboard or an area of the screen and decodes only when the
+content actually changed. Change detection compares a tiny grayscale
+thumbnail of each capture with the previous one, which costs far less than
+a decode, so an idle watch does almost no work. A code is reported when it
+appears; it is reported again only after it has gone and come back.
+"""
+
+import sys
+import threading
+import time
+import zlib
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+from .engine import QRDecoder
+from .screen import CaptureBackend, Region, grab_screen
+from .symbols import DecodedSymbol
+
+# Seconds between polls
+DEFAULT_INTERVAL = 0.5
+
+# Size of the thumbnail compared between polls. Fine enough that a code
+# appearing in one corner of a 4K screen changes at least one cell
+CHANGE_THUMBNAIL = (96, 54)
+
+# Largest per-cell difference (0-255) still treated as "unchanged"; absorbs
+# blinking cursors, clock ticks and compression noise
+CHANGE_THRESHOLD = 12
+
+# Where the clipboard has no change counter (X11, Wayland) every grab starts
+# an xclip or wl-paste process. While the content stays the same, polls are
+# skipped in doubling runs of at most this many
+CLIPBOARD_MAX_SKIP = 8
+
+
+def change_thumbnail(image: np.ndarray) -> np.ndarray:
+    """Small grayscale thumbnail of a capture, for change detection"""
+    height, width = image.shape[:2]
+    # Subsample with a strided view first so INTER_AREA touches few pixels
+    step = max(1, min(width // (CHANGE_THUMBNAIL[0] * 4), height // (CHANGE_THUMBNAIL[1] * 4)))
+    small = cv2.resize(image[::step, ::step], CHANGE_THUMBNAIL, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        small = cv2.cvtColor(small, code)
+    return small
+
+
+class ChangeDetector:
+    """Tells whether a capture differs noticeably from the previous one"""
+
+    def __init__(self, threshold: int = CHANGE_THRESHOLD):
+        self.threshold = threshold
+        self._last = None
+
+    def changed(self, image: np.ndarray) -> bool:
+        thumbnail = change_thumbnail(image)
+        last, self._last = self._last, thumbnail
+        if last is None or last.shape != thumbnail.shape:
+            return True
+        return int(cv2.absdiff(thumbnail, last).max()) > self.threshold
+
+    def reset(self):
+        self._last = None
+
+
+_pasteboard = None  # (objc_msgSend, general pasteboard, changeCount selector), False if unavailable
+
+
+def _pasteboard_change_count() -> Optional[int]:
+    """macOS NSPasteboard changeCount, read through the Objective-C runtime"""
+    global _pasteboard
+    if _pasteboard is None:
+        _pasteboard = False
+        import ctypes
+        import ctypes.util
+        objc = ctypes.cdll.LoadLibrary(ctypes.util.find_library('objc'))
+        ctypes.cdll.LoadLibrary(ctypes.util.find_library('AppKit'))  # Defines NSPasteboard
+        objc.objc_getClass.restype = ctypes.c_void_p
+        objc.objc_getClass.argtypes = [ctypes.c_char_p]
+        objc.sel_registerName.restype = ctypes.c_void_p
+        objc.sel_registerName.argtypes = [ctypes.c_char_p]
+        send = objc.objc_msgSend
+        send.restype = ctypes.c_void_p
+        send.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        board = send(objc.objc_getClass(b'NSPasteboard'), objc.sel_registerName(b'generalPasteboard'))
+        if board:
+            _pasteboard = (send, board, objc.sel_registerName(b'changeCount'))
+    if not _pasteboard:
+        return None
+    send, board, selector = _pasteboard
+    return send(board, selector) or 0
+
+
+def clipboard_sequence() -> Optional[int]:
+    """Clipboard change counter (Windows, macOS), or None where there is none"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            return ctypes.windll.user32.GetClipboardSequenceNumber()
+        if sys.platform == 'darwin':
+            return _pasteboard_change_count()
+    except Exception:
+        return None
+    return None
+
+
+class ClipboardSource:
+    """Images copied to the clipboard (screenshots, 'Copy image', image files)"""
+
+    name = "📋 Clipboard"
+
+    def __init__(self):
+        self._sequence = None
+        self._fingerprint = None  # Of the last grab, where there is no change counter
+        self._unchanged = 0  # Grabs in a row that found the same content
+        self._skip = 0  # Polls left to skip before the next grab
+
+    def grab(self) -> Optional[np.ndarray]:
+        """Grayscale clipboard image, or None if there is no new image"""
+        # On Windows and macOS the change counter lets idle polls skip the grab entirely
+        sequence = clipboard_sequence()
+        if sequence is not None:
+            if sequence == self._sequence:
+                return None
+            self._sequence = sequence
+            return self._read()
+
+        # Elsewhere each grab costs a helper process: back off while nothing changes
+        if self._skip:
+            self._skip -= 1
+            return None
+        image = self._read()
+        fingerprint = None if image is None else (image.shape, zlib.crc32(image))
+        if fingerprint == self._fingerprint:
+            self._unchanged = min(self._unchanged + 1, CLIPBOARD_MAX_SKIP)
+            self._skip = min((1 << self._unchanged) - 1, CLIPBOARD_MAX_SKIP)
+        else:
+            self._unchanged = 0
+        self._fingerprint = fingerprint
+        return image
+
+    def _read(self) -> Optional[np.ndarray]:
+        """Grayscale image on the clipboard now, if any"""
+        from PIL import Image, ImageGrab
+        content = ImageGrab.grabclipboard()
+        if isinstance(content, list):  # Copied files: use the first image among them
+            for path in content:
+                try:
+                    content = Image.open(path)
+                    break
+                except Exception:
+                    continue
+            else:
+                return None
+        if content is None or not hasattr(content, 'convert'):
+            return None
+        return np.asarray(content.convert('L'))
+
+
+class ScreenSource:
+    """The whole desktop or one region of it"""
+
+    def __init__(self, region: Optional[Region] = None, backend: Optional[CaptureBackend] = None):
+        self.region = region
+        self.backend = backend
+        self.name = "👁️ Screen Watch" if region is None else "👁️ Region Watch"
+
+    def grab(self) -> Optional[np.ndarray]:
+        return grab_screen(self.region, self.backend)
+
+
+class WatchThread(threading.Thread):
+    """
+    Polls a source and decodes captures that changed.
+
+    ``on_results`` receives only the symbols that were not present in the
+    previous decode of this source, on the watch thread.
+    """
+
+    def __init__(self, source, decoder: Optional[QRDecoder] = None,
+                 on_results: Optional[Callable[[List[DecodedSymbol], str], None]] = None,
+                 interval: float = DEFAULT_INTERVAL,
+                 detector: Optional[ChangeDetector] = None):
+        super().__init__(daemon=True, name=f"qriftly-watch-{type(source).__name__}")
+        self.source = source
+        self.decoder = decoder or QRDecoder()
+        self.on_results = on_results or (lambda symbols, name: None)
+        self.interval = interval
+        self.detector = detector or ChangeDetector()
+        self.stop_event = threading.Event()
+        self.polls = 0
+        self.decodes = 0
+        self._visible = set()  # Payloads in the last decoded capture
+
+    def run(self):
+        next_due = time.monotonic()
+        while not self.stop_event.is_set():
+            self.poll()
+            next_due += self.interval
+            delay = next_due - time.monotonic()
+            if delay <= 0:
+                next_due = time.monotonic()  # A slow capture; don't try to catch up
+                delay = 0.0
+            self.stop_event.wait(delay)
+
+    def poll(self):
+        """Capture once and decode if the content changed"""
+        self.polls += 1
+        try:
+            image = self.source.grab()
+        except Exception as e:
+            print(f"Watch capture error: {e}", file=sys.stderr)
+            return
+        if image is None or not self.detector.changed(image):
+            return
+
+        try:
+            # Changed frames rarely repeat and mostly hold no code: no cache, no ladder
+            symbols = self.decoder.decode(image, use_cache=False, escalate=False)
+        except Exception as e:
+            print(f"Watch decode error: {e}", file=sys.stderr)
+            return
+        self.decodes += 1
+
+        visible = {symbol.data for symbol in symbols}
+        new_symbols = [symbol for symbol in symbols if symbol.data not in self._visible]
+        self._visible = visible
+        if new_symbols and not self.stop_event.is_set():
+            self.on_results(new_symbols, self.source.name)
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,141 @@
+"""
+Decode cache keys, eviction, persistence and what gets cached
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+import qrcode
+from PIL import Image
+
+from qriftly.cache import CACHE_FORMAT_VERSION, DecodeCache, content_key, file_key
+from qriftly.engine import QRDecoder
+from qriftly.structured import StructuredAppend
+from qriftly.symbols import DecodedSymbol
+
+
+def _symbol(data="https://example.com", **fields):
+    return DecodedSymbol(data, "QRCODE", (1, 2, 30, 40), [(1, 2), (31, 2), (31, 42), (1, 42)], "opencv",
+                         **fields)
+
+
+def _fields(symbol):
+    return [getattr(symbol, name) for name in DecodedSymbol.__slots__ if name != 'sequence'] + [
+        (symbol.sequence.index, symbol.sequence.total, symbol.sequence.parity) if symbol.sequence else None]
+
+
+def test_content_key():
+    gray = np.arange(64 * 48, dtype=np.uint32).astype(np.uint8).reshape(48, 64)
+    key = content_key(gray, "cfg")
+    assert key == content_key(gray.copy(), "cfg")
+    assert key != content_key(gray, "other")
+    changed = gray.copy()
+    changed[10, 10] ^= 1
+    assert key != content_key(changed, "cfg")
+    assert content_key(gray.reshape(64, 48)) != content_key(gray)  # Same bytes, other shape
+    view = gray[::2, ::2]  # Strided views are keyed by their pixels
+    assert content_key(view) == content_key(np.ascontiguousarray(view))
+
+
+def test_file_key_follows_mtime_and_size(tmp_path):
+    path = tmp_path / "code.png"
+    path.write_bytes(b"first")
+    key = file_key(str(path), "cfg")
+    assert key == file_key(str(path), "cfg") and key != file_key(str(path), "other")
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    touched = file_key(str(path), "cfg")
+    assert touched != key
+
+    path.write_bytes(b"second!")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert file_key(str(path), "cfg") != touched  # Same mtime, other size
+    assert file_key(str(tmp_path / "missing.png")) is None
+
+
+def test_lru_eviction_and_copies():
+    cache = DecodeCache(max_entries=3)
+    for name in "abc":
+        cache.put(name, [_symbol(name)])
+    assert cache.get("a")[0].data == "a"  # Now the most recent
+    cache.put("d", [_symbol("d")])
+    assert cache.get("b") is None
+    assert [cache.get(name)[0].data for name in "acd"] == ["a", "c", "d"]
+    assert len(cache) == 3
+
+    cache.get("a")[0].polygon.append((0, 0))
+    assert len(cache.get("a")[0].polygon) == 4
+    assert cache.get(None) is None
+    cache.put(None, [])
+    assert cache.stats()['entries'] == 3 and cache.stats()['misses'] == 2
+
+
+def test_saved_entries_load_back(tmp_path):
+    path = str(tmp_path / "cache" / "decode_cache.json")
+    full = _symbol("part", page=2, quality=1, orientation="LEFT", raw=b"\xffpart",
+                   sequence=StructuredAppend(1, 3, 0x5a), preprocess="clahe")
+    cache = DecodeCache(path=path)
+    cache.put("full", [full])
+    cache.put("empty", [])
+    cache.save()
+    assert not os.path.exists(path + ".tmp")
+
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['version'] == CACHE_FORMAT_VERSION
+
+    loaded = DecodeCache(path=path)
+    assert _fields(loaded.get("full")[0]) == _fields(full)
+    assert loaded.get("empty") == []
+
+    small = DecodeCache(max_entries=1, path=path)  # Keeps the newest entries
+    assert small.get("full") is None and small.get("empty") == []
+
+
+def test_save_is_skipped_when_unchanged(tmp_path):
+    path = str(tmp_path / "decode_cache.json")
+    cache = DecodeCache(path=path)
+    cache.put("a", [])
+    cache.save()
+    os.remove(path)
+    cache.save()
+    assert not os.path.exists(path)
+    cache.save(str(tmp_path / "copy.json"))  # Another path is always written
+    assert os.path.exists(tmp_path / "copy.json")
+
+
+def test_other_versions_and_broken_files_are_ignored(tmp_path, capsys):
+    old = tmp_path / "old.json"
+    old.write_text(json.dumps({'version': CACHE_FORMAT_VERSION - 1, 'entries': [["a", None, []]]}))
+    assert len(DecodeCache(path=str(old))) == 0
+
+    broken = tmp_path / "broken.json"
+    broken.write_text("{not json")
+    assert len(DecodeCache(path=str(broken))) == 0
+    captured = capsys.readouterr()
+    assert "Decode cache load error" in captured.err and captured.out == ""
+
+
+def test_decode_uses_the_cache():
+    gray = np.array(qrcode.make("cached").convert('L'))
+    decoder = QRDecoder(cache=DecodeCache())
+    assert [symbol.data for symbol in decoder.decode(gray)] == ["cached"]
+    timings = {}
+    assert [symbol.data for symbol in decoder.decode(gray, timings=timings)] == ["cached"]
+    assert timings['cache_hit'] == 1
+
+
+@pytest.mark.parametrize('budget_ms, cached', [(0.0, False), (60000.0, True)])
+def test_ladder_cut_short_is_not_cached(tmp_path, budget_ms, cached):
+    blank = np.full((200, 200), 255, np.uint8)
+    path = str(tmp_path / "blank.png")
+    Image.fromarray(blank).save(path)
+
+    decoder = QRDecoder(cache=DecodeCache(), preprocess_budget_ms=budget_ms)
+    timings = {}
+    assert decoder.decode(blank, timings=timings) == []
+    assert ('out_of_budget' in timings) != cached
+    assert decoder.decode_file(path) == []
+    assert len(decoder.cache) == (2 if cached else 0)
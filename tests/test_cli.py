@@ -0,0 +1,54 @@
+"""
+Command line behaviour that needs a real process
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+import qrcode
+
+from qriftly.backends import BACKENDS, backend_names
+from qriftly.cli import BACKEND_CHOICES, EXIT_BROKEN_PIPE, OUTPUT_FORMATS
+from qriftly.constants import BACKEND_NAMES, SINK_FORMATS
+from qriftly.sinks import SINKS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def image_dir(tmp_path_factory):
+    # Enough files that the scan is still running when the reader goes away
+    folder = tmp_path_factory.mktemp("codes")
+    for index in range(4):
+        qrcode.make(f"https://example.com/{index}").save(str(folder / f"{index:03d}.png"))
+    for index in range(4, 200):
+        shutil.copyfile(str(folder / f"{index % 4:03d}.png"), str(folder / f"{index:03d}.png"))
+    return str(folder)
+
+
+def test_choices_match_the_registries():
+    assert tuple(BACKENDS) == BACKEND_NAMES
+    assert list(BACKEND_CHOICES) == backend_names()
+    assert tuple(SINKS) == SINK_FORMATS
+    assert OUTPUT_FORMATS == ('text',) + tuple(SINKS)
+
+
+def test_parser_does_not_load_the_decoders():
+    code = ("import sys; from qriftly.cli import build_parser; build_parser(); "
+            "print(sorted({'cv2', 'numpy', 'pyzbar'} & set(sys.modules)))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+@pytest.mark.parametrize('options', [['-f', 'jsonl'], ['-f', 'csv'], []], ids=['jsonl', 'csv', 'text'])
+def test_scan_stops_quietly_when_stdout_closes(image_dir, options):
+    process = subprocess.Popen([sys.executable, '-m', 'qriftly.cli', 'scan', image_dir] + options,
+                               cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert process.stdout.readline()  # Like "| head -n 1"
+    process.stdout.close()
+    stderr = process.stderr.read().decode('utf-8', 'replace')
+    assert process.wait(timeout=60) == EXIT_BROKEN_PIPE
+    assert "Traceback" not in stderr and "BrokenPipeError" not in stderr
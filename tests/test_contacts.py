@@ -0,0 +1,271 @@
+"""
+vCard/iCalendar parsing, serialization and the contact and event sinks
+"""
+
+import csv
+
+import pytest
+
+from qriftly.contacts import (FOLD_OCTETS, ComponentParser, Contact, Event, iter_components,
+                              parse_content_line, parse_vcard, parse_vevent)
+from qriftly.sinks import CsvSink, ICalendarSink, VCardSink
+from qriftly.symbols import DecodedSymbol
+
+VCARD_21 = "\r\n".join([
+    "BEGIN:VCARD",
+    "VERSION:2.1",
+    "N;CHARSET=UTF-8;ENCODING=QUOTED-PRINTABLE:M=C3=BCller;J=C3=BCrgen;;Dr.;",
+    "FN;CHARSET=UTF-8;ENCODING=QUOTED-PRINTABLE:Dr. J=C3=BCrgen M=C3=BC=",
+    "ller",
+    "ORG:Beispiel GmbH;Vertrieb",
+    "TEL;CELL;VOICE:+49 170 1234567",
+    "TEL;WORK;FAX:+49 30 7654321",
+    "EMAIL;INTERNET:juergen@example.de",
+    "ADR;WORK;CHARSET=UTF-8;ENCODING=QUOTED-PRINTABLE:;;Hauptstra=C3=9Fe 1;Berlin;;10115;Deutschland",
+    "NOTE;ENCODING=QUOTED-PRINTABLE:Zeile eins=0D=0AZeile zwei",
+    "END:VCARD",
+    "",
+])
+
+VEVENT_WITH_ALARM = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Example//EN",
+    "BEGIN:VEVENT",
+    "UID:standup-1@example.com",
+    "DTSTAMP:20250901T080000Z",
+    "SUMMARY:Daily standup",
+    "DTSTART:20250922T100000Z",
+    "DTEND:20250922T101500Z",
+    "BEGIN:VALARM",
+    "ACTION:DISPLAY",
+    "DESCRIPTION:Standup in 15 minutes",
+    "TRIGGER:-PT15M",
+    "END:VALARM",
+    "LOCATION:Room 4\\, 2nd floor",
+    "END:VEVENT",
+    "END:VCALENDAR",
+    "",
+])
+
+
+def feed_in_two(text: str, split: int):
+    parser = ComponentParser()
+    return parser.feed(text[:split]) + parser.feed(text[split:]) + parser.close()
+
+
+def physical_lines(text: str):
+    assert text.endswith("\r\n")
+    return text[:-2].split("\r\n")
+
+
+def check_contact_21(contact: Contact):
+    assert contact.version == "2.1"
+    assert (contact.family_name, contact.given_name, contact.prefix) == ("Müller", "Jürgen", "Dr.")
+    assert contact.formatted_name == "Dr. Jürgen Müller"
+    assert (contact.organization, contact.department) == ("Beispiel GmbH", "Vertrieb")
+    assert contact.phones == [("+49 170 1234567", ("CELL", "VOICE")), ("+49 30 7654321", ("WORK", "FAX"))]
+    assert contact.emails == [("juergen@example.de", ("INTERNET",))]
+    assert contact.addresses == [(("", "", "Hauptstraße 1", "Berlin", "", "10115", "Deutschland"), ("WORK",))]
+    assert contact.note == "Zeile eins\r\nZeile zwei"
+
+
+@pytest.mark.parametrize('split', range(len(VCARD_21) + 1))
+def test_quoted_printable_card_split_anywhere(split):
+    components = feed_in_two(VCARD_21, split)
+    assert len(components) == 1
+    check_contact_21(components[0])
+
+
+def test_quoted_printable_card_one_character_at_a_time():
+    parser = ComponentParser()
+    components = []
+    for char in VCARD_21 + VCARD_21:
+        components += parser.feed(char)
+    assert len(components) == 1  # The last END line is only final once another line follows
+    components += parser.close()
+    assert len(components) == 2
+    for contact in components:
+        check_contact_21(contact)
+
+
+def test_vcard_21_folding_keeps_whitespace():
+    contact = parse_vcard("BEGIN:VCARD\r\nVERSION:2.1\r\nNOTE:first\r\n second\r\nEND:VCARD\r\n")
+    assert contact.note == "first second"
+    contact = parse_vcard("BEGIN:VCARD\r\nVERSION:3.0\r\nNOTE:first\r\n second\r\nEND:VCARD\r\n")
+    assert contact.note == "firstsecond"
+
+
+def test_quoted_parameter_values_keep_commas():
+    line = parse_content_line('ADR;TYPE="work,postal";LABEL="1 Main St, Springfield";GEO="geo:39.8,-89.6"'
+                              ':;;1 Main St;Springfield;IL;62701;USA')
+    assert line.types == ("WORK", "POSTAL")
+    assert line.params['LABEL'] == ["1 Main St, Springfield"]
+    assert line.params['GEO'] == ["geo:39.8,-89.6"]
+    assert line.value == ";;1 Main St;Springfield;IL;62701;USA"
+
+
+def test_quoted_parameter_value_may_hold_colon_and_semicolon():
+    line = parse_content_line('X-NOTE;LABEL="a;b:c":value')
+    assert line.params['LABEL'] == ["a;b:c"]
+    assert line.value == "value"
+
+
+def test_valarm_is_kept_but_not_applied_to_the_event():
+    parser = ComponentParser()
+    components = parser.feed(VEVENT_WITH_ALARM) + parser.close()
+    assert len(components) == 1
+    event = components[0]
+    assert isinstance(event, Event)
+    assert event.summary == "Daily standup"
+    assert event.description == ""  # The alarm's DESCRIPTION is not the event's
+    assert event.location == "Room 4, 2nd floor"  # Properties after END:VALARM still apply
+    assert (event.start, event.end) == ("20250922T100000Z", "20250922T101500Z")
+    assert event.lines[event.lines.index("BEGIN:VALARM"):event.lines.index("END:VALARM") + 1] == [
+        "BEGIN:VALARM", "ACTION:DISPLAY", "DESCRIPTION:Standup in 15 minutes", "TRIGGER:-PT15M",
+        "END:VALARM"]
+
+    serialized = event.to_vevent()
+    assert serialized.count("BEGIN:VALARM") == 1
+    assert serialized.count("UID:") == 1  # Not added again
+    assert parse_vevent(serialized).description == ""
+
+
+def test_contact_escape_and_fold_round_trip():
+    contact = Contact()
+    contact.family_name = "O'Brien; Jr."
+    contact.given_name = "Zoë"
+    contact.organization = "Smith, Jones & Ørsted"
+    contact.department = "Research; Development"
+    contact.title = "Überlänge " * 12  # Long enough to fold inside multi-byte characters
+    contact.phones = [("+1 555 0100", ("WORK", "VOICE"))]
+    contact.emails = [("zoe@example.com", ())]
+    contact.addresses = [(("PO Box 7", "Suite 5", "1 Main St, Rear", "Springfield", "IL", "62701", "USA"),
+                          ("HOME",))]
+    contact.note = "Back\\slash, semi;colon\nsecond line"
+
+    text = contact.to_vcard()
+    for line in physical_lines(text):
+        assert len(line.encode('utf-8')) <= FOLD_OCTETS
+        line.encode('utf-8').decode('utf-8')  # Never folded inside a character
+
+    parsed = parse_vcard(text)
+    assert parsed.version == "3.0"
+    for slot in ('family_name', 'given_name', 'organization', 'department', 'title', 'phones',
+                 'emails', 'addresses', 'note'):
+        assert getattr(parsed, slot) == getattr(contact, slot), slot
+    assert parsed.name == "Zoë O'Brien; Jr."
+
+
+def test_event_escape_and_fold_round_trip():
+    description = "Agenda: budget, hiring; misc\\other\n" + "lange Beschreibung " * 8
+    text = "\r\n".join([
+        "BEGIN:VEVENT",
+        "SUMMARY:Planning\\, Q4",
+        "DTSTART;TZID=Europe/Berlin:20251001T090000",
+        "DURATION:PT1H",
+        "DESCRIPTION:" + description.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;")
+        .replace("\n", "\\n"),
+        "END:VEVENT",
+    ])
+    event = parse_vevent(text)
+    assert event.summary == "Planning, Q4"
+    assert event.description == description
+
+    serialized = event.to_vevent()
+    for line in physical_lines(serialized):
+        assert len(line.encode('utf-8')) <= FOLD_OCTETS
+    assert serialized.count("UID:") == 1 and serialized.count("DTSTAMP:") == 1
+    again = parse_vevent(serialized)
+    assert (again.summary, again.description, again.start, again.duration) == (
+        event.summary, event.description, "20251001T090000", "PT1H")
+
+
+def test_iter_components_reads_in_small_chunks(tmp_path):
+    path = tmp_path / "mixed.txt"
+    path.write_text(VCARD_21 + VEVENT_WITH_ALARM + VCARD_21, encoding='utf-8', newline='')
+    with open(path, encoding='utf-8', newline='') as stream:
+        components = list(iter_components(stream, chunk_size=7))
+    assert [type(item) for item in components] == [Contact, Event, Contact]
+    check_contact_21(components[2])
+
+
+CONTACT = DecodedSymbol("BEGIN:VCARD\nVERSION:3.0\nFN:Ada Lovelace\nORG:Analytical Engines\n"
+                        "TEL;TYPE=cell:+44 20 0000\nTEL;TYPE=work:+44 20 1111\nEMAIL:ada@example.com\n"
+                        "ADR:;;12 St James's Sq;London;;SW1Y 4JH;UK\nEND:VCARD")
+EVENT = DecodedSymbol(VEVENT_WITH_ALARM)
+URL = DecodedSymbol("https://example.com/")
+
+
+def test_csv_sink_columns(tmp_path):
+    path = str(tmp_path / "scans.csv")
+    with CsvSink(path) as sink:
+        sink.write(CONTACT, "card.png", timestamp=0.0)
+        sink.write_many([EVENT, URL], "flyer.png", timestamp=0.0)
+    with open(path, newline='', encoding='utf-8') as stream:
+        rows = list(csv.DictReader(stream))
+    with open(path, newline='', encoding='utf-8') as stream:
+        assert next(csv.reader(stream)) == list(CsvSink.columns)
+
+    contact, event, url = rows
+    assert contact['source'] == "card.png"
+    assert contact['timestamp'] == "1970-01-01T00:00:00.000+00:00"
+    assert contact['name'] == "Ada Lovelace"
+    assert contact['organization'] == "Analytical Engines"
+    assert contact['phones'] == "+44 20 0000; +44 20 1111"
+    assert contact['emails'] == "ada@example.com"
+    assert contact['addresses'] == "12 St James's Sq, London, SW1Y 4JH, UK"
+    assert contact['summary'] == ""
+
+    assert event['source'] == "flyer.png"
+    assert (event['summary'], event['start'], event['end'], event['location']) == (
+        "Daily standup", "20250922T100000Z", "20250922T101500Z", "Room 4, 2nd floor")
+    assert event['name'] == "" and event['phones'] == ""
+
+    assert url['payload'] == "https://example.com/"
+    assert all(url[column] == "" for column in ('name', 'phones', 'summary', 'start'))
+
+
+def test_csv_sink_appends_without_second_header(tmp_path):
+    path = str(tmp_path / "scans.csv")
+    with CsvSink(path) as sink:
+        sink.write(URL, "a.png")
+    with CsvSink(path, append=True) as sink:
+        sink.write(URL, "b.png")
+    with open(path, newline='', encoding='utf-8') as stream:
+        rows = list(csv.reader(stream))
+    assert rows[0] == list(CsvSink.columns)
+    assert [row[0] for row in rows[1:]] == ["a.png", "b.png"]
+
+
+def test_icalendar_sink_writes_one_calendar(tmp_path):
+    path = str(tmp_path / "events.ics")
+    with ICalendarSink(path) as sink:
+        sink.write_many([EVENT, URL, CONTACT], "poster.png")
+        sink.write(DecodedSymbol("BEGIN:VEVENT\nSUMMARY:Lunch\nDTSTART:20250923T120000Z\nEND:VEVENT"), "menu.png")
+        assert sink.count == 2
+    with open(path, newline='', encoding='utf-8') as stream:
+        text = stream.read()
+
+    lines = physical_lines(text)
+    assert lines[:3] == ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//QRiftly//QR Scanner//EN"]
+    assert lines[-1] == "END:VCALENDAR"
+    assert lines.count("BEGIN:VCALENDAR") == 1 and lines.count("END:VCALENDAR") == 1
+    assert lines.count("BEGIN:VEVENT") == 2
+    assert "\n" not in text.replace("\r\n", "")
+
+    with open(path, encoding='utf-8', newline='') as stream:
+        events = list(iter_components(stream))
+    assert [event.summary for event in events] == ["Daily standup", "Lunch"]
+    assert all(event.uid for event in events)
+
+
+def test_vcard_sink_converts_mecard(tmp_path):
+    path = str(tmp_path / "contacts.vcf")
+    with VCardSink(path) as sink:
+        sink.write_many([CONTACT, URL, DecodedSymbol("MECARD:N:Doe,Jane;TEL:+1555;ADR:,,1 Main,Town,,123,NL;;")],
+                        "cards.png")
+    with open(path, encoding='utf-8', newline='') as stream:
+        contacts = list(iter_components(stream))
+    assert [contact.name for contact in contacts] == ["Ada Lovelace", "Jane Doe"]
+    assert contacts[1].addresses == [(("", "", "1 Main", "Town", "", "123", "NL"), ())]
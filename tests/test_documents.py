@@ -0,0 +1,139 @@
+"""
+Document pages, banded reads and tiling
+"""
+
+import numpy as np
+import pytest
+import qrcode
+from PIL import Image
+
+from qriftly import documents, engine
+from qriftly.documents import ImagePage, iter_pages, iter_tiles, pdf_available
+from qriftly.engine import QRDecoder
+
+BANDED = [
+    ('tif', 'L', {}),
+    ('tif', 'RGB', {}),
+    ('tif', '1', {}),
+    ('bmp', 'L', {}),
+    ('bmp', 'RGB', {}),
+    ('bmp', '1', {}),
+    ('ppm', 'L', {}),
+    ('ppm', 'RGB', {}),
+]
+
+
+@pytest.fixture(scope='module')
+def pixels():
+    return np.random.default_rng(7).integers(0, 256, (300, 257), dtype=np.uint8)
+
+
+def _save(tmp_path, pixels, extension, mode, options):
+    path = str(tmp_path / f"page.{extension}")
+    Image.fromarray(pixels).convert(mode).save(path, **options)
+    with Image.open(path) as image:
+        expected = np.asarray(image.convert('L'))
+    return path, expected
+
+
+def _code(text):
+    return qrcode.make(text, box_size=6).convert('L')
+
+
+@pytest.mark.parametrize('extension, mode, options', BANDED,
+                         ids=[f"{extension}-{mode}" for extension, mode, _ in BANDED])
+def test_banded_read_matches_full_read(tmp_path, pixels, extension, mode, options):
+    path, expected = _save(tmp_path, pixels, extension, mode, options)
+    page = ImagePage(path, 0, 1, 257, 300)
+    for top, bottom in ((0, 1), (37, 211), (250, 300)):
+        assert np.array_equal(page._read_band(top, bottom), expected[top:bottom])
+
+
+def test_compressed_rows_are_not_banded(tmp_path, pixels):
+    path, _ = _save(tmp_path, pixels, 'tif', 'L', {'compression': 'tiff_lzw'})
+    assert ImagePage(path, 0, 1, 257, 300)._read_band(0, 10) is None
+
+
+def test_falls_back_to_crop_without_pillow_internals(tmp_path, pixels, monkeypatch):
+    path, expected = _save(tmp_path, pixels, 'bmp', 'L', {})
+    monkeypatch.setattr(documents, '_load_band', lambda image, tiles, width, height: None)
+    assert np.array_equal(ImagePage(path, 0, 1, 257, 300)._read_band(37, 211), expected[37:211])
+
+
+@pytest.mark.parametrize('extension, mode, options', [BANDED[0], BANDED[3], BANDED[6]],
+                         ids=['tif', 'bmp', 'ppm'])
+def test_tiles_of_a_banded_page(tmp_path, pixels, monkeypatch, extension, mode, options):
+    path, expected = _save(tmp_path, pixels, extension, mode, options)
+    monkeypatch.setattr(documents, 'TILED_MIN_PIXELS', 0)
+    (page,) = iter_pages(path)
+    boxes = []
+    for (left, top, right, bottom), tile in iter_tiles(page, size=128, overlap=32):
+        assert np.array_equal(tile, expected[top:bottom, left:right])
+        boxes.append((left, top, right, bottom))
+    assert page._banded and page._gray is None
+    assert boxes[-1][2:] == (257, 300)
+
+
+def test_oversized_files_open_band_by_band(tmp_path, pixels, monkeypatch):
+    banded, expected = _save(tmp_path, pixels, 'tif', 'L', {})
+    compressed = str(tmp_path / "compressed.tif")
+    Image.fromarray(pixels).save(compressed, compression='tiff_lzw')
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    monkeypatch.setattr(documents, 'TILED_MIN_PIXELS', 0)
+
+    (page,) = iter_pages(banded)
+    assert np.array_equal(page.read((0, 100, 257, 120)), expected[100:120])
+    with pytest.raises(RuntimeError, match="too large"):
+        list(iter_pages(compressed))
+
+
+@pytest.mark.parametrize('extension', ['gif', 'tif'])
+def test_multi_frame_pages(tmp_path, extension):
+    frames = [_code(f"frame {index}") for index in range(3)]
+    path = str(tmp_path / f"frames.{extension}")
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+    pages = list(iter_pages(path))
+    assert [(page.number, page.count) for page in pages] == [(1, 3), (2, 3), (3, 3)]
+    symbols = QRDecoder(preprocess=None).decode_file(path)
+    assert [(symbol.data, symbol.page) for symbol in symbols] == [
+        ("frame 0", 1), ("frame 1", 2), ("frame 2", 3)]
+
+
+@pytest.mark.skipif(not pdf_available(), reason="pypdfium2 is not installed")
+def test_pdf_pages(tmp_path):
+    path = str(tmp_path / "codes.pdf")
+    images = [_code(f"page {index}").convert('RGB') for index in range(2)]
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=72)
+
+    symbols = QRDecoder(preprocess=None).decode_file(path)
+    assert [(symbol.data, symbol.page) for symbol in symbols] == [("page 0", 1), ("page 1", 2)]
+
+    for page in iter_pages(path):  # Pages are only valid while the iteration is on them
+        whole = page.read()
+        assert whole.shape == (page.height, page.width) and whole.dtype == np.uint8
+        region = page.read((10, 20, 110, 70))
+        assert region.shape == (50, 100)
+        tiles = list(iter_tiles(page, size=200, overlap=40))
+        assert tiles[-1][0][2:] == (page.width, page.height)
+        for (left, top, right, bottom), tile in tiles:
+            assert tile.shape == (bottom - top, right - left)
+        # Rendered on its own, the region matches the same pixels of the whole page
+        assert np.abs(region.astype(int) - whole[20:70, 10:110]).mean() < 8
+
+
+def test_tiles_skip_the_region_search(monkeypatch):
+    canvas = np.full((2400, 2400), 255, np.uint8)
+    code = np.asarray(_code("tiled"))
+    canvas[100:100 + code.shape[0], 100:100 + code.shape[1]] = code
+    monkeypatch.setattr(engine, 'TILED_MIN_PIXELS', 0)
+
+    class ArrayPage(documents.Page):
+        def read(self, box=None):
+            left, top, right, bottom = box or (0, 0, self.width, self.height)
+            return canvas[top:bottom, left:right]
+
+    timings = {}
+    symbols = QRDecoder(roi='on', preprocess=None).decode_page(ArrayPage(1, 1, 2400, 2400), timings=timings)
+    assert [symbol.data for symbol in symbols] == ["tiled"]
+    assert timings['tiles'] == 4 and 'detect' not in timings
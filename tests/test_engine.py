@@ -0,0 +1,71 @@
+"""
+Decoder settings switched while decodes are running
+"""
+
+import threading
+
+import numpy as np
+import pytest
+import qrcode
+
+from qriftly.cache import DecodeCache, content_key
+from qriftly.engine import QRDecoder
+
+
+@pytest.fixture(scope='module')
+def qr_image():
+    return np.array(qrcode.make("https://example.com/engine").convert('L'))
+
+
+def test_set_symbology_falls_back_to_cascade():
+    decoder = QRDecoder(backend='opencv')
+    decoder.set_symbology('logistics')  # OpenCV's QR detector reads no barcodes
+    assert (decoder.backend, decoder.symbology) == ('cascade', 'logistics')
+    assert 'QRCODE' not in decoder.symbologies
+    decoder.set_symbology('qr')
+    assert decoder.backend == 'cascade'
+    with pytest.raises(ValueError):
+        decoder.set_symbology('unknown')
+    assert decoder.symbology == 'qr'
+
+
+def test_set_backend_checks_the_profile():
+    decoder = QRDecoder(symbology='logistics')
+    with pytest.raises(ValueError):
+        decoder.set_backend('opencv')
+    assert decoder.backend == 'cascade'
+    decoder.set_symbology('qr')
+    decoder.set_backend('opencv')
+    assert decoder.backend == 'opencv'
+    assert decoder.cache_config().startswith('opencv|')
+
+
+def test_cache_entries_match_their_profile_while_switching(qr_image):
+    decoder = QRDecoder(cache=DecodeCache(), preprocess=None)
+    keys = {}
+    for profile in ('qr', 'logistics'):
+        decoder.set_symbology(profile)
+        keys[profile] = content_key(qr_image, decoder.cache_config())
+
+    stop = threading.Event()
+
+    def switch():
+        while not stop.is_set():
+            decoder.set_symbology('qr')
+            decoder.set_symbology('logistics')
+
+    switcher = threading.Thread(target=switch)
+    switcher.start()
+    try:
+        for _ in range(50):
+            decoder.cache.clear()
+            decoder.decode(qr_image)
+            found = {profile: decoder.cache.get(key) for profile, key in keys.items()}
+            # Whichever profile the decode read, its result sits under that profile's key
+            if found['qr'] is not None:
+                assert [symbol.data for symbol in found['qr']] == ["https://example.com/engine"]
+            if found['logistics'] is not None:
+                assert found['logistics'] == []
+    finally:
+        stop.set()
+        switcher.join()
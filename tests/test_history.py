@@ -0,0 +1,71 @@
+"""
+Scan history storage and connection lifetime
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from qriftly.history import ScanHistory
+
+
+def test_add_flush_search(tmp_path):
+    with ScanHistory(str(tmp_path / "history.db"), flush_interval=0.01) as history:
+        history.add("https://example.com/a", "URL", "one.png", timestamp=1.0)
+        history.add("WIFI:S:Home;;", "WiFi Configuration", "two.png", timestamp=2.0)
+        history.add("https://example.com/b", "URL", "three.png", timestamp=3.0)
+        history.flush()
+        assert history.count() == 3
+        assert [entry.payload for entry in history.search("example")] == [
+            "https://example.com/b", "https://example.com/a"]
+        assert [entry.source for entry in history.search("WIFI:S:Home;;", exact=True)] == ["two.png"]
+        assert [entry.timestamp for entry in history.search(qr_type="URL", since=2.0)] == [3.0]
+        assert history.type_counts() == {"URL": 2, "WiFi Configuration": 1}
+
+
+def test_close_closes_every_thread_connection(tmp_path):
+    history = ScanHistory(str(tmp_path / "history.db"), flush_interval=0.01)
+    history.add("payload", "Text")
+    history.flush()
+
+    connections = []
+    ready = threading.Barrier(4)
+    done = threading.Event()
+
+    def reader():
+        assert history.count() == 1
+        connections.append(history._connect())
+        ready.wait()
+        done.wait()  # Still alive when the history is closed
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    connections.append(history._connect())
+
+    history.close()
+    done.set()
+    for thread in threads:
+        thread.join()
+    assert len(connections) == 4
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+def test_finished_threads_release_their_connection(tmp_path):
+    with ScanHistory(str(tmp_path / "history.db"), flush_interval=0.01) as history:
+        history.add("payload", "Text")
+        history.flush()  # The writer has its connection
+        connections = []
+        for _ in range(5):
+            thread = threading.Thread(target=lambda: connections.append(history._connect()))
+            thread.start()
+            thread.join()
+        # Each new connection drops those of the threads that finished before it
+        for connection in connections[:-1]:
+            with pytest.raises(sqlite3.ProgrammingError):
+                connection.execute("SELECT 1")
+        assert len(history._connections) == 3  # This thread's, the writer's and the last one
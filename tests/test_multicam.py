@@ -0,0 +1,105 @@
+"""
+Multi-camera pipeline shutdown and capture ownership
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+import qrcode
+
+from qriftly.camera import CaptureThread, LatestFrameSlot
+from qriftly.multicam import MultiCameraPipeline, _join_all, parse_sources
+
+
+class SlowCapture:
+    """Capture double whose read blocks, like a stalled network stream"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.reading = False
+        self.overlapped = False
+        self.released_by = None
+        self.image = np.zeros((48, 64, 3), np.uint8)
+
+    def get(self, prop):
+        return 30.0
+
+    def read(self):
+        self.reading = True
+        time.sleep(self.delay)
+        self.reading = False
+        return True, self.image
+
+    def release(self):
+        self.overlapped = self.overlapped or self.reading
+        self.released_by = threading.current_thread()
+
+
+def _video(tmp_path, text="multicam"):
+    path = str(tmp_path / "codes.avi")
+    image = cv2.cvtColor(np.array(qrcode.make(text).convert('L').resize((240, 240))), cv2.COLOR_GRAY2BGR)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (240, 240))
+    for _ in range(300):
+        writer.write(image)
+    writer.release()
+    return path
+
+
+def test_capture_thread_releases_its_own_capture():
+    capture = SlowCapture(0.3)
+    thread = CaptureThread(capture, LatestFrameSlot(), "slow")
+    thread.start()
+    time.sleep(0.05)  # Inside read()
+    started = time.perf_counter()
+    thread.stop()
+    assert time.perf_counter() - started < 0.05 and capture.released_by is None
+    thread.join(2.0)
+    assert capture.released_by is thread and not capture.overlapped
+    assert thread.state == "ended"
+
+
+def test_pipeline_stop_returns_without_waiting(tmp_path):
+    found = threading.Event()
+    ended = []
+
+    def on_results(symbols, frame):
+        if any(symbol.data == "multicam" for symbol in symbols):
+            found.set()
+
+    pipeline = MultiCameraPipeline([_video(tmp_path)], on_results=on_results, on_end=ended.append,
+                                   workers=2)
+    pipeline.start()
+    assert found.wait(10.0)
+    threads = [source.capture_thread for source in pipeline.sources.values()]
+
+    started = time.perf_counter()
+    pipeline.stop()
+    assert time.perf_counter() - started < 0.1
+    for thread in threads:
+        thread.join(2.0)
+        assert not thread.is_alive() and not thread.capture.isOpened()
+    assert not pipeline.running and ended == []  # A requested stop is not an end of stream
+
+
+def test_stop_timeout_is_shared_by_all_threads():
+    release = threading.Event()
+    threads = [threading.Thread(target=release.wait, daemon=True) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    _join_all(threads, 0.3)
+    assert 0.25 < time.perf_counter() - started < 0.6  # Not 0.3 s per thread
+    release.set()
+
+
+def test_sources_that_fail_to_open_report_an_error():
+    pipeline = MultiCameraPipeline(["missing-0.avi", "missing-1.avi"], workers=1)
+    pipeline.start()
+    pipeline.stop(timeout=2.0)
+    assert [stats['state'] for stats in pipeline.stats()] == ["error", "error"]
+
+
+def test_parse_sources():
+    assert parse_sources("0, 1\nrtsp://cam/stream,, clip.mp4") == [0, 1, "rtsp://cam/stream", "clip.mp4"]
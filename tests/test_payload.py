@@ -0,0 +1,139 @@
+"""
+Payload classification and parsing
+"""
+
+import time
+
+import pytest
+
+from qriftly.payload import (ContactPayload, EmailPayload, EpcPayment, EventPayload, GeoPayload,
+                             MeCardPayload, Payload, PhonePayload, SmsPayload, UrlPayload, WifiPayload,
+                             detect_qr_type, is_url, parse_payload, payload_type)
+
+EPC = "\n".join(["BCD", "002", "1", "SCT", "BFSWDE33BER", "Wikimedia Foerdergesellschaft",
+                 "DE33 1002 0500 0001 1947 00", "EUR12.5", "CHAR", "", "Spende fuer Wikipedia", ""])
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("https://example.com/path?q=1", UrlPayload),
+    ("HTTP://EXAMPLE.COM", UrlPayload),
+    ("ftp://files.example.com/a.zip", UrlPayload),
+    ("www.example.com", UrlPayload),
+    ("WIFI:S:Home;T:WPA;P:secret;;", WifiPayload),
+    ("mailto:ada@example.com", EmailPayload),
+    ("MATMSG:TO:ada@example.com;SUB:Hi;BODY:Hello;;", EmailPayload),
+    ("ada@example.com", EmailPayload),
+    ("tel:+15550100", PhonePayload),
+    ("+1 (555) 010-0100", PhonePayload),
+    ("sms:+15550100?body=hi", SmsPayload),
+    ("SMSTO:+15550100:hi", SmsPayload),
+    ("geo:52.52,13.405", GeoPayload),
+    ("MECARD:N:Doe,Jane;TEL:+1555;;", MeCardPayload),
+    ("BEGIN:VCARD\nVERSION:3.0\nFN:Ada\nEMAIL:ada@example.com\nEND:VCARD", ContactPayload),
+    ("BEGIN:VEVENT\nSUMMARY:Lunch\nEND:VEVENT", EventPayload),
+    ("BEGIN:VCALENDAR\nVERSION:2.0\nBEGIN:VEVENT\nSUMMARY:Lunch\nEND:VEVENT\nEND:VCALENDAR", EventPayload),
+    (EPC, EpcPayment),
+    ("hello world", Payload),
+    ("", Payload),
+    ("BEGIN:VCALENDAR\nVERSION:2.0\nEND:VCALENDAR", Payload),
+    ("12345", Payload),  # Too short for a phone number
+    ("Write to ada@example.com", Payload),  # An address inside text is not an e-mail payload
+    ("ada@example", Payload),
+    ("ada@@example.com", Payload),
+    ("ada@.example.com", Payload),
+    ("ada@example..com", Payload),
+    ("x-y:ada@example.com", EmailPayload),  # Unknown scheme falls through to the patterns
+])
+def test_classification(text, expected):
+    payload = parse_payload(text)
+    assert type(payload) is expected
+    assert payload_type(text) is expected
+    assert detect_qr_type(text) == expected.label
+
+
+def test_wifi_fields_unescaped():
+    payload = parse_payload(r'WIFI:T:wpa;S:My\;Net;P:pa\:ss\\word;H:true;;')
+    assert payload.fields() == {'ssid': "My;Net", 'password': "pa:ss\\word", 'security': "WPA",
+                                'hidden': True}
+    assert parse_payload("WIFI:S:Open;;").security == "NONE"
+
+
+def test_email_fields():
+    assert parse_payload("mailto:ada%40example.com?subject=Hi%20there&body=Hello").fields() == {
+        'address': "ada@example.com", 'subject': "Hi there", 'body': "Hello"}
+    assert parse_payload("MATMSG:TO:ada@example.com;SUB:Hi;BODY:a\\;b;;").fields() == {
+        'address': "ada@example.com", 'subject': "Hi", 'body': "a;b"}
+    assert parse_payload(" first.last+tag@mail.example.co.uk\n").address == "first.last+tag@mail.example.co.uk"
+
+
+@pytest.mark.parametrize('text, number, message', [
+    ("sms:+15550100?body=See%20you", "+15550100", "See you"),
+    ("sms:+15550100:See you", "+15550100", "See you"),
+    ("SMSTO:+15550100:", "+15550100", ""),
+    ("mmsto:+15550100", "+15550100", ""),
+])
+def test_sms_fields(text, number, message):
+    payload = parse_payload(text)
+    assert (payload.number, payload.message) == (number, message)
+
+
+def test_geo_fields():
+    payload = parse_payload("geo:-33.8688,151.2093,58?q=Sydney%20Opera%20House")
+    assert (payload.latitude, payload.longitude, payload.altitude, payload.query) == (
+        -33.8688, 151.2093, 58.0, "Sydney Opera House")
+    payload = parse_payload("geo:somewhere")
+    assert (payload.latitude, payload.longitude) == (None, None)
+
+
+def test_contact_fields():
+    payload = parse_payload("MECARD:N:Doe,Jane;ORG:Acme;TEL:+1555;EMAIL:jane@example.com;"
+                            "ADR:,,1 Main St,Springfield,IL,62701,USA;URL:https://example.com;;")
+    assert payload.kind == 'mecard'
+    assert payload.fields() == {
+        'name': "Jane Doe", 'organization': "Acme", 'title': "", 'phones': ("+1555",),
+        'emails': ("jane@example.com",), 'addresses': ("1 Main St, Springfield, IL, 62701, USA",),
+        'urls': ("https://example.com",), 'note': ""}
+    assert payload.contact.family_name == "Doe"
+
+
+def test_event_fields():
+    payload = parse_payload("BEGIN:VEVENT\r\nSUMMARY:Launch\\, v2\r\nDTSTART:20250922T100000Z\r\n"
+                            "DTEND:20250922T110000Z\r\nLOCATION:HQ\r\nEND:VEVENT")
+    assert payload.fields() == {'summary': "Launch, v2", 'start': "20250922T100000Z",
+                                'end': "20250922T110000Z", 'location': "HQ", 'description': ""}
+
+
+def test_epc_fields():
+    assert parse_payload(EPC).fields() == {
+        'name': "Wikimedia Foerdergesellschaft", 'iban': "DE33100205000001194700", 'bic': "BFSWDE33BER",
+        'amount': 12.5, 'currency': "EUR", 'purpose': "CHAR", 'reference': "",
+        'remittance': "Spende fuer Wikipedia"}
+    assert type(parse_payload("BCD\nnot a payment")) is Payload
+
+
+def test_parse_is_memoized():
+    text = "WIFI:S:Cached;;"
+    assert parse_payload(text) is parse_payload(text)
+
+
+def test_is_url():
+    assert is_url("HTTPS://example.com") and is_url("www.example.com")
+    assert not is_url("example.com") and not is_url("mailto:a@example.com")
+
+
+@pytest.mark.parametrize('text', ["http:example.com", "HTTPS:example.com/path", "ftp:files.example.com"])
+def test_scheme_only_urls(text):
+    assert is_url(text) and detect_qr_type(text) == "URL"
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("a" * 50000 + "@" + "b" * 50000, Payload),
+    (("a" * 1000 + "@") * 50, Payload),
+    ("a@" + "b." * 50000, Payload),
+    ("a@b" + ".c" * 50000 + " x", Payload),
+    ("a@b" + ".c" * 50000, EmailPayload),
+], ids=['no-dot', 'many-at', 'trailing-dot', 'trailing-text', 'long-domain'])
+def test_long_email_like_input_is_linear(text, expected):
+    start = time.perf_counter()
+    assert type(parse_payload(text)) is expected
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,148 @@
+"""
+Preprocessing ladder: rescues, step order, budget and coordinate mapping
+"""
+
+import time
+
+import cv2
+import numpy as np
+import pytest
+import qrcode
+
+from qriftly.backends import get_backend
+from qriftly.engine import QRDecoder
+from qriftly.preprocess import DEFAULT_STEPS, PreprocessLadder, deskew, parse_steps, skew_angle
+from qriftly.symbols import DecodedSymbol
+
+TEXT = "https://example.com/hard"
+
+
+@pytest.fixture(scope='module')
+def code():
+    return np.array(qrcode.make(TEXT, box_size=6).convert('L'))
+
+
+def _faded_with_glare(gray):
+    faded = gray.astype(np.float32) / 255.0 * 14.0 + 118.0
+    glare = np.linspace(0.0, 90.0, gray.shape[1], dtype=np.float32)[None, :]
+    return np.clip(faded + glare, 0, 255).astype(np.uint8)
+
+
+class Recorder:
+    """Decode callable that notes what it was given and answers from a list"""
+
+    def __init__(self, answers=(), delay=0.0):
+        self.calls = []
+        self.answers = list(answers)
+        self.delay = delay
+
+    def __call__(self, image):
+        self.calls.append(image)
+        time.sleep(self.delay)
+        found = self.answers.pop(0) if self.answers else False
+        return [DecodedSymbol("found", polygon=[(0, 0), (10, 0), (10, 10), (0, 10)])] if found else []
+
+
+@pytest.mark.parametrize('hardship, step', [
+    (lambda gray: 255 - gray, 'invert'),
+    (_faded_with_glare, 'clahe'),
+], ids=['inverted', 'faded-glare'])
+def test_ladder_rescues_hard_images(code, hardship, step):
+    image = hardship(code)
+    assert QRDecoder(preprocess=None).decode(image) == []
+
+    decoder = QRDecoder()
+    symbols = decoder.decode(image)
+    assert [(symbol.data, symbol.preprocess) for symbol in symbols] == [(TEXT, step)]
+    stats = decoder.ladder.stats()
+    assert stats['images'] == 1 and stats['rescued'] == 1
+    assert stats['steps'][step]['hits'] == 1
+
+
+def test_easy_images_never_reach_the_ladder(code):
+    decoder = QRDecoder()
+    assert [symbol.preprocess for symbol in decoder.decode(code)] == [None]
+    assert decoder.ladder.stats()['images'] == 0
+
+
+def test_steps_run_in_order_until_one_decodes(code):
+    ladder = PreprocessLadder(budget_ms=60000)
+    recorder = Recorder()
+    assert ladder.run(code, recorder, time.perf_counter()) == ([], None, True)
+    assert len(recorder.calls) == len(DEFAULT_STEPS)
+    assert np.array_equal(recorder.calls[3], 255 - code)  # The invert step's image
+
+    recorder = Recorder([False, False, True])
+    symbols, step, complete = ladder.run(code, recorder, time.perf_counter())
+    assert (step, complete) == ('sharpen', True)
+    assert [symbol.preprocess for symbol in symbols] == ['sharpen']
+
+    stats = ladder.stats()
+    assert list(stats['steps']) == list(DEFAULT_STEPS)
+    assert [stats['steps'][name]['attempts'] for name in DEFAULT_STEPS] == [2, 2, 2, 1, 1]
+    assert [stats['steps'][name]['hits'] for name in DEFAULT_STEPS] == [0, 0, 1, 0, 0]
+    assert (stats['images'], stats['rescued'], stats['out_of_budget']) == (2, 1, 0)
+    ladder.clear()
+    assert ladder.stats()['images'] == 0
+
+
+def test_budget_skips_costly_steps_and_stops(code):
+    ladder = PreprocessLadder(['adaptive', 'clahe', 'invert'], budget_ms=1000)
+    ladder._steps['clahe'].estimate_ms = 5000.0  # Cannot fit in the budget
+    recorder = Recorder()
+    assert ladder.run(code, recorder, time.perf_counter()) == ([], None, False)
+    assert len(recorder.calls) == 2
+    stats = ladder.stats()['steps']
+    assert (stats['clahe']['attempts'], stats['clahe']['skipped']) == (0, 1)
+    assert ladder._steps['clahe'].estimate_ms == pytest.approx(4000.0)  # Decays on every skip
+
+    # A budget already spent by the plain pass stops before the first step
+    assert ladder.run(code, recorder, time.perf_counter() - 2.0) == ([], None, False)
+    assert len(recorder.calls) == 2 and ladder.stats()['out_of_budget'] == 1
+
+
+def test_budget_is_checked_between_steps(code):
+    ladder = PreprocessLadder(['adaptive', 'clahe', 'sharpen'], budget_ms=30)
+    recorder = Recorder(delay=0.05)
+    assert ladder.run(code, recorder, time.perf_counter())[2] is False
+    assert len(recorder.calls) == 1  # The step that started is never interrupted
+
+
+def test_deskew_maps_coordinates_back(code):
+    canvas = np.full((600, 600), 255, np.uint8)
+    canvas[150:150 + code.shape[0], 150:150 + code.shape[1]] = code
+    matrix = cv2.getRotationMatrix2D((300.0, 300.0), 17.0, 1.0)
+    tilted = cv2.warpAffine(canvas, matrix, (600, 600), borderValue=255)
+    assert abs(abs(skew_angle(tilted)) - 17.0) < 1.5
+
+    # Where the code's corners really are in the tilted image
+    size = code.shape[0] - 2 * 4 * 6  # Without the quiet zone
+    corners = np.array([[174, 174], [174 + size, 174], [174 + size, 174 + size], [174, 174 + size]],
+                       dtype=np.float32).reshape(-1, 1, 2)
+    expected = cv2.transform(corners, matrix).reshape(-1, 2)
+
+    ladder = PreprocessLadder(['deskew'])
+    symbols, step, _ = ladder.run(tilted, lambda image: get_backend('opencv-aruco').decode(image),
+                                  time.perf_counter())
+    assert step == 'deskew' and [symbol.data for symbol in symbols] == [TEXT]
+    polygon = np.array(symbols[0].polygon, dtype=np.float32)
+    for corner in expected:
+        assert np.min(np.linalg.norm(polygon - corner, axis=1)) < 6.0
+    x, y, w, h = symbols[0].rect
+    assert x <= expected[:, 0].min() + 6 and x + w >= expected[:, 0].max() - 6
+    assert y <= expected[:, 1].min() + 6 and y + h >= expected[:, 1].max() - 6
+
+
+def test_deskew_turns_straight_images_by_45_degrees(code):
+    rotated, inverse = deskew(code)
+    side = code.shape[0]
+    assert rotated.shape[0] == rotated.shape[1] > side * 1.4
+    centre = cv2.transform(np.array([[[rotated.shape[1] / 2.0, rotated.shape[0] / 2.0]]], np.float32), inverse)
+    assert np.allclose(centre.ravel(), [side / 2.0, side / 2.0], atol=1.0)
+
+
+def test_parse_steps():
+    assert parse_steps("invert, clahe") == ['invert', 'clahe']
+    assert parse_steps("none") == [] and parse_steps("") == []
+    with pytest.raises(ValueError, match="Unknown preprocessing step 'blur'"):
+        parse_steps("clahe,blur")
@@ -0,0 +1,93 @@
+"""
+Result ring buffer: wraparound, resizing and row access
+"""
+
+import pytest
+
+from qriftly.results import ResultStore
+
+
+def _fill(store, count, start=1):
+    for number in range(start, start + count):
+        store.append(f"payload {number}", "Text", source=f"{number}.png", timestamp=float(number))
+
+
+def _payloads(records):
+    return [record.payload for record in records]
+
+
+def test_append_and_index():
+    store = ResultStore(capacity=4)
+    record = store.append("only", "URL", "a.png", timestamp=5.0)
+    assert (record.seq, record.timestamp, record.qr_type, record.source) == (1, 5.0, "URL", "a.png")
+    assert len(store) == 1 and store[0] is record and store[-1] is record
+    with pytest.raises(IndexError):
+        store[1]
+    assert store.append("later", "Text").timestamp > 0
+
+
+def test_wraparound_keeps_the_newest():
+    store = ResultStore(capacity=4)
+    _fill(store, 10)
+    assert len(store) == 4 and store.capacity == 4
+    assert (store.total, store.evicted) == (10, 6)
+    assert _payloads(store.newest_first()) == ["payload 10", "payload 9", "payload 8", "payload 7"]
+    assert _payloads(store) == ["payload 7", "payload 8", "payload 9", "payload 10"]
+    assert [record.seq for record in store] == [7, 8, 9, 10]
+    assert store[0].seq == 10 and store[3].seq == 7 and store[-1].seq == 7
+    with pytest.raises(IndexError):
+        store[4]
+    with pytest.raises(IndexError):
+        store[-5]
+
+
+def test_rows_clamp_to_the_stored_range():
+    store = ResultStore(capacity=5)
+    _fill(store, 8)
+    assert _payloads(store.rows(1, 3)) == ["payload 7", "payload 6"]
+    assert _payloads(store.rows(-2, 2)) == ["payload 8", "payload 7"]
+    assert _payloads(store.rows(3, 100)) == ["payload 5", "payload 4"]
+    assert store.rows(5, 10) == [] and store.rows(3, 1) == []
+
+
+def test_shrink_keeps_the_newest_and_counts_evictions():
+    store = ResultStore(capacity=6)
+    _fill(store, 9)  # Wrapped: the oldest kept record is not in slot 0
+    store.resize(3)
+    assert store.capacity == 3 and len(store) == 3
+    assert _payloads(store) == ["payload 7", "payload 8", "payload 9"]
+    assert store.evicted == 3 + 3
+    _fill(store, 2, start=10)
+    assert _payloads(store) == ["payload 9", "payload 10", "payload 11"]
+
+
+def test_grow_keeps_everything_and_appends_after_it():
+    store = ResultStore(capacity=3)
+    _fill(store, 5)
+    store.resize(6)
+    assert store.capacity == 6 and _payloads(store) == ["payload 3", "payload 4", "payload 5"]
+    _fill(store, 4, start=6)
+    assert _payloads(store.newest_first())[:2] == ["payload 9", "payload 8"]
+    assert len(store) == 6 and store[-1].payload == "payload 4"
+    assert (store.total, store.evicted) == (9, 3)
+
+
+def test_resize_to_the_same_size_and_clear():
+    store = ResultStore(capacity=4)
+    _fill(store, 4)
+    store.resize(4)
+    assert _payloads(store) == ["payload 1", "payload 2", "payload 3", "payload 4"]
+    store.append("payload 5", "Text")
+    assert store[-1].payload == "payload 2"
+
+    store.clear()
+    assert len(store) == 0 and list(store) == [] and store.total == 5
+    _fill(store, 1, start=6)
+    assert store[0].seq == 6
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        ResultStore(capacity=0)
+    with pytest.raises(ValueError):
+        ResultStore().resize(0)
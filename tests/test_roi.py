@@ -0,0 +1,59 @@
+"""
+Region search on large images with codes of different sizes
+"""
+
+import numpy as np
+import pytest
+import qrcode
+
+from qriftly.engine import QRDecoder
+from qriftly.roi import coverage, find_regions
+
+LARGE = "https://example.com/large"
+SMALL = "https://example.com/small"
+
+
+def _code(text, box_size):
+    code = qrcode.QRCode(box_size=box_size, border=4)
+    code.add_data(text)
+    code.make()
+    return np.array(code.make_image().convert('L'))
+
+
+@pytest.fixture(scope='module')
+def mixed_sizes():
+    # The large code is found at the coarsest level, the small one only at full size
+    canvas = np.full((2000, 3000), 255, np.uint8)
+    large, small = _code(LARGE, 24), _code(SMALL, 4)
+    canvas[100:100 + large.shape[0], 100:100 + large.shape[1]] = large
+    canvas[1700:1700 + small.shape[0], 2600:2600 + small.shape[1]] = small
+    return canvas
+
+
+def test_regions_from_every_pyramid_level(mixed_sizes):
+    regions = find_regions(mixed_sizes)
+    assert len(regions) == 2
+    assert any(x <= 100 and y <= 100 for x, y, _, _ in regions)
+    assert any(x <= 2600 < x + w and y <= 1700 < y + h for x, y, w, h in regions)
+    assert coverage(regions, mixed_sizes.shape) < 0.5
+
+
+@pytest.mark.parametrize('symbology', ['all', 'qr'])
+@pytest.mark.parametrize('roi', ['auto', 'on', 'off'])
+def test_mixed_sizes_all_decode(mixed_sizes, roi, symbology):
+    decoder = QRDecoder(roi=roi, symbology=symbology, preprocess=None)
+    timings = {}
+    symbols = decoder.decode(mixed_sizes, timings=timings)
+    assert sorted(symbol.data for symbol in symbols) == [LARGE, SMALL]
+    if roi != 'off':
+        assert timings['regions'] == 2
+        # Only the QR-only profile may trust the crops and skip the whole image
+        assert ('full_decode' in timings) == (symbology == 'all')
+
+
+def test_full_decode_when_no_region_is_found():
+    canvas = np.full((1800, 1800), 255, np.uint8)
+    decoder = QRDecoder(roi='on', symbology='qr', preprocess=None)
+    timings = {}
+    assert decoder.decode(canvas, timings=timings) == []
+    assert timings['regions'] == 0 and 'full_decode' in timings
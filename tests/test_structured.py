@@ -0,0 +1,170 @@
+"""
+Structured-append header reading and sequence buffering
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from qriftly.backends import get_backend
+from qriftly.structured import StructuredAppend, StructuredAppendBuffer, message_parity, read_header
+from qriftly.symbols import DecodedSymbol
+
+LEVELS = {
+    'L': cv2.QRCODE_ENCODER_CORRECT_LEVEL_L,
+    'M': cv2.QRCODE_ENCODER_CORRECT_LEVEL_M,
+    'Q': cv2.QRCODE_ENCODER_CORRECT_LEVEL_Q,
+    'H': cv2.QRCODE_ENCODER_CORRECT_LEVEL_H,
+}
+
+# Short enough that each of three parts fits a version 1-H symbol
+MESSAGE = "QRiftly!"
+PARTS = 3
+
+# Pixels per module and white margin around the encoder's quiet zone
+SCALE = 4
+MARGIN = 16
+
+
+def render(symbol: np.ndarray):
+    """Scale one encoder output up; returns (image, outline of the symbol)"""
+    version = (symbol.shape[0] - 4 - 17) // 4  # The encoder adds a 2-module quiet zone
+    size = (version * 4 + 17) * SCALE
+    image = cv2.resize(symbol, None, fx=SCALE, fy=SCALE, interpolation=cv2.INTER_NEAREST)
+    image = cv2.copyMakeBorder(image, MARGIN, MARGIN, MARGIN, MARGIN, cv2.BORDER_CONSTANT, value=255)
+    start = MARGIN + 2 * SCALE
+    end = start + size - 1
+    return image, [(start, start), (end, start), (end, end), (start, end)]
+
+
+def encode_parts(message: str, parts: int, version: int = 0, level: str = 'L'):
+    params = cv2.QRCodeEncoder_Params()
+    params.mode = cv2.QRCODE_ENCODER_MODE_STRUCTURED_APPEND
+    params.structure_number = parts
+    params.version = version
+    params.correction_level = LEVELS[level]
+    return [render(symbol) for symbol in cv2.QRCodeEncoder.create(params).encodeStructuredAppend(message)]
+
+
+def part(index: int, total: int, raw: bytes, parity: int = None) -> DecodedSymbol:
+    if parity is None:
+        parity = message_parity(raw)
+    symbol = DecodedSymbol(raw.decode('utf-8'), raw=raw)
+    symbol.sequence = StructuredAppend(index, total, parity)
+    return symbol
+
+
+# OpenCV's encoder puts the version 21 alignment patterns at module 92
+# instead of 94, so its version 21 symbols are not valid QR codes
+EVERY_VERSION = [pytest.param(version, marks=pytest.mark.xfail(strict=True)) if version == 21 else version
+                 for version in range(1, 41)]
+
+
+@pytest.mark.parametrize('level', list(LEVELS))
+@pytest.mark.parametrize('version', EVERY_VERSION)
+def test_read_header_every_version_and_level(version, level):
+    rendered = encode_parts(MESSAGE, PARTS, version, level)
+    assert len(rendered) == PARTS
+    parity = message_parity(MESSAGE.encode('utf-8'))
+    for index, (image, polygon) in enumerate(rendered):
+        assert image.shape[0] == (version * 4 + 17 + 4) * SCALE + 2 * MARGIN
+        header = read_header(image, polygon)
+        assert header is not None
+        assert (header.index, header.total, header.parity) == (index, PARTS, parity)
+
+
+@pytest.mark.parametrize('version', [1, 6, 7, 15, 40])
+def test_read_header_from_reversed_outline(version):
+    image, polygon = encode_parts(MESSAGE, PARTS, version)[1]
+    header = read_header(image, polygon[::-1])
+    assert (header.index, header.total) == (1, PARTS)
+
+
+@pytest.mark.parametrize('level', list(LEVELS))
+@pytest.mark.parametrize('version', [1, 2, 6, 7, 10, 20, 27, 40])
+def test_read_header_ignores_ordinary_codes(version, level):
+    params = cv2.QRCodeEncoder_Params()
+    params.version = version
+    params.correction_level = LEVELS[level]
+    image, polygon = render(cv2.QRCodeEncoder.create(params).encode(MESSAGE[:6]))
+    assert read_header(image, polygon, MESSAGE[:6].encode('utf-8')) is None
+
+
+@pytest.mark.parametrize('backend', ['opencv', 'opencv-aruco'])
+def test_backend_reports_parts(backend):
+    decoder = get_backend(backend)
+    if not decoder.available():
+        pytest.skip(f"{backend} is unavailable")
+    message = "https://example.com/structured/append"
+    parity = message_parity(message.encode('utf-8'))
+    seen = set()
+    for image, _ in encode_parts(message, PARTS, version=3):
+        for symbol in decoder.decode(image):
+            assert symbol.sequence is not None
+            assert (symbol.sequence.total, symbol.sequence.parity) == (PARTS, parity)
+            seen.add(symbol.sequence.index)
+    assert seen == set(range(PARTS))
+
+
+def test_buffer_joins_parts_in_any_order():
+    message = b"WIFI:S:Home;T:WPA;P:secret;;"
+    chunks = [message[:10], message[10:20], message[20:]]
+    parity = message_parity(message)
+    buffer = StructuredAppendBuffer()
+    plain = DecodedSymbol("plain")
+
+    assert buffer.process([part(2, 3, chunks[2], parity), plain], now=0.0) == [plain]
+    assert buffer.process([part(0, 3, chunks[0], parity)], now=1.0) == []
+    assert buffer.pending() == [(parity, 3, [0, 2])]
+    # A repeated part does not count twice
+    assert buffer.process([part(0, 3, chunks[0], parity)], now=2.0) == []
+
+    joined = buffer.process([part(1, 3, chunks[1], parity)], now=3.0)
+    assert [symbol.raw for symbol in joined] == [message]
+    assert joined[0].data == message.decode('utf-8')
+    assert joined[0].sequence is None
+    assert len(buffer) == 0
+    assert buffer.stats()['completed'] == 1
+
+
+def test_buffer_drops_parity_mismatch():
+    buffer = StructuredAppendBuffer()
+    # Parts that share a key but do not make up the message the parity was taken from
+    parity = message_parity(b"abcdef")
+    assert buffer.add(part(0, 2, b"abc", parity), now=0.0) is None
+    assert buffer.add(part(1, 2, b"xyz", parity), now=0.0) is None
+    assert buffer.stats() == {'pending': 0, 'completed': 0, 'expired': 0, 'evicted': 0, 'corrupt': 1}
+
+
+def test_buffer_expires_stale_sequences():
+    buffer = StructuredAppendBuffer(timeout=5.0)
+    stale = b"first message"
+    buffer.add(part(0, 2, stale[:5], message_parity(stale)), now=0.0)
+    fresh = b"second message!"
+    buffer.add(part(0, 2, fresh[:5], message_parity(fresh)), now=4.0)
+    assert len(buffer) == 2
+
+    # Only the sequence idle for longer than the timeout goes
+    buffer.add(part(1, 3, b"x", 0x7F), now=6.0)
+    assert [parity for parity, _, _ in buffer.pending()] == [message_parity(fresh), 0x7F]
+    assert buffer.stats()['expired'] == 1
+    # The late part starts over instead of completing the expired sequence
+    assert buffer.add(part(1, 2, stale[5:], message_parity(stale)), now=6.5) is None
+
+
+def test_buffer_evicts_least_recently_extended():
+    buffer = StructuredAppendBuffer(max_sequences=2)
+    buffer.add(part(0, 3, b"a", 1), now=0.0)
+    buffer.add(part(0, 3, b"b", 2), now=0.0)
+    buffer.add(part(1, 3, b"c", 1), now=0.0)  # Parity 1 is now the most recent
+    buffer.add(part(0, 3, b"d", 3), now=0.0)
+    assert sorted(parity for parity, _, _ in buffer.pending()) == [1, 3]
+    assert buffer.stats()['evicted'] == 1
+
+
+def test_buffer_clear():
+    buffer = StructuredAppendBuffer()
+    buffer.add(part(0, 2, b"a", 1), now=0.0)
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.pending() == []
@@ -0,0 +1,65 @@
+"""
+Clipboard polling where the platform has no change counter
+"""
+
+import sys
+
+import numpy as np
+import pytest
+
+from qriftly.watch import CLIPBOARD_MAX_SKIP, ClipboardSource, clipboard_sequence
+
+pytestmark = pytest.mark.skipif(sys.platform in ('win32', 'darwin'),
+                                reason="the clipboard has a change counter here")
+
+
+class ScriptedClipboard(ClipboardSource):
+    """Clipboard whose content is set by the test; counts the reads"""
+
+    def __init__(self):
+        super().__init__()
+        self.content = None
+        self.reads = 0
+
+    def _read(self):
+        self.reads += 1
+        return self.content
+
+
+def _polls(source, count):
+    return [source.grab() is not None for _ in range(count)]
+
+
+def test_no_change_counter_here():
+    assert clipboard_sequence() is None
+
+
+def test_unchanged_clipboard_is_read_less_and_less():
+    source = ScriptedClipboard()
+    _polls(source, 100)
+    # Reads back off in doubling runs, then settle at one per CLIPBOARD_MAX_SKIP + 1 polls
+    assert source.reads < 100 // (CLIPBOARD_MAX_SKIP + 1) + 6
+    before = source.reads
+    _polls(source, (CLIPBOARD_MAX_SKIP + 1) * 10)
+    assert source.reads - before == 10
+
+
+def test_a_new_image_resets_the_back_off():
+    source = ScriptedClipboard()
+    _polls(source, 60)
+    source.content = np.full((20, 30), 7, np.uint8)
+    found = _polls(source, CLIPBOARD_MAX_SKIP + 1)
+    assert any(found)  # Seen within one skipped run
+
+    # Changing content keeps being read on every poll
+    reads = source.reads
+    for value in range(10):
+        source.content = np.full((20, 30), value, np.uint8)
+        assert source.grab() is not None
+    assert source.reads - reads == 10
+
+
+def test_same_image_again_is_still_returned_when_read():
+    source = ScriptedClipboard()
+    source.content = np.zeros((8, 8), np.uint8)
+    assert _polls(source, 4) == [True, True, False, True]  # The change detector decides what is new